@@ -0,0 +1,290 @@
+"""API endpointlari uchun benchmark: latency persentillari, SQL so'rovlar soni va xotira.
+
+Alohida test bazasi yaratiladi (SQLite'da xotirada, ``DATABASE_URL`` bo'lsa
+``test_<nom>``), ``seed_load`` bilan to'ldiriladi va endpointlar Django test
+client orqali haqiqiy JWT sarlavhasi bilan chaqiriladi. Celery task'lari
+chaqirilmaydi (``create_report`` faqat so'rov yo'lini o'lchaydi).
+
+    python benchmarks/endpoints.py                         # baseline bilan solishtirish
+    python benchmarks/endpoints.py --only order-list order-stats
+    python benchmarks/endpoints.py --update-baseline       # joriy natijani baseline qilish
+    python benchmarks/endpoints.py --orders 200000 --keepdb
+
+Har bir endpoint uchun p50/p95/p99 (ms), so'rovlar soni (mediana) va bitta
+so'rovdagi eng katta xotira (tracemalloc, alohida o'tishda - latency'ga
+ta'sir qilmasin) o'lchanadi. Baseline'dan ko'proq SQL so'rov, p95 yoki
+xotira ``--latency-tolerance`` / ``--memory-tolerance`` dan ko'p oshsa -
+regressiya, chiqish kodi 1. Latency mashinaga bog'liq: baseline'ni CI
+mashinasida yangilang.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines', 'endpoints.json')
+SELLER_PASSWORD = 'benchpass123'
+
+
+def _setup_django():
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chicken_store.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    # Redis'siz: WebSocket xabarlari jarayon ichida qoladi
+    os.environ['USE_INMEMORY_CHANNEL_LAYER'] = 'True'
+    os.environ.setdefault('CACHE_URL', 'locmem')
+    import django
+    django.setup()
+    from django.conf import settings
+    # Bitta jarayon: locmem ham umumiy cache (katalog keshi o'lchansin)
+    settings.SHARED_CACHE = True
+
+
+class Scenario:
+    """Bitta endpoint: ``request(i)`` -> (method, path, data, user); ``before(i)`` o'lchanmaydi."""
+
+    def __init__(self, name, request, expect=200, iterations=None, before=None):
+        self.name = name
+        self.request = request
+        self.expect = expect
+        self.iterations = iterations
+        self.before = before
+
+
+def build_scenarios(ctx):
+    from django.core.cache import cache
+
+    seller, buyer = ctx['seller'], ctx['buyer']
+    products = ctx['products']
+    pending = ctx['pending']
+    order_id = ctx['order_id']
+    days = ctx['days']
+
+    return [
+        Scenario('auth-login', lambda i: ('post', '/api/auth/login/',
+                                          {'username': 'bench_seller', 'password': SELLER_PASSWORD}, None),
+                 iterations=10),
+        Scenario('product-list', lambda i: ('get', '/api/products/', None, buyer)),
+        Scenario('product-list-cold', lambda i: ('get', '/api/products/', None, buyer), before=lambda i: cache.clear()),
+        Scenario('order-list', lambda i: ('get', '/api/orders/', None, seller)),
+        Scenario('order-list-expand', lambda i: ('get', '/api/orders/?expand=items', None, buyer)),
+        Scenario('order-list-search', lambda i: ('get', '/api/orders/?search=karimov', None, seller)),
+        Scenario('order-detail', lambda i: ('get', f'/api/orders/{order_id}/', None, seller)),
+        Scenario('order-create', lambda i: ('post', '/api/orders/', {'items': [
+            {'product': products[i % len(products)], 'quantity_kg': '1.50'},
+            {'product': products[(i + 1) % len(products)], 'quantity_kg': '0.50'},
+        ]}, buyer), expect=201),
+        Scenario('order-update-status', lambda i: ('patch', f'/api/orders/{pending[i]}/update_status/',
+                                                   {'status': 'reviewing'}, seller)),
+        Scenario('order-stats', lambda i: ('get', '/api/orders/stats/', None, seller), before=lambda i: cache.clear()),
+        Scenario('order-stats-cached', lambda i: ('get', '/api/orders/stats/', None, seller)),
+        Scenario('order-create-report', lambda i: ('post', '/api/orders/create_report/', {
+            'report_type': 'daily', 'start_date': days[i % len(days)].isoformat(),
+        }, seller), expect=201, iterations=min(len(days) - 3, 50)),
+    ]
+
+
+def prepare(args):
+    """Test bazasini ma'lumot bilan to'ldirish va scenario konteksti."""
+    from django.core.management import call_command
+    from django.utils import timezone
+    from orders.models import Order
+    from products.models import Product
+    from users.models import CustomUser
+
+    dataset = {'buyers': args.buyers, 'orders': args.orders, 'seed': args.seed}
+    if not (args.keepdb and Order.objects.filter(order_number__startswith='L').count() == args.orders):
+        print(f"Ma'lumot tayyorlanmoqda: {dataset} ...", file=sys.stderr)
+        call_command('seed_load', buyers=args.buyers, orders=args.orders, products=20, months=3,
+                     seed=args.seed, end_date=timezone.localdate().isoformat(), chunk_size=5000,
+                     stdout=open(os.devnull, 'w'))
+
+    seller = CustomUser.objects.filter(username='bench_seller').first()
+    if not seller:
+        seller = CustomUser.objects.create_user(username='bench_seller', password=SELLER_PASSWORD, role='seller')
+    # Eng faol xaridor (seed_load'da kichik indeksli xaridorlar ko'proq buyurtma beradi)
+    buyer = CustomUser.objects.get(username='load_000000')
+    # update_status uchun har iteratsiyaga yangi 'pending' buyurtma
+    needed = args.iterations + args.memory_iterations
+    pending = [Order.objects.create(buyer=buyer, status='pending', total_weight=1).id for _ in range(needed)]
+    today = timezone.localdate()
+    return {
+        'dataset': dataset,
+        'seller': seller,
+        'buyer': buyer,
+        'products': list(Product.objects.filter(name__startswith='[load] ').values_list('id', flat=True)),
+        'pending': pending,
+        'order_id': Order.objects.filter(buyer=buyer).order_by('-created_at').values_list('id', flat=True).first(),
+        'days': [today - timedelta(days=offset) for offset in range(1, 90)],
+    }
+
+
+def _tokens(users):
+    from rest_framework_simplejwt.tokens import RefreshToken
+    return {user.pk: f'Bearer {RefreshToken.for_user(user).access_token}' for user in users}
+
+
+def _call(client, tokens, scenario, i):
+    method, path, data, user = scenario.request(i)
+    extra = {'HTTP_AUTHORIZATION': tokens[user.pk]} if user else {}
+    kwargs = {'data': json.dumps(data), 'content_type': 'application/json'} if data is not None else {}
+    return getattr(client, method)(path, **kwargs, **extra)
+
+
+def _percentile(sorted_values, pct):
+    # statistics.quantiles 'inclusive': kam namunada ham chegaradan chiqmaydi
+    cuts = statistics.quantiles(sorted_values, n=100, method='inclusive') if len(sorted_values) > 1 else sorted_values * 99
+    return cuts[pct - 1]
+
+
+def run_scenario(client, tokens, scenario, args):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    iterations = scenario.iterations or args.iterations
+    warmup = min(args.warmup, iterations - 1)
+
+    def one(i):
+        if scenario.before:
+            scenario.before(i)
+        started = time.perf_counter()
+        resp = _call(client, tokens, scenario, i)
+        elapsed = time.perf_counter() - started
+        if resp.status_code != scenario.expect:
+            raise SystemExit(f"{scenario.name}: kutilgan {scenario.expect}, keldi {resp.status_code}: "
+                             f"{getattr(resp, 'data', resp.content)!r}")
+        return elapsed
+
+    # Har iteratsiya o'z indeksini oladi (update_status har safar yangi buyurtma, hisobot yangi kun)
+    latencies = [one(i) for i in range(iterations)][warmup:]
+
+    # So'rovlar soni va xotira alohida o'tishda: CaptureQueriesContext va tracemalloc vaqtni buzadi
+    queries, peaks = [], []
+    tracemalloc.start()
+    try:
+        for i in range(iterations, iterations + args.memory_iterations):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            with CaptureQueriesContext(connection) as captured:
+                one(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            queries.append(len(captured.captured_queries))
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+        'queries': int(statistics.median(queries)),
+        'peak_kib': round(max(peaks) / 1024, 1),
+        'samples': len(latencies),
+    }
+
+
+def compare(results, baseline, latency_tolerance, memory_tolerance):
+    """Baseline'dan yomonlashgan ko'rsatkichlar ro'yxati."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get('endpoints', {}).get(name)
+        if not base:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: SQL so'rovlar {base['queries']} -> {current['queries']}")
+        # Kichik qiymatlarda shovqin ko'p: 1ms / 64KiB mutlaq zaxira
+        limit = base['p95_ms'] * (1 + latency_tolerance) + 1.0
+        if current['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms (chegara {limit:.1f}ms)")
+        limit = base['peak_kib'] * (1 + memory_tolerance) + 64
+        if current['peak_kib'] > limit:
+            regressions.append(f"{name}: xotira {base['peak_kib']}KiB -> {current['peak_kib']}KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--buyers', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--memory-iterations', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help="faqat shu endpointlar")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--latency-tolerance', type=float, default=0.5, help="p95 uchun ruxsat etilgan o'sish (0.5 = +50%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--keepdb', action='store_true', help="test bazasini saqlash va qayta ishlatish")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    _setup_django()
+    from unittest.mock import patch
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from orders.realtime import publisher
+    from orders.tasks import generate_order_report
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=args.keepdb)
+    try:
+        ctx = prepare(args)
+        scenarios = build_scenarios(ctx)
+        if args.only:
+            scenarios = [s for s in scenarios if s.name in args.only]
+        client = Client()
+        tokens = _tokens([ctx['seller'], ctx['buyer']])
+
+        results = {}
+        # Hisobot faylini yozish Celery'da (benchmarks/report_writer.py), bu yerda faqat so'rov yo'li
+        with patch.object(generate_order_report, 'delay'):
+            for scenario in scenarios:
+                print(f"  {scenario.name} ...", file=sys.stderr)
+                results[scenario.name] = run_scenario(client, tokens, scenario, args)
+        publisher.flush()
+
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+        regressions = compare(results, baseline, args.latency_tolerance, args.memory_tolerance)
+
+        if args.json:
+            print(json.dumps({'dataset': ctx['dataset'], 'endpoints': results, 'regressions': regressions}, indent=2))
+        else:
+            print(f"{'endpoint':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'peak KiB':>9}  baseline p95/q")
+            for name, r in results.items():
+                base = baseline.get('endpoints', {}).get(name)
+                ref = f"{base['p95_ms']}/{base['queries']}" if base else '-'
+                print(f"{name:<22} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['queries']:>8} {r['peak_kib']:>9}  {ref}")
+        if baseline and baseline.get('dataset') != ctx['dataset']:
+            print(f"Diqqat: baseline boshqa ma'lumot hajmida olingan ({baseline.get('dataset')})", file=sys.stderr)
+
+        if args.update_baseline:
+            merged = {'dataset': ctx['dataset'], 'endpoints': {**baseline.get('endpoints', {}), **results}}
+            os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+            with open(args.baseline, 'w') as fh:
+                json.dump(merged, fh, indent=2, sort_keys=True)
+                fh.write('\n')
+            print(f"Baseline yangilandi: {args.baseline}", file=sys.stderr)
+            return
+        if regressions:
+            print("Regressiyalar:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+    finally:
+        # --keepdb'siz har ishga tushirish test_<name> bazasini qoldirmasin
+        if not args.keepdb:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Streaming Excel hisobot yozuvchisi uchun benchmark.
+
+Har bir o'lcham alohida jarayonda ishga tushiriladi, shuning uchun peak RSS
+(ru_maxrss) boshqa o'lchamlar ta'sirisiz o'lchanadi.
+
+    python benchmarks/report_writer.py                      # 10k, 100k, 1M sintetik qator
+    python benchmarks/report_writer.py --sizes 10000 50000
+    python benchmarks/report_writer.py --source db          # bazadagi yakunlangan buyurtmalardan
+
+``--source db`` uchun avval ma'lumot yarating (masalan, ``manage.py seed_load``).
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def _setup_django():
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chicken_store.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    import django
+    django.setup()
+
+
+def _synthetic_rows(n):
+    created = dt.datetime(2025, 1, 1, 9, 30)
+    for i in range(n):
+        yield [
+            f"{i:012X}", "Vali Aliyev", "+998904445566", "Tovuq son (Leg)",
+            float(i % 50) + 0.5,
+            created.strftime('%Y-%m-%d %H:%M'), created.strftime('%Y-%m-%d %H:%M'),
+        ]
+
+
+def _peak_rss_mb():
+    # Linux'da ru_maxrss kilobaytlarda
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(size, source):
+    _setup_django()
+    from orders.reports import REPORT_COLUMNS, completed_items, iter_rows, write_xlsx
+
+    rows = _synthetic_rows(size) if source == 'synthetic' else iter_rows(completed_items()[:size])
+    rss_before = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.xlsx')
+        started = time.perf_counter()
+        written = write_xlsx(path, REPORT_COLUMNS, rows)
+        elapsed = time.perf_counter() - started
+        file_mb = os.path.getsize(path) / (1024 * 1024)
+    print(json.dumps({
+        'rows': written,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(written / elapsed) if elapsed else 0,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'rss_before_mb': round(rss_before, 1),
+        'file_mb': round(file_mb, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--source', choices=['synthetic', 'db'], default='synthetic')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.source)
+        return
+
+    print(f"{'rows':>10} {'seconds':>9} {'rows/sec':>10} {'peak RSS MB':>12} {'startup MB':>11} {'file MB':>8}")
+    for size in args.sizes:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', str(size), '--source', args.source],
+            check=True, capture_output=True, text=True, cwd=BACKEND_DIR,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['rows']:>10} {r['seconds']:>9} {r['rows_per_sec']:>10} {r['peak_rss_mb']:>12} "
+              f"{r['rss_before_mb']:>11} {r['file_mb']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""TelegramService HTTP klienti uchun benchmark: har so'rovda yangi ulanish va keep-alive pool.
+
+Telegram o'rniga lokal HTTPS (yoki ``--plain`` bilan HTTP) server ishga
+tushiriladi; sertifikat vaqtinchalik, o'zimiz imzolagan. Server javobiga
+sun'iy kechikish (``--server-delay``) qo'shish mumkin.
+
+    python benchmarks/telegram_client.py                    # 200 xabar, TLS
+    python benchmarks/telegram_client.py --messages 1000 --threads 8
+    python benchmarks/telegram_client.py --plain            # faqat TCP handshake
+
+Uch rejim o'lchanadi: ``requests.post`` (eski usul, har safar yangi ulanish),
+pool'dagi sessiya ketma-ket va pool'dagi sessiya ``--threads`` oqimda.
+"""
+
+import argparse
+import datetime as dt
+import ipaddress
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _setup_django(pool_size):
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chicken_store.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['TELEGRAM_POOL_SIZE'] = str(pool_size)
+    import django
+    django.setup()
+
+
+def _self_signed_cert(directory):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = dt.datetime.now(dt.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - dt.timedelta(minutes=1))
+            .not_valid_after(now + dt.timedelta(hours=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), False)
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as fh:
+        fh.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as fh:
+        fh.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                   serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def _start_server(delay, tls_files):
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Sarlavha va tana alohida yoziladi: Nagle + delayed ACK keep-alive'da ~40ms qo'shmasin
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            connections.append(self.client_address)
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if delay:
+                time.sleep(delay)
+            body = b'{"ok": true, "result": {}}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    scheme = 'http'
+    if tls_files:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*tls_files)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}", connections
+
+
+def _measure(send, messages, threads):
+    latencies = []
+
+    def one(i):
+        started = time.perf_counter()
+        send(f"benchmark {i}")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(one, range(messages)))
+    else:
+        for i in range(messages):
+            one(i)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        'msg_per_sec': round(messages / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--server-delay', type=float, default=0.0, help="server javobi kechikishi (s)")
+    parser.add_argument('--plain', action='store_true', help="TLS'siz HTTP")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    _setup_django(args.pool_size)
+    import requests
+    from django.test import override_settings
+    from orders import services
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tls_files = None if args.plain else _self_signed_cert(tmp)
+        server, url, connections = _start_server(args.server_delay, tls_files)
+        if tls_files:
+            # Ikkala rejim ham vaqtinchalik sertifikatga ishonsin
+            os.environ['REQUESTS_CA_BUNDLE'] = tls_files[0]
+        api_url = f"{url}/botbench/sendMessage"
+        timeout = (3.05, 10)
+
+        def per_call(text):
+            # Eski usul: modul darajasidagi requests.post -> har safar yangi ulanish
+            requests.post(api_url, data={'chat_id': '1', 'text': text}, timeout=timeout).raise_for_status()
+
+        with override_settings(TESTING=False, TELEGRAM_API_URL=url, TELEGRAM_BOT_TOKEN='bench', TELEGRAM_CHAT_ID='1'):
+            services.close_session()
+            service = services.TelegramService()
+
+            def pooled(text):
+                if not service.send_message(text):
+                    raise RuntimeError('send failed')
+
+            results = {}
+            for label, send, threads in (
+                ('per-call requests.post', per_call, 1),
+                ('pooled session', pooled, 1),
+                (f'pooled session x{args.threads}', pooled, args.threads),
+            ):
+                connections.clear()
+                results[label] = _measure(send, args.messages, threads)
+                results[label]['connections'] = len(connections)
+            services.close_session()
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<28} {'p50 ms':>8} {'p95 ms':>8} {'msg/s':>8} {'conns':>6}")
+    for label, r in results.items():
+        print(f"{label:<28} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['msg_per_sec']:>8} {r['connections']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -22,4 +22,24 @@ app.conf.beat_schedule = {
         'task': 'orders.tasks.generate_daily_report', # Vazifaning joylashuvi
         'schedule': crontab(hour=23, minute=55),     # Vaqti
     },
-}
\ No newline at end of file
+    # Outbox: buyurtma yon ta'sirlari (alohida run_outbox_relay jarayoni bo'lmasa ham yetkaziladi)
+    'relay-outbox-every-5-seconds': {
+        'task': 'orders.tasks.relay_outbox',
+        'schedule': 5.0,
+    },
+}
+
+
+@app.on_after_configure.connect
+def schedule_telegram_digest_flush(sender, **kwargs):
+    """Digest navbatida qolib ketgan buyurtmalar uchun har daqiqalik zaxira flush.
+
+    ``TELEGRAM_DIGEST_WINDOW <= 0`` da har bir buyurtma o'z task'i bilan
+    yuboriladi; davriy flush u retry qilayotgan buyurtmani ikkinchi marta
+    yuborib qo'ymasligi uchun rejalashtirilmaydi.
+    """
+    from django.conf import settings
+
+    if settings.TELEGRAM_DIGEST_WINDOW > 0:
+        sender.add_periodic_task(60.0, sender.signature('orders.tasks.flush_telegram_digest'),
+                                 name='flush-telegram-digest-every-minute')
\ No newline at end of file
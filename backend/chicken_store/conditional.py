@@ -0,0 +1,91 @@
+import hashlib
+import time
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """List/retrieve uchun ETag va Last-Modified (shartli GET).
+
+    Validatorlar arzon agregatdan olinadi: filtrlangan queryset bo'yicha
+    ``max(updated_at)`` va qatorlar soni. Mijozning ``If-None-Match`` /
+    ``If-Modified-Since`` sarlavhalari mos kelsa, 304 serializatsiyasiz
+    qaytariladi. Qo'shilish/o'zgarish ``updated_at`` ni, o'chirish esa sonni
+    o'zgartiradi.
+    """
+    conditional_actions = ('list', 'retrieve')
+    last_modified_field = 'updated_at'
+
+    def get_validator_scope(self):
+        """Bir xil so'rov turli foydalanuvchilarga turli javob bersa, ularni ajratadigan kalit."""
+        user = self.request.user
+        if not getattr(user, 'is_authenticated', False):
+            return 'anon'
+        return f"user:{user.pk}"
+
+    def get_external_last_modified(self):
+        """``updated_at`` da ko'rinmaydigan oxirgi o'zgarish vaqti (bo'lsa), masalan bo'laklangan zaxira."""
+        return None
+
+    def get_validators(self):
+        """(etag, last_modified) yoki shartli GET ishlatilmasa (None, None)."""
+        if self.request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return None, None
+        qs = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            qs = qs.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        mark = qs.order_by().aggregate(last=Max(self.last_modified_field), rows=Count('pk'))
+        last = max(filter(None, [mark['last'], self.get_external_last_modified()]), default=None)
+        params = '&'.join(f"{key}={','.join(values)}" for key, values in sorted(self.request.GET.lists()))
+        raw = '|'.join([
+            type(self).__name__, self.action, self.get_validator_scope(), params,
+            last.isoformat() if last else '', str(mark['rows']),
+        ])
+        etag = 'W/' + quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+        return etag, self._last_modified_seconds(last)
+
+    @staticmethod
+    def _last_modified_seconds(last):
+        """Last-Modified soniya aniqligida; oxirgi o'zgarish joriy soniyada bo'lsa None.
+
+        If-Modified-Since faqat butun soniyani saqlaydi: shu soniya ichidagi
+        keyingi o'zgarish ham ``<=`` bo'lib, 304 olardi. Soniya tugagach
+        berilgan qiymatdan keyingi har qanday o'zgarish kattaroq soniyaga
+        tushadi. ETag bu holatda ham ishlaydi.
+        """
+        if last is None:
+            return None
+        seconds = int(last.timestamp())
+        return seconds if seconds < int(time.time()) else None
+
+    def dispatch(self, request, *args, **kwargs):
+        self._validators = (None, None)
+        return super().dispatch(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request) or super().retrieve(request, *args, **kwargs)
+
+    def _conditional(self, request):
+        self._validators = self.get_validators()
+        etag, last_modified = self._validators
+        if etag is None:
+            return None
+        return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag, last_modified = getattr(self, '_validators', (None, None))
+        if etag is not None and response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Brauzer har safar qayta tekshiradi (If-None-Match), javob foydalanuvchiga xos
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
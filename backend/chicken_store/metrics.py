@@ -0,0 +1,204 @@
+"""So'rovlar bo'yicha vaqt va SQL metrikalari (Prometheus matn formati).
+
+``QueryMetricsMiddleware`` har bir so'rovni resolve qilingan view nomi
+bo'yicha (``order-stats``, ``product-list``, ``token_obtain_pair``)
+o'lchaydi: davomiylik gistogrammasi, so'rovdagi SQL soni gistogrammasi va
+jami SQL vaqti. SQL ``connection.execute_wrapper`` orqali sanaladi, shuning
+uchun DEBUG'siz ham ishlaydi. ``/api/metrics`` ularni Prometheus formatida
+beradi.
+
+Metrikalar jarayon xotirasida: har bir gunicorn/daphne worker o'z
+hisoblagichlarini ko'rsatadi (Prometheus har bir jarayonni alohida
+so'rashi kerak).
+"""
+
+import hmac
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# N+1 shu gistogrammada ko'rinadi: odatiy endpoint 1-10 so'rov
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Series:
+    __slots__ = ('duration', 'duration_sum', 'queries', 'queries_sum', 'sql_seconds', 'count')
+
+    def __init__(self):
+        # Bucket'lar kesishmaydi (oxirgisi +Inf), kumulyativ qiymat chiqarishda hisoblanadi
+        self.duration = [0] * (len(DURATION_BUCKETS) + 1)
+        self.queries = [0] * (len(QUERY_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.queries_sum = 0
+        self.sql_seconds = 0.0
+        self.count = 0
+
+
+class RequestMetrics:
+    """Jarayon ichidagi hisoblagichlar; ``observe`` bitta lock ostida bir necha qo'shish."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._statuses = {}
+
+    def observe(self, view, method, status, duration, queries, sql_seconds):
+        key = (view, method)
+        status_key = (view, method, f'{status // 100}xx')
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.duration[bisect_left(DURATION_BUCKETS, duration)] += 1
+            series.queries[bisect_left(QUERY_BUCKETS, queries)] += 1
+            series.duration_sum += duration
+            series.queries_sum += queries
+            series.sql_seconds += sql_seconds
+            series.count += 1
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._statuses.clear()
+
+    def render(self):
+        with self._lock:
+            series = {key: _copy(value) for key, value in self._series.items()}
+            statuses = dict(self._statuses)
+
+        lines = [
+            '# HELP http_requests_total Requests by view, method and status class.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method, status), value in sorted(statuses.items()):
+            lines.append(f'http_requests_total{_labels(view=view, method=method, status=status)} {value}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Request duration by view.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method), s in sorted(series.items()):
+            lines += _histogram('http_request_duration_seconds', DURATION_BUCKETS, s.duration,
+                                s.duration_sum, s.count, view=view, method=method)
+
+        lines += [
+            '# HELP http_request_sql_queries SQL queries per request by view.',
+            '# TYPE http_request_sql_queries histogram',
+        ]
+        for (view, method), s in sorted(series.items()):
+            lines += _histogram('http_request_sql_queries', QUERY_BUCKETS, s.queries,
+                                s.queries_sum, s.count, view=view, method=method)
+
+        lines += [
+            '# HELP http_request_sql_seconds_total Time spent in SQL by view.',
+            '# TYPE http_request_sql_seconds_total counter',
+        ]
+        for (view, method), s in sorted(series.items()):
+            lines.append(f'http_request_sql_seconds_total{_labels(view=view, method=method)} {_num(s.sql_seconds)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(series):
+    copy = _Series()
+    copy.duration, copy.queries = list(series.duration), list(series.queries)
+    copy.duration_sum, copy.queries_sum = series.duration_sum, series.queries_sum
+    copy.sql_seconds, copy.count = series.sql_seconds, series.count
+    return copy
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram(name, buckets, counts, total, count, **labels):
+    lines = []
+    cumulative = 0
+    for bound, value in zip(buckets, counts):
+        cumulative += value
+        lines.append(f'{name}_bucket{_labels(**labels, le=_num(float(bound)))} {cumulative}')
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {count}')
+    lines.append(f'{name}_sum{_labels(**labels)} {_num(total)}')
+    lines.append(f'{name}_count{_labels(**labels)} {count}')
+    return lines
+
+
+# Jarayon bo'yicha yagona registr
+request_metrics = RequestMetrics()
+
+
+class _SqlTimer:
+    """``connection.execute_wrapper`` uchun: so'rovlar soni va ularning vaqti."""
+
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def view_label(request):
+    """Past kardinallikdagi nom: URL nomi (``order-stats``), bo'lmasa route shabloni."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+class QueryMetricsMiddleware:
+    """So'rov davomiyligi, SQL soni va SQL vaqtini ``request_metrics`` ga yozadi."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _SqlTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        request_metrics.observe(view_label(request), request.method, response.status_code,
+                                time.perf_counter() - started, timer.queries, timer.seconds)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpointi.
+
+    ``METRICS_TOKEN`` berilsa Bearer token talab qilinadi; token bo'lmasa endpoint
+    faqat ``METRICS_PUBLIC=True`` yoki ``DEBUG`` da ochiq, aks holda 404.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse(status=401)
+    elif not (settings.METRICS_PUBLIC or settings.DEBUG):
+        # Trafik, xatolar va SQL yuklamasi ochiq bo'lmasin
+        return HttpResponse(status=404)
+    return HttpResponse(request_metrics.render(), content_type=CONTENT_TYPE)
@@ -1,7 +1,134 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
 
 class DefaultPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
     page_query_param = 'page'
+
+
+class KeysetPagination(BasePagination):
+    """(created_at, id) bo'yicha keyset (cursor) pagination.
+
+    COUNT(*) va OFFSET ishlatilmaydi: har bir sahifa oldingi sahifaning oxirgi
+    qatoridan ``WHERE (created_at, id) < (...)`` sharti bilan davom etadi,
+    shuning uchun chuqur sahifalar ham birinchi sahifa kabi tez.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        if cursor is None:
+            qs = queryset.order_by('-created_at', '-id')
+        elif reverse:
+            created_at, pk, _ = cursor
+            qs = (queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+                  .order_by('created_at', 'id'))
+        else:
+            created_at, pk, _ = cursor
+            qs = (queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+                  .order_by('-created_at', '-id'))
+
+        rows = list(qs[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_cursor = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], True) if rows and has_previous else None
+        return rows
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            return datetime.fromisoformat(data['t']), int(data['i']), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        data = {'t': row.created_at.isoformat(), 'i': row.pk}
+        if reverse:
+            data['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(remove_query_param(self.base_url, 'page'), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SelectablePaginationMixin:
+    """ViewSet uchun pagination rejimini tanlash: sahifa raqami yoki cursor.
+
+    Rejim so'rov bo'yicha (``?pagination=cursor`` yoki ``?cursor=...``) yoki
+    viewset bo'yicha (``pagination_mode = 'cursor'``) tanlanadi. Standart rejim
+    eski mijozlar uchun sahifa raqamli pagination bo'lib qoladi.
+    """
+    pagination_class = DefaultPagination
+    cursor_pagination_class = KeysetPagination
+    pagination_mode = 'page'
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            mode = params.get('pagination') or ('cursor' if params.get('cursor') else self.pagination_mode)
+            pagination_class = self.cursor_pagination_class if mode == 'cursor' else self.pagination_class
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
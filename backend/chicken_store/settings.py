@@ -26,6 +26,31 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY')
 TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 TELEGRAM_CHAT_ID = config('TELEGRAM_CHAT_ID', default='')
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+# Shu oyna (soniya) ichida kelgan buyurtmalar bitta digest xabarda yuboriladi; 0 - har biri alohida
+TELEGRAM_DIGEST_WINDOW = config('TELEGRAM_DIGEST_WINDOW', default=10, cast=float)
+# Bitta chat uchun token bucket: soniyada xabarlar va burst
+TELEGRAM_RATE_PER_SECOND = config('TELEGRAM_RATE_PER_SECOND', default=1.0, cast=float)
+TELEGRAM_RATE_BURST = config('TELEGRAM_RATE_BURST', default=3, cast=int)
+# Telegram HTTP klienti: worker bo'yicha keep-alive pool va timeout'lar (soniya)
+TELEGRAM_POOL_SIZE = config('TELEGRAM_POOL_SIZE', default=4, cast=int)
+TELEGRAM_CONNECT_TIMEOUT = config('TELEGRAM_CONNECT_TIMEOUT', default=3.05, cast=float)
+TELEGRAM_READ_TIMEOUT = config('TELEGRAM_READ_TIMEOUT', default=10, cast=float)
+
+# WebSocket publisher: navbat chegarasi (to'lsa xabar tashlanadi) va bitta partiyadagi xabarlar
+REALTIME_QUEUE_MAX = config('REALTIME_QUEUE_MAX', default=10000, cast=int)
+REALTIME_BATCH_SIZE = config('REALTIME_BATCH_SIZE', default=100, cast=int)
+# Qayta ulanishda takrorlash uchun har bir oqimda saqlanadigan hodisalar
+ORDER_EVENT_LOG_SIZE = config('ORDER_EVENT_LOG_SIZE', default=500, cast=int)
+ORDER_EVENT_LOG_TTL = config('ORDER_EVENT_LOG_TTL', default=3600, cast=int)
+# OrderConsumer: bitta buyurtma yangilanishlari shu oyna (s) ichida birlashtiriladi; ulanish navbati chegarasi
+WS_COALESCE_WINDOW = config('WS_COALESCE_WINDOW', default=0.05, cast=float)
+WS_SEND_QUEUE_MAX = config('WS_SEND_QUEUE_MAX', default=200, cast=int)
+# /api/metrics (Prometheus): view bo'yicha so'rov vaqti va SQL. Standart yopiq: METRICS_TOKEN (Bearer)
+# yoki METRICS_PUBLIC=True (masalan, faqat ichki tarmoqda) kerak; DEBUG'da ochiq
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -58,6 +83,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Birinchi: butun middleware zanjiri ham o'lchansin
+    'chicken_store.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -109,6 +136,36 @@ else:
         },
     }
 
+# Cache (standart: REDIS_URL). Katalog/stats versiyalari, WebSocket seq jurnali va Telegram token bucket
+# barcha jarayonlar (daphne, celery, management buyruqlari) uchun umumiy bo'lishi shart.
+# CACHE_URL=locmem - faqat bitta jarayonli lokal ishlash uchun: katalog keshi o'chadi, WebSocket
+# resume ishlamaydi, stats keshi qisqa TTL bilan ishlaydi.
+CACHE_URL = config('CACHE_URL', default=REDIS_URL)
+SHARED_CACHE = CACHE_URL not in ('', 'locmem')
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chicken-store',
+        }
+    }
+
+# Seller stats javobini keshlash (versiya orqali eskiradi, TTL yo'q)
+STATS_CACHE_ENABLED = config('STATS_CACHE_ENABLED', default=True, cast=bool)
+STATS_CACHE_LOCK_TIMEOUT = config('STATS_CACHE_LOCK_TIMEOUT', default=10, cast=int)
+
+# Mahsulot katalogi (ProductViewSet.list) jarayon ichida keshlanadi, versiya kaliti umumiy cache'da
+# (SHARED_CACHE bo'lmasa ishlamaydi); MAX_AGE - versiya o'zgarmasa ham yozuv shuncha soniyada yangilanadi
+PRODUCT_CATALOG_CACHE_ENABLED = config('PRODUCT_CATALOG_CACHE_ENABLED', default=True, cast=bool)
+PRODUCT_CATALOG_MAX_AGE = config('PRODUCT_CATALOG_MAX_AGE', default=300, cast=int)
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -172,6 +229,18 @@ if 'test' in sys.argv:
     }
     # Flag to simplify conditional logic in code (e.g., skipping external API calls)
     TESTING = True
+    # Testlar bitta jarayonda: locmem umumiy cache vazifasini bajaradi
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chicken-store',
+        }
+    }
+    SHARED_CACHE = True
+    # Caches persist across test cases; tests that exercise them enable them explicitly
+    STATS_CACHE_ENABLED = False
+    PRODUCT_CATALOG_CACHE_ENABLED = False
+    TELEGRAM_DIGEST_WINDOW = 0
 
 
 # Password validation
@@ -1,22 +1,46 @@
 # orders/admin.py
 
 from django.contrib import admin
-from .models import Order, OrderItem, OrderHistory
+from .models import Order, OrderItem, OrderHistory, OutboxEvent
+
+# Buyurtma yaratish, status, tarkib va o'chirish faqat API orqali: u yerda zaxira
+# (stock.restore_many), rollup (rollups.move), stats keshi va stats_delta birga yangilanadi
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
-    extra = 1 # Standart bitta qo'shimcha qator
-    readonly_fields = ('created_at',)
+    extra = 0
+    readonly_fields = ('product', 'quantity_kg', 'created_at')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_number', 'buyer', 'status', 'total_weight', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('order_number', 'buyer__username')
-    readonly_fields = ('order_number', 'created_at', 'updated_at', 'total_weight')
+    readonly_fields = ('order_number', 'buyer', 'status', 'version', 'created_at', 'updated_at', 'total_weight')
     inlines = [OrderItemInline] # Buyurtma tarkibini ichida ko'rsatish
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(OrderHistory)
 class OrderHistoryAdmin(admin.ModelAdmin):
     list_display = ('buyer', 'created_at')
-    search_fields = ('buyer__username',)
\ No newline at end of file
+    search_fields = ('buyer__username',)
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'created_at', 'processed_at', 'attempts')
+    list_filter = ('kind', 'processed_at')
+    readonly_fields = ('kind', 'payload', 'created_at', 'available_at', 'processed_at', 'attempts', 'last_error')
@@ -0,0 +1,106 @@
+# orders/cache.py
+
+"""Seller ``stats`` javobini Django cache orqali keshlash.
+
+Kesh TTL bilan emas, versiya bilan eskiradi: buyurtma yaratilganda yoki
+statusi o'zgarganda, rollup qayta qurilganda (tranzaksiya commit bo'lgach)
+versiya oshiriladi va eski kalitlar shunchaki ishlatilmay qoladi. Versiya
+umumiy cache'da bo'lmasa (``CACHE_URL=locmem``) yozuvlar 30 soniya
+yashaydi. Kesh bo'sh bo'lganda faqat bitta so'rov qayta hisoblaydi
+(``cache.add`` qulfi), qolganlari oxirgi ma'lum javobni oladi yoki qisqa
+kutadi.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_KEY = 'orders:stats:version'
+COUNTER_KEYS = {
+    'hits': 'orders:stats:hits',
+    'misses': 'orders:stats:misses',
+    'stale': 'orders:stats:stale',
+}
+# Versiyalangan yozuvlar baribir keraksiz bo'lib qoladi, shunchaki xotirada qolib ketmasin
+ENTRY_TIMEOUT = 24 * 60 * 60
+# CACHE_URL=locmem: boshqa jarayon (Celery, management buyruqlari) oshirgan versiya ko'rinmaydi
+LOCAL_ENTRY_TIMEOUT = 30
+WAIT_STEP = 0.05
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Kalit hali yo'q (yoki locmem'da muddati o'tgan)
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_stats_version():
+    """Stats keshini eskirgan deb belgilash (commit'dan keyin)."""
+    transaction.on_commit(lambda: _incr(VERSION_KEY))
+
+
+def stats_cache_info():
+    counters = cache.get_many(list(COUNTER_KEYS.values()))
+    info = {name: counters.get(key, 0) for name, key in COUNTER_KEYS.items()}
+    info['version'] = cache.get(VERSION_KEY)
+    info['enabled'] = getattr(settings, 'STATS_CACHE_ENABLED', False)
+    return info
+
+
+def cached_stats(compute):
+    """``compute()`` natijasini joriy versiya va sana bo'yicha keshlash.
+
+    ``(payload, state)`` qaytaradi; state: HIT, MISS, STALE yoki BYPASS.
+    """
+    if not getattr(settings, 'STATS_CACHE_ENABLED', False):
+        return compute(), 'BYPASS'
+
+    today = timezone.localdate().isoformat()
+    key = f'orders:stats:{current_version()}:{today}'
+    stale_key = f'orders:stats:last:{today}'
+
+    payload = cache.get(key)
+    if payload is not None:
+        _incr(COUNTER_KEYS['hits'])
+        return payload, 'HIT'
+
+    _incr(COUNTER_KEYS['misses'])
+    lock_timeout = settings.STATS_CACHE_LOCK_TIMEOUT
+    if cache.add(f'{key}:lock', 1, timeout=lock_timeout):
+        try:
+            payload = compute()
+            timeout = ENTRY_TIMEOUT if getattr(settings, 'SHARED_CACHE', False) else LOCAL_ENTRY_TIMEOUT
+            cache.set_many({key: payload, stale_key: payload}, timeout=timeout)
+        finally:
+            cache.delete(f'{key}:lock')
+        return payload, 'MISS'
+
+    # Boshqa so'rov hisoblayapti: oxirgi ma'lum javobni beramiz
+    stale = cache.get(stale_key)
+    if stale is not None:
+        _incr(COUNTER_KEYS['stale'])
+        return stale, 'STALE'
+
+    # Oldingi javob ham yo'q (masalan, kun boshida): hisoblash tugashini kutamiz
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload, 'HIT'
+    return compute(), 'MISS'
@@ -1,9 +1,69 @@
 # orders/consumers.py (yangi fayl)
 
+import asyncio
 import json
+import logging
+from collections import Counter, OrderedDict
+from urllib.parse import parse_qs
+
+import msgpack
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from . import stream
+
+logger = logging.getLogger(__name__)
+
+# Ulanishda ?encoding=msgpack bilan binary frame'lar tanlanadi (standart - JSON matn)
+ENCODINGS = ('json', 'msgpack')
+
+# Jarayon bo'yicha jami hisoblagichlar (sent, coalesced, dropped, duplicate) - /orders/realtime/stats/ da
+consumer_stats = Counter()
+
+
+def parse_last_seq(value):
+    """``user:8,sellers:120`` -> ``{'user': 8, 'sellers': 120}`` (noto'g'ri qismlar tashlanadi)."""
+    resume = {}
+    for part in (value or '').split(','):
+        name, _, seq = part.partition(':')
+        if name.strip() in (stream.USER, stream.SELLERS) and seq.strip().isdigit():
+            resume[name.strip()] = int(seq)
+    return resume
+
+
+def merge_delta(old, new):
+    """Bitta buyurtmaning ikki delta'sidan eng yangi holat."""
+    newer, older = (new, old) if new['version'] >= old['version'] else (old, new)
+    merged = {**newer, 'changes': {**older['changes'], **newer['changes']}}
+    if 'seq' in old or 'seq' in new:
+        merged['seq'] = max(old.get('seq', 0), new.get('seq', 0))
+    return merged
+
+
+def add_counters(a, b):
+    """Ikki ``stats_delta`` ni qo'shish (ichma-ich lug'atlar bo'yicha)."""
+    merged = dict(a)
+    for key, value in b.items():
+        if isinstance(value, dict):
+            merged[key] = add_counters(merged.get(key, {}), value)
+        else:
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
 
 class OrderConsumer(AsyncWebsocketConsumer):
+    """Buyurtma hodisalari.
+
+    Guruh xabarlari darhol yuborilmaydi: ular ulanishning cheklangan
+    navbatiga tushadi va ``WS_COALESCE_WINDOW`` oynasidan keyin alohida
+    task yuboradi. Oyna ichida bitta buyurtmaning delta'lari birlashtiriladi,
+    ketma-ket delta'lar bitta ``order_deltas`` frame'iga yig'iladi. Navbat
+    ``WS_SEND_QUEUE_MAX`` dan oshsa eng eskisi tashlanadi va mijozga o'sha
+    oqim uchun ``resync_required`` yuboriladi. Sekin soket faqat o'z
+    task'ini kutadi, guruh xabarlarini o'qish to'xtamaydi.
+    """
+
     async def connect(self):
         self.user = self.scope["user"]
 
@@ -11,6 +71,20 @@ class OrderConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        self.encoding = (params.get('encoding') or ['json'])[0]
+        if self.encoding not in ENCODINGS:
+            await self.close(code=4400)
+            return
+
+        self.pending = OrderedDict()
+        self.lost_streams = set()
+        self.last_seq = {}
+        self.seen_seq = {}
+        self.counts = Counter()
+        self.wakeup = asyncio.Event()
+        self.sender = asyncio.create_task(self.send_pending())
+
         # Foydalanuvchi uchun shaxsiy guruh
         self.private_group = f'user_{self.user.id}'
 
@@ -24,20 +98,165 @@ class OrderConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        # Qayta ulanish: ?last_seq=user:8,sellers:120 - o'tkazib yuborilganlarni takrorlaymiz.
+        # Guruhlarga allaqachon qo'shilganmiz, shuning uchun oraliqda hech narsa yo'qolmaydi
+        # (ba'zilari ikki marta kelishi mumkin - delta'lar version bo'yicha takrorga chidamli)
+        resume = parse_last_seq((params.get('last_seq') or [''])[0])
+        for group in self.groups_to_join:
+            name = stream.label(group)
+            if name in resume:
+                await self.replay(group, resume[name])
+
+    async def replay(self, group, last_seq):
+        missed, head = await sync_to_async(stream.since, thread_sensitive=False)(group, last_seq)
+        if missed is None:
+            self.queue_event({'type': 'resync_required', 'stream': stream.label(group), 'seq': head})
+            return
+        for message in missed:
+            await self.dispatch(message)
+
+    async def dispatch(self, message):
+        # Resume paytida bir hodisa ham jurnaldan, ham jonli guruhdan kelishi mumkin. stats_delta
+        # qo'shiluvchi hisoblagich: takrori panelni oshirib yuboradi, shuning uchun seq bo'yicha tashlaymiz
+        if 'seq' in message and self._seen(message['stream'], message['seq']):
+            self._count('duplicate')
+            return
+        await super().dispatch(message)
+
+    def _seen(self, name, seq):
+        seen = self.seen_seq.setdefault(name, OrderedDict())
+        if seq in seen:
+            return True
+        seen[seq] = None
+        # Jurnaldan eskisini baribir takrorlab bo'lmaydi
+        if len(seen) > settings.ORDER_EVENT_LOG_SIZE:
+            seen.popitem(last=False)
+        return False
+
     async def disconnect(self, close_code):
         for g in getattr(self, 'groups_to_join', []):
             await self.channel_layer.group_discard(g, self.channel_name)
+        sender = getattr(self, 'sender', None)
+        if sender:
+            sender.cancel()
+            if self.counts['coalesced'] or self.counts['dropped']:
+                logger.info(f"WS {self.channel_name}: {dict(self.counts)}")
 
-    # Bu metod tashqaridan (masalan, view'dan) chaqiriladi
-    async def order_status_update(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'order_update',
-            'order': event['order']
-        }))
+    # --- navbat ---
+
+    def queue_event(self, payload, event=None, key=None):
+        """Frame'ni navbatga qo'yish; ``key`` bir xil bo'lsa avvalgisi bilan birlashtiriladi."""
+        if event and 'seq' in event:
+            payload = {**payload, 'stream': event['stream'], 'seq': event['seq']}
+            self.last_seq[event['stream']] = max(self.last_seq.get(event['stream'], 0), event['seq'])
+        if key is not None and key in self.pending:
+            self.pending[key] = self._merge(self.pending[key], payload)
+            self._count('coalesced')
+        else:
+            if len(self.pending) >= settings.WS_SEND_QUEUE_MAX:
+                _, dropped = self.pending.popitem(last=False)
+                self._count('dropped')
+                if 'stream' in dropped:
+                    self.lost_streams.add(dropped['stream'])
+            self.pending[key if key is not None else object()] = payload
+        self.wakeup.set()
+
+    @staticmethod
+    def _merge(old, new):
+        if new['type'] == 'order_delta':
+            return merge_delta(old, new)
+        if new['type'] == 'stats_delta':
+            merged = {**new, 'delta': add_counters(old['delta'], new['delta'])}
+            if 'seq' in old:
+                merged['seq'] = max(old['seq'], new.get('seq', 0))
+            return merged
+        return new
+
+    def _count(self, name):
+        self.counts[name] += 1
+        consumer_stats[name] += 1
+
+    def _frames(self, payloads):
+        """Ketma-ket kelgan bir oqimdagi delta'larni bitta ``order_deltas`` frame'iga yig'ish."""
+        batch = []
+        for payload in payloads:
+            if payload['type'] == 'order_delta' and (not batch or batch[0].get('stream') == payload.get('stream')):
+                batch.append(payload)
+                continue
+            if batch:
+                yield self._delta_frame(batch)
+                batch = []
+            if payload['type'] == 'order_delta':
+                batch.append(payload)
+            else:
+                yield payload
+        if batch:
+            yield self._delta_frame(batch)
+
+    @staticmethod
+    def _delta_frame(batch):
+        if len(batch) == 1:
+            return batch[0]
+        strip = ('type', 'stream', 'seq')
+        frame = {'type': 'order_deltas', 'deltas': [{k: v for k, v in d.items() if k not in strip} for d in batch]}
+        if 'seq' in batch[-1]:
+            frame.update(stream=batch[-1]['stream'], seq=max(d.get('seq', 0) for d in batch))
+        return frame
+
+    async def send_pending(self):
+        window = settings.WS_COALESCE_WINDOW
+        while True:
+            await self.wakeup.wait()
+            if window:
+                await asyncio.sleep(window)
+            self.wakeup.clear()
+            pending, self.pending = self.pending, OrderedDict()
+            lost, self.lost_streams = self.lost_streams, set()
+            # Tashlangan xabarlar bo'lsa mijoz ro'yxatni qayta yuklashi kerak
+            for name in sorted(lost):
+                await self.send_frame({'type': 'resync_required', 'stream': name, 'seq': self.last_seq.get(name, 0)})
+            for frame in self._frames(pending.values()):
+                await self.send_frame(frame)
+                self._count('sent')
+
+    async def send_frame(self, payload):
+        """Mijoz tanlagan formatda bitta frame yuborish."""
+        if self.encoding == 'msgpack':
+            await self.send(bytes_data=msgpack.packb(payload, use_bin_type=True))
+        else:
+            await self.send(text_data=json.dumps(payload, separators=(',', ':')))
+
+    # Bu metodlar tashqaridan (masalan, view'dan) chaqiriladi
+    async def order_delta(self, event):
+        # Status o'zgarishi: {id, version, changes: {status, updated_at}}
+        delta = event['delta']
+        self.queue_event({'type': 'order_delta', **delta}, event, key=('delta', event.get('stream'), delta['id']))
+
+    async def order_delta_bulk(self, event):
+        for delta in event['deltas']:
+            self.queue_event({'type': 'order_delta', **delta}, event, key=('delta', event.get('stream'), delta['id']))
 
     async def new_order_created(self, event):
         # Yangi buyurtma faqat sotuvchilarga yuboriladi (seller guruhi orqali)
-        await self.send(text_data=json.dumps({
+        self.queue_event({
             'type': 'new_order',
             'order': event['order']
-        }))
\ No newline at end of file
+        }, event)
+
+    async def stats_delta(self, event):
+        # Sotuvchi paneli hisoblagichlari: oyna ichidagi o'zgarishlar yig'indisi bitta frame
+        self.queue_event({'type': 'stats_delta', 'delta': event['delta']}, event, key=('stats', event.get('stream')))
+
+    # Eski formatdagi (to'liq buyurtma) xabarlar: deploy paytida eski jarayonlar yuborishi mumkin
+    async def order_status_update(self, event):
+        self.queue_event({
+            'type': 'order_update',
+            'order': event['order']
+        }, key=('order', event['order']['id']))
+
+    async def order_status_bulk_update(self, event):
+        for order in event['orders']:
+            self.queue_event({
+                'type': 'order_update',
+                'order': order
+            }, key=('order', order['id']))
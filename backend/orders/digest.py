@@ -0,0 +1,228 @@
+# orders/digest.py
+
+"""Telegram xabarlarini birlashtirish (digest) va tezlik cheklovi.
+
+Har bir buyurtma uchun alohida xabar o'rniga ``TELEGRAM_DIGEST_WINDOW``
+soniya ichida kelgan buyurtmalar bitta (yoki 4096 belgidan oshsa bir nechta)
+xabarga yig'iladi. Navbat bazada: ``Order.telegram_sent_at IS NULL``
+qatorlari. Oyna ichidagi birinchi buyurtma ``flush_telegram_digest`` task'ini
+oyna oxiriga rejalashtiradi, qolganlari shunchaki navbatda kutadi.
+
+Flush buyurtmalarni ``telegram_claimed_at`` bilan ``CLAIM_LEASE`` soniyaga
+band qiladi; ``telegram_sent_at`` faqat muvaffaqiyatli yuborishdan keyin
+qo'yiladi. Worker yuborish oldidan yiqilsa, lease tugagach buyurtmalar
+keyingi flush'da qayta olinadi.
+
+Yuborishlar umumiy cache'dagi token bucket orqali o'tadi, shuning uchun
+barcha worker'lar birgalikda Telegram'ning chat bo'yicha limitidan oshmaydi
+(bir nechta jarayon uchun ``CACHE_URL`` kerak).
+
+Faqat vaqtinchalik xatolar (429, 5xx, tarmoq) navbatga qaytariladi. Telegram
+boshqa sabab bilan rad etgan digest buyurtmalar bo'yicha alohida yuboriladi;
+yakka holda ham rad etilgan buyurtma log bilan tashlab ketiladi, aks holda u
+navbat boshida qolib keyingi barcha xabarlarni to'sib qo'yadi.
+"""
+
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order
+from .services import TelegramService
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED_KEY = 'telegram:digest:scheduled'
+BUCKET_KEY = 'telegram:bucket'
+# Telegram xabar uzunligi chegarasi
+MESSAGE_LIMIT = 4096
+# Bitta flush'da olinadigan buyurtmalar; qolgani keyingi flush'ga qoladi
+MAX_ORDERS_PER_FLUSH = 50
+SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+# Token shu vaqtdan tez bo'shasa task ichida kutamiz, aks holda retry
+MAX_INLINE_WAIT = 2.0
+# Xatolik javobida retry_after bo'lmasa
+DEFAULT_RETRY_AFTER = 30
+# Band qilingan buyurtmalar shu vaqtdan keyin boshqa flush'ga o'tadi (flush bundan ancha tez tugaydi)
+CLAIM_LEASE = 300
+# Limitdan uzun bitta buyurtma matni shu qo'shimcha bilan qisqartiriladi (MarkdownV2 ekranlangan)
+TRUNCATED_SUFFIX = "\n… \\(qisqartirildi\\)"
+
+
+def truncate(text, limit=MESSAGE_LIMIT):
+    """Matnni ``limit`` belgiga sig'dirish; ekranlash ``\\`` i yarmidan kesilmaydi."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - len(TRUNCATED_SUFFIX)]
+    # Oxirida toq sonli '\' qolsa, keyingi belgi kesilgan: yakka '\' MarkdownV2'da xato
+    if (len(cut) - len(cut.rstrip('\\'))) % 2:
+        cut = cut[:-1]
+    return cut + TRUNCATED_SUFFIX
+
+
+def is_transient(resp):
+    """Qayta urinishga arziydigan xato: tarmoq (javob yo'q), 429 yoki 5xx."""
+    if resp is None:
+        return True
+    code = resp.get('error_code') or 0
+    return code == 429 or code >= 500
+
+
+def schedule_order_notification(order_id):
+    """Buyurtma Telegram xabarini navbatga qo'yish (commit'dan keyin chaqiriladi)."""
+    from .tasks import flush_telegram_digest, send_order_telegram_notification
+
+    window = settings.TELEGRAM_DIGEST_WINDOW
+    if window <= 0:
+        if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+            return send_order_telegram_notification.run(order_id=order_id)
+        return send_order_telegram_notification.delay(order_id)
+    # Oynadagi birinchi buyurtma flush'ni rejalashtiradi; buyurtma o'zi bazada kutadi
+    if cache.add(SCHEDULED_KEY, 1, timeout=window):
+        return flush_telegram_digest.apply_async(countdown=window)
+    return None
+
+
+def build_messages(bodies):
+    """Buyurtma xabarlarini 4096 belgidan oshmaydigan digest'larga joylash.
+
+    ``bodies`` - ``(order_id, text)`` juftliklari. ``[(order_ids, text), ...]``
+    qaytaradi; bitta buyurtmali digest sarlavhasiz yuboriladi.
+    """
+    chunks, current, size = [], [], 0
+    for order_id, text in bodies:
+        text = truncate(text)
+        extra = len(text) + (len(SEPARATOR) if current else 0)
+        # Sarlavha uchun joy qoldiramiz
+        if current and size + extra > MESSAGE_LIMIT - 64:
+            chunks.append(current)
+            current, size = [], 0
+            extra = len(text)
+        current.append((order_id, text))
+        size += extra
+    if current:
+        chunks.append(current)
+
+    messages = []
+    for chunk in chunks:
+        ids = [order_id for order_id, _ in chunk]
+        text = SEPARATOR.join(body for _, body in chunk)
+        if len(chunk) > 1:
+            text = f"🧾 *{len(chunk)} ta yangi buyurtma*{SEPARATOR}{text}"
+        messages.append((ids, text))
+    return messages
+
+
+class TokenBucket:
+    """Cache'da saqlanadigan token bucket (barcha jarayonlar uchun umumiy).
+
+    ``rate`` - soniyada qo'shiladigan tokenlar, ``capacity`` - burst.
+    """
+
+    def __init__(self, key=BUCKET_KEY, rate=None, capacity=None):
+        self.key = key
+        self.rate = rate if rate is not None else settings.TELEGRAM_RATE_PER_SECOND
+        self.capacity = capacity if capacity is not None else settings.TELEGRAM_RATE_BURST
+
+    def _locked(self):
+        lock = f'{self.key}:lock'
+        deadline = time.monotonic() + 2
+        while not cache.add(lock, 1, timeout=2):
+            if time.monotonic() > deadline:
+                # Qulf egasi o'lib qolgan bo'lsa, kutib o'tirmaymiz
+                break
+            time.sleep(0.005)
+        return lock
+
+    def acquire(self):
+        """Token olinsa 0, aks holda keyingi token uchun kutish vaqti (s)."""
+        lock = self._locked()
+        try:
+            now = time.time()
+            tokens, stamp = cache.get(self.key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - stamp) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            cache.set(self.key, (tokens, now), timeout=3600)
+            return wait
+        finally:
+            cache.delete(lock)
+
+
+def flush_digest(bucket=None, service=None):
+    """Navbatdagi buyurtmalarni digest xabar(lar)ga yig'ib yuborish.
+
+    ``(status, retry_in)`` qaytaradi: ``retry_in`` bo'lsa yuborilmagan
+    buyurtmalar navbatga qaytarilgan va shuncha soniyadan keyin qayta urinish kerak.
+    """
+    if not settings.TELEGRAM_BOT_TOKEN or not settings.TELEGRAM_CHAT_ID:
+        return 'SKIPPED', None
+
+    # Buyurtmalarni band qilamiz: parallel flush ularni lease tugaguncha olmaydi
+    claimed_at = timezone.now()
+    with transaction.atomic():
+        ids = list(Order.objects.select_for_update(skip_locked=True)
+                   .filter(telegram_sent_at__isnull=True)
+                   .filter(Q(telegram_claimed_at__isnull=True)
+                           | Q(telegram_claimed_at__lt=claimed_at - timedelta(seconds=CLAIM_LEASE)))
+                   .order_by('created_at')
+                   .values_list('id', flat=True)[:MAX_ORDERS_PER_FLUSH])
+        Order.objects.filter(id__in=ids).update(telegram_claimed_at=claimed_at)
+    if not ids:
+        return 'EMPTY', None
+
+    service = service or TelegramService()
+    bucket = bucket or TokenBucket()
+    orders = (Order.objects.filter(id__in=ids).select_related('buyer')
+              .prefetch_related('items__product').order_by('created_at'))
+    bodies = {order.id: service.format_order_message(order) for order in orders if order.buyer_id}
+    orphans = [order_id for order_id in ids if order_id not in bodies]
+    if orphans:
+        # Xaridori o'chirilgan: xabar matni uchun ma'lumot yo'q, navbatdan chiqaramiz
+        _mark_sent(orphans)
+    queue = deque(build_messages(list(bodies.items())))
+
+    while queue:
+        order_ids, text = queue[0]
+        retry_in = bucket.acquire()
+        if 0 < retry_in <= MAX_INLINE_WAIT:
+            time.sleep(retry_in)
+            retry_in = bucket.acquire()
+        if not retry_in:
+            resp = service.send_message(text)
+            if resp and resp.get('ok'):
+                queue.popleft()
+                _mark_sent(order_ids)
+                continue
+            if not is_transient(resp):
+                queue.popleft()
+                if len(order_ids) > 1:
+                    # Qaysi buyurtma xabarni buzganini bilmaymiz: har birini alohida yuboramiz
+                    queue.extendleft(reversed([([order_id], truncate(bodies[order_id])) for order_id in order_ids]))
+                else:
+                    logger.error(f"Telegram buyurtma {order_ids[0]} xabarini rad etdi, qayta yuborilmaydi: {resp}")
+                    _mark_sent(order_ids)
+                continue
+            retry_in = ((resp or {}).get('parameters') or {}).get('retry_after', DEFAULT_RETRY_AFTER)
+        # Yuborilmaganlarini navbatga qaytaramiz (faqat o'zimiz band qilganlarini)
+        pending = [order_id for chunk_ids, _ in queue for order_id in chunk_ids]
+        Order.objects.filter(id__in=pending, telegram_claimed_at=claimed_at).update(telegram_claimed_at=None)
+        return 'RETRY', retry_in
+
+    if len(ids) == MAX_ORDERS_PER_FLUSH:
+        return 'MORE', 0
+    return 'SENT', None
+
+
+def _mark_sent(order_ids):
+    Order.objects.filter(id__in=order_ids).update(telegram_sent_at=timezone.now(), telegram_claimed_at=None)
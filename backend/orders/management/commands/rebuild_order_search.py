@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from orders import search
+
+
+class Command(BaseCommand):
+    help = "Buyurtma qidiruv indeksini (OrderSearchEntry) noldan qayta quradi."
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Qidiruv indeksi qayta qurilmoqda...")
+        total = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Tayyor: {total} ta buyurtma indekslandi."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from orders import rollups
+
+
+class Command(BaseCommand):
+    help = "OrderDailyStats rollup jadvalini Order/OrderItem jadvallaridan noldan qayta quradi."
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rollup qayta qurilmoqda...")
+        rows = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Tayyor: {rows} ta qator yozildi."))
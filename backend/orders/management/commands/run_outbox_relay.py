@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders import outbox
+
+
+class Command(BaseCommand):
+    help = "Outbox hodisalarini (Telegram, WebSocket) uzluksiz partiyalab yuboradigan relay jarayoni."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0.5, help="Navbat bo'sh bo'lganda kutish (s)")
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help="Navbatni bir marta bo'shatib chiqish")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = outbox.drain(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Yuborildi: {total} ta hodisa."))
+            return
+        self.stdout.write(f"Outbox relay ishga tushdi (interval {options['interval']}s)")
+        while True:
+            close_old_connections()
+            try:
+                sent = outbox.relay(options['batch_size'])
+            except Exception as e:
+                self.stderr.write(f"Relay xatoligi: {e}")
+                sent = 0
+            # To'liq partiya bo'lsa darhol davom etamiz
+            if sent < options['batch_size']:
+                time.sleep(options['interval'])
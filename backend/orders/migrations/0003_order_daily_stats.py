@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('status', models.CharField(choices=[('pending', 'Kutilmoqda'), ('reviewing', "Ko'rib chiqilmoqda"), ('process', 'Tayyorlanmoqda'), ('shipping', "Jo'natilmoqda"), ('completed', 'Yakunlangan'), ('cancelled', 'Bekor qilingan')], max_length=20, verbose_name='Holati')),
+                ('product_type', models.CharField(blank=True, default='', max_length=20, verbose_name='Mahsulot turi')),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_weight', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('item_count', models.IntegerField(default=0)),
+                ('quantity_kg', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_type', 'date'], name='orders_orde_product_a82632_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'status', 'product_type'), name='unique_order_daily_stats')],
+            },
+        ),
+    ]
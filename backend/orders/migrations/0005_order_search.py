@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'orders_ordersearchentry_fts'
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "document, content='orders_ordersearchentry', content_rowid='order_id', tokenize='trigram')",
+    f"CREATE TRIGGER orders_ordersearchentry_ai AFTER INSERT ON orders_ordersearchentry BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.order_id, new.document); END",
+    f"CREATE TRIGGER orders_ordersearchentry_ad AFTER DELETE ON orders_ordersearchentry BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.order_id, old.document); END",
+    f"CREATE TRIGGER orders_ordersearchentry_au AFTER UPDATE ON orders_ordersearchentry BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.order_id, old.document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.order_id, new.document); END",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS orders_ordersearchentry_au",
+    "DROP TRIGGER IF EXISTS orders_ordersearchentry_ad",
+    "DROP TRIGGER IF EXISTS orders_ordersearchentry_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS orders_ordersearchentry_document_trgm "
+    "ON orders_ordersearchentry USING gin (document gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS orders_ordersearchentry_document_trgm",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def backfill(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderSearchEntry = apps.get_model('orders', 'OrderSearchEntry')
+    rows = Order.objects.values_list(
+        'id', 'order_number', 'buyer__first_name', 'buyer__last_name', 'buyer__phone_number', 'buyer__address'
+    )
+    batch = []
+    for order_id, *parts in rows.iterator(chunk_size=2000):
+        batch.append(OrderSearchEntry(order_id=order_id, document=' '.join(p for p in parts if p).lower()))
+        if len(batch) >= 2000:
+            OrderSearchEntry.objects.bulk_create(batch)
+            batch = []
+    OrderSearchEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_orderreport_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchEntry',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='orders.order')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
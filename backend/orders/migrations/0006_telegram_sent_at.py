@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_sent(apps, schema_editor):
+    # Mavjud buyurtmalar avvalgi (har biri alohida) usulda yuborilgan: digest ularni qayta yubormasin
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(telegram_sent_at__isnull=True).update(telegram_sent_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='telegram_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_sent, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('telegram_sent_at__isnull', True)), fields=['created_at'], name='order_telegram_pending_idx'),
+        ),
+    ]
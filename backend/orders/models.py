@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
 class Order(models.Model):
@@ -25,6 +26,12 @@ class Order(models.Model):
     # WhatsApp uchun qo'shimcha maydonlar
     whatsapp_sent = models.BooleanField(default=False)
     whatsapp_message_id = models.CharField(max_length=100, blank=True, null=True)
+    # Telegram digest'ida yuborilgan vaqt (NULL - hali yuborilmagan)
+    telegram_sent_at = models.DateTimeField(blank=True, null=True)
+    # Digest flush buyurtmani band qilgan vaqt (lease): worker yiqilsa CLAIM_LEASE'dan keyin qayta olinadi
+    telegram_claimed_at = models.DateTimeField(blank=True, null=True)
+    # Har status o'zgarishida oshadi: WebSocket delta'lari eskisini yangisi ustiga yozmasligi uchun
+    version = models.PositiveIntegerField(default=1, verbose_name="Versiya")
 
     def save(self, *args, **kwargs):
         if not self.order_number:
@@ -40,6 +47,8 @@ class Order(models.Model):
             models.Index(fields=['created_at']),
             models.Index(fields=['status']),
             models.Index(fields=['buyer', 'created_at']),
+            models.Index(fields=['created_at'], condition=models.Q(telegram_sent_at__isnull=True),
+                         name='order_telegram_pending_idx'),
         ]
         ordering = ['-created_at']
 
@@ -59,6 +68,19 @@ class OrderItem(models.Model):
             models.Index(fields=['order', 'product']),
         ]
 
+class OrderSearchEntry(models.Model):
+    """Buyurtma qidiruvi uchun denormallashtirilgan matn (raqam, xaridor ismi, telefon, manzil).
+
+    Postgres'da ``document`` ustunida pg_trgm GIN indeksi, SQLite'da esa FTS5
+    (trigram) yon jadvali bor - ikkalasi ham migratsiyada yaratiladi.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Qidiruv: {self.order_id}"
+
+
 class OrderHistory(models.Model):
     buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='order_history', verbose_name="Xaridor")
     order_data = models.JSONField(verbose_name="Buyurtma ma'lumotlari")
@@ -82,6 +104,68 @@ class OrderReport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, default='pending')  # pending, ready, failed
     error_message = models.TextField(blank=True, null=True)
+    # So'rov + ma'lumot watermark'i hash'i: bir xil hisobotni qayta yaratmaslik uchun
+    fingerprint = models.CharField(max_length=64, blank=True, default='', db_index=True)
+
+    def __str__(self):
+        return f"Report {self.id} ({self.report_type})"
+
+class OrderDailyStats(models.Model):
+    """Kunlik buyurtma rollup'i (stats endpoint Order jadvalini skan qilmasligi uchun).
+
+    product_type='' bo'lgan qatorlar buyurtma darajasidagi qiymatlarni
+    (order_count, total_weight), qolganlari esa mahsulot turi bo'yicha
+    pozitsiyalarni (item_count, quantity_kg) saqlaydi. Sana - buyurtma
+    yaratilgan mahalliy sana, status - buyurtmaning joriy holati.
+    """
+    ORDER_LEVEL = ''
+
+    date = models.DateField(verbose_name="Sana")
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name="Holati")
+    product_type = models.CharField(max_length=20, blank=True, default=ORDER_LEVEL, verbose_name="Mahsulot turi")
+    order_count = models.IntegerField(default=0)
+    total_weight = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)
+    quantity_kg = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
     def __str__(self):
-        return f"Report {self.id} ({self.report_type})"
\ No newline at end of file
+        return f"{self.date} {self.status} {self.product_type or '*'}: {self.order_count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status', 'product_type'], name='unique_order_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['product_type', 'date']),
+        ]
+
+
+class OutboxEvent(models.Model):
+    """Buyurtma bilan bir tranzaksiyada yoziladigan yon ta'sir (Telegram, WebSocket).
+
+    Request faqat shu qatorni yozadi; ``orders.outbox.relay`` (beat task yoki
+    ``run_outbox_relay`` jarayoni) commit bo'lgan hodisalarni partiyalab
+    yuboradi. Rollback bo'lgan buyurtma uchun hodisa ham qolmaydi.
+    """
+    ORDER_CREATED = 'order.created'
+    KIND_CHOICES = (
+        (ORDER_CREATED, 'Order created'),
+    )
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Xatolikdan keyin qayta urinish vaqti
+    available_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at'], condition=models.Q(processed_at__isnull=True),
+                         name='outbox_pending_idx'),
+        ]
@@ -0,0 +1,114 @@
+# orders/outbox.py
+
+"""Transactional outbox: buyurtma yon ta'sirlarini commit'dan keyin yuborish.
+
+``record()`` buyurtma bilan bir tranzaksiyada ``OutboxEvent`` yozadi - request
+broker yoki Redis'ga umuman murojaat qilmaydi. ``relay()`` commit bo'lgan
+hodisalarni partiyalab oladi (``SKIP LOCKED``, bir nechta relay parallel
+ishlashi mumkin), Telegram task'ini navbatga qo'yadi va WebSocket xabarlarini
+bitta o'tishda yuboradi.
+
+Yetkazish kamida bir marta (at-least-once): xatolikda hodisa keyinroq qayta
+yuboriladi, ``MAX_ATTEMPTS`` dan keyin esa ``last_error`` bilan yopiladi.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Order, OutboxEvent
+from .realtime import broadcast
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 10
+# Qayta urinishlar orasidagi kutish: 2, 4, 8 ... soniya (ko'pi bilan 5 daqiqa)
+MAX_BACKOFF = 300
+
+
+def record(kind, **payload):
+    """Hodisani joriy tranzaksiyada yozish."""
+    return OutboxEvent.objects.create(kind=kind, payload=payload)
+
+
+def _order_created(events):
+    """``order.created``: Telegram navbati va sotuvchilarga ``new_order`` xabari."""
+    from .digest import schedule_order_notification
+    from .serializers import OrderListSerializer
+
+    order_ids = [event.payload['order_id'] for event in events]
+    # Sotuvchilar ro'yxati bilan bir xil ixcham ko'rinish (pozitsiyalar o'rniga item_count)
+    orders = (Order.objects.filter(id__in=order_ids).select_related('buyer')
+              .annotate(item_count=Count('items')))
+    by_id = {order.id: order for order in orders}
+    messages = []
+    for order_id in order_ids:
+        order = by_id.get(order_id)
+        if order is None:
+            continue
+        schedule_order_notification(order_id)
+        messages.append(('sellers', {'type': 'new_order_created', 'order': OrderListSerializer(order).data}))
+    if messages:
+        broadcast(messages)
+
+
+HANDLERS = {
+    OutboxEvent.ORDER_CREATED: _order_created,
+}
+
+
+def relay(batch_size=BATCH_SIZE):
+    """Bitta partiyani yuborish; yuborilgan hodisalar sonini qaytaradi."""
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update(skip_locked=True)
+                      .filter(processed_at__isnull=True, available_at__lte=timezone.now())
+                      .order_by('id')[:batch_size])
+        if not events:
+            return 0
+        by_kind = {}
+        for event in events:
+            by_kind.setdefault(event.kind, []).append(event)
+
+        done, failed = [], []
+        for kind, group in by_kind.items():
+            handler = HANDLERS.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"Noma'lum outbox hodisasi: {kind}")
+                # Har bir handler o'z savepoint'ida: undagi DB xatosi (Postgres'da butun tranzaksiyani
+                # buzadi) faqat shu guruhni qaytaradi, attempts/backoff hisobi yozilaveradi
+                with transaction.atomic():
+                    handler(group)
+                done.extend(group)
+            except Exception as e:
+                logger.error(f"Outbox {kind} yuborilmadi ({len(group)} ta hodisa): {e}")
+                failed.extend((event, repr(e)) for event in group)
+
+        now = timezone.now()
+        OutboxEvent.objects.filter(id__in=[event.id for event in done]).update(
+            processed_at=now, attempts=F('attempts') + 1
+        )
+        for event, error in failed:
+            attempts = event.attempts + 1
+            update = {'attempts': attempts, 'last_error': error[:1000]}
+            if attempts >= MAX_ATTEMPTS:
+                update['processed_at'] = now
+            else:
+                update['available_at'] = now + timedelta(seconds=min(2 ** attempts, MAX_BACKOFF))
+            OutboxEvent.objects.filter(id=event.id).update(**update)
+    return len(done)
+
+
+def drain(batch_size=BATCH_SIZE, max_batches=50):
+    """Navbat bo'shaguncha (yoki ``max_batches`` gacha) partiyalab yuborish."""
+    total = 0
+    for _ in range(max_batches):
+        sent = relay(batch_size)
+        total += sent
+        if sent < batch_size:
+            break
+    return total
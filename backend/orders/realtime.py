@@ -0,0 +1,204 @@
+# orders/realtime.py
+
+"""WebSocket (Channels) xabarlarini yuborish.
+
+``broadcast`` - sinxron, natijasi kerak bo'lgan joylar uchun (masalan, outbox
+relay: xatolikda hodisa qayta yuboriladi).
+
+``order_delta`` - status o'zgarishlari uchun ixcham xabar: to'liq buyurtma
+o'rniga faqat o'zgargan maydonlar va ``Order.version``.
+
+``publisher`` - request yo'lidagi view'lar uchun: xabar commit'dan keyin
+navbatga qo'yiladi va fon thread'idagi doimiy event loop uni yuboradi.
+Request thread'i Redis'ni kutmaydi, har chaqiruvda yangi event loop ham
+ochilmaydi (channels_redis ulanishlari loop'ga bog'langan, doimiy loop
+ularni qayta ishlatadi). Navbatdan bir o'tishda ``REALTIME_BATCH_SIZE``
+tagacha xabar olinadi va bir vaqtda (``asyncio.gather``) yuboriladi; bu
+Redis pipeline emas - har bir ``group_send`` channel layer'ga alohida
+murojaat, faqat ularning kutish vaqtlari ustma-ust tushadi (channels_redis
+bir nechta guruhga bitta chaqiruvda yuborish API'sini bermaydi).
+
+Har ikkala yo'l ham xabarni yuborishdan oldin ``stream.stamp`` orqali
+oqim ``seq`` i bilan jurnalga yozadi (qayta ulanishda takrorlash uchun).
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from rest_framework.fields import DateTimeField
+
+from . import stream
+
+logger = logging.getLogger(__name__)
+
+
+_datetime_field = DateTimeField()
+
+
+def order_delta(order_id, version, **changes):
+    """``{"id", "version", "changes"}`` - mijoz ``version`` kichik bo'lsa delta'ni tashlab yuboradi."""
+    for name, value in changes.items():
+        if hasattr(value, 'isoformat'):
+            # REST javobidagi bilan bir xil format
+            changes[name] = _datetime_field.to_representation(value)
+    return {'id': order_id, 'version': version, 'changes': changes}
+
+
+def broadcast(messages):
+    """(group, message) juftliklarini bitta event loop o'tishida yuborish."""
+    channel_layer = get_channel_layer()
+
+    messages = [(group, stream.stamp(group, message)) for group, message in messages]
+
+    async def send_all():
+        for group, message in messages:
+            await channel_layer.group_send(group, message)
+
+    async_to_sync(send_all)()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class Publisher:
+    """Fon thread'ida ishlaydigan navbatli group_send: partiya ichidagi xabarlar parallel yuboriladi.
+
+    ``counters`` request thread'lari (``dropped``) va fon thread'i tomonidan
+    o'zgartiriladi, shuning uchun faqat ``_lock`` ostida yangilanadi.
+    """
+
+    def __init__(self, max_queue=None, batch_size=None):
+        self.max_queue = max_queue or getattr(settings, 'REALTIME_QUEUE_MAX', 10000)
+        self.batch_size = batch_size or getattr(settings, 'REALTIME_BATCH_SIZE', 100)
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.counters = {'published': 0, 'failed': 0, 'dropped': 0, 'batches': 0}
+
+    # --- request tomoni ---
+
+    def publish(self, group, message):
+        """Xabarni joriy tranzaksiya commit bo'lgach navbatga qo'yish."""
+        transaction.on_commit(lambda: self._enqueue([(group, message)]))
+
+    def publish_many(self, messages):
+        messages = list(messages)
+        if messages:
+            transaction.on_commit(lambda: self._enqueue(messages))
+
+    def _enqueue(self, messages):
+        q = self._ensure_started()
+        enqueued_at = time.monotonic()
+        for group, message in messages:
+            try:
+                q.put_nowait((group, message, enqueued_at))
+            except queue.Full:
+                # Redis uzoq vaqt ishlamasa xotira cheksiz o'smasin
+                with self._lock:
+                    self.counters['dropped'] += 1
+                logger.error(f"Realtime navbati to'lgan, xabar tashlandi ({group})")
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._thread is None or self._pid != pid or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or self._pid != pid or not self._thread.is_alive():
+                    # Fork'dan keyin (gunicorn --preload) bola jarayon o'z thread'ini ochadi
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                    self._thread = threading.Thread(target=self._run, name='realtime-publisher', daemon=True)
+                    self._pid = pid
+                    self._thread.start()
+        return self._queue
+
+    # --- fon thread'i ---
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                batch = [(group, self._stamp(group, message), enqueued_at) for group, message, enqueued_at in batch]
+                loop.run_until_complete(self._send(batch))
+            except Exception as e:  # _send o'zi xatoliklarni yig'adi; bu yerga kelmasligi kerak
+                logger.error(f"Realtime partiyasi yuborilmadi: {e}")
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+    def _stamp(self, group, message):
+        try:
+            return stream.stamp(group, message)
+        except Exception as e:
+            # Jurnalsiz bo'lsa ham jonli xabar yetib borsin (mijoz qayta ulanganda resync oladi)
+            logger.error(f"Hodisa jurnaliga yozilmadi ({group}): {e}")
+            return message
+
+    async def _send(self, batch):
+        channel_layer = get_channel_layer()
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group, message) for group, message, _ in batch),
+            return_exceptions=True,
+        )
+        now = time.monotonic()
+        failed = [(group, result) for (group, _, _), result in zip(batch, results) if isinstance(result, Exception)]
+        with self._lock:
+            self.counters['batches'] += 1
+            self.counters['failed'] += len(failed)
+            self.counters['published'] += len(batch) - len(failed)
+            self._latencies.extend(now - enqueued_at for (_, _, enqueued_at), result in zip(batch, results)
+                                   if not isinstance(result, Exception))
+        for group, result in failed:
+            logger.error(f"WebSocket xabarni yuborishda xatolik ({group}): {result}")
+
+    # --- kuzatuv ---
+
+    def flush(self, timeout=5.0):
+        """Navbatdagi barcha xabarlar yuborilguncha kutish (testlar va shutdown uchun)."""
+        q = self._queue
+        if q is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while q.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            counters = dict(self.counters)
+        return {
+            **counters,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 0.5) * 1000, 2),
+                'p95': round(_percentile(latencies, 0.95) * 1000, 2),
+                'max': round(max(latencies, default=0.0) * 1000, 2),
+            },
+        }
+
+
+publisher = Publisher()
@@ -0,0 +1,175 @@
+# orders/reports.py
+
+"""Excel hisobotlarni doimiy xotira bilan (streaming) yozish.
+
+Qatorlar SQL'da JOIN qilingan ``values_list(...).iterator(chunk_size=...)``
+orqali bo'lak-bo'lak o'qiladi va openpyxl'ning write-only rejimida to'g'ridan
+to'g'ri faylga yoziladi. Hech qachon butun natija xotirada to'planmaydi,
+shuning uchun xotira sarfi oraliq kengligiga bog'liq emas.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import timedelta
+
+from django.db.models import Count, Max
+from openpyxl import Workbook
+
+from .models import OrderItem
+
+REPORTS_DIR = 'reports'
+PARTS_DIR = os.path.join(REPORTS_DIR, 'parts')
+# Oyna shundan uzun bo'lsa kunlik emas, haftalik bo'laklarga bo'linadi
+DAILY_PARTITION_MAX_DAYS = 31
+CHUNK_SIZE = 2000
+
+# generate_order_report (OrderReport) ustunlari
+REPORT_COLUMNS = ['Order #', 'Buyer', 'Phone', 'Product', 'Qty (kg)', 'Created', 'Completed']
+# generate_daily_report (beat) ustunlari
+DAILY_COLUMNS = [
+    'Buyurtma Raqami', 'Xaridor', 'Telefon', 'Manzil', 'Mahsulot',
+    'Miqdori (kg)', 'Buyurtma Vaqti', 'Yakunlangan Vaqti',
+]
+
+# Ustunlar yoki format o'zgarsa oshiriladi: eski fingerprint'lar qayta ishlatilmaydi
+FORMAT_VERSION = 2
+
+_FIELDS = (
+    'order__order_number',
+    'order__buyer__first_name',
+    'order__buyer__last_name',
+    'order__buyer__phone_number',
+    'order__buyer__address',
+    'product__name',
+    'quantity_kg',
+    'order__created_at',
+    'order__updated_at',
+)
+
+
+def completed_items(start_date=None, end_date=None):
+    """Yakunlangan buyurtma pozitsiyalari (yakunlangan sana oralig'i bo'yicha)."""
+    qs = OrderItem.objects.filter(order__status='completed')
+    if start_date:
+        qs = qs.filter(order__updated_at__date__gte=start_date)
+    if end_date:
+        qs = qs.filter(order__updated_at__date__lte=end_date)
+    return qs
+
+
+def iter_rows(queryset, with_address=False):
+    """Queryset'dan Excel qatorlarini bo'lak-bo'lak hosil qilish.
+
+    Tartib - yakunlangan vaqt bo'yicha (eng yangisi birinchi): bo'laklar ham shu
+    vaqt bo'yicha kesiladi, shuning uchun bo'lingan hisobot bilan bir xil chiqadi.
+    """
+    rows = (queryset
+            .order_by('-order__updated_at', '-order_id', 'id')
+            .values_list(*_FIELDS)
+            .iterator(chunk_size=CHUNK_SIZE))
+    for number, first_name, last_name, phone, address, product, qty, created, completed in rows:
+        row = [number, f"{first_name or ''} {last_name or ''}", phone]
+        if with_address:
+            row.append(address)
+        row += [
+            product,
+            float(qty),  # Excel uchun float'ga o'tkazamiz
+            created.strftime('%Y-%m-%d %H:%M'),
+            completed.strftime('%Y-%m-%d %H:%M'),
+        ]
+        yield row
+
+
+def write_xlsx(filepath, columns, rows):
+    """Qatorlarni write-only workbook'ga oqim bilan yozish; yozilgan qatorlar sonini qaytaradi."""
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(columns)
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(filepath)
+    return count
+
+
+def report_window(report_type, start_date, end_date):
+    """Hisobot turi bo'yicha (boshlanish, tugash) sanalari."""
+    if report_type == 'daily':
+        return start_date, start_date
+    return start_date, end_date
+
+
+def report_fingerprint(report_type, start_date, end_date):
+    """So'rov parametrlari va oynadagi ma'lumot watermark'idan hash.
+
+    Watermark - oynadagi eng so'nggi ``updated_at`` va qatorlar soni: oynaga
+    yangi yakunlangan buyurtma tushsa fingerprint o'zgaradi.
+    """
+    start, end = report_window(report_type, start_date, end_date)
+    mark = completed_items(start, end).aggregate(latest=Max('order__updated_at'), rows=Count('id'))
+    latest = mark['latest'].isoformat() if mark['latest'] else ''
+    raw = f"{FORMAT_VERSION}|{report_type}|{start}|{end}|{latest}|{mark['rows']}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def link_report_file(source_path, report_id):
+    """Tayyor hisobot faylini yangi yozuv uchun hard-link qilish (bo'lmasa nusxalash)."""
+    filepath = os.path.join(REPORTS_DIR, f"report_{report_id}.xlsx")
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    try:
+        os.link(source_path, filepath)
+    except OSError:
+        shutil.copyfile(source_path, filepath)
+    return filepath
+
+
+def partition_window(start_date, end_date):
+    """Sana oralig'ini kunlik (<= 31 kun) yoki haftalik bo'laklarga bo'lish."""
+    span = (end_date - start_date).days + 1
+    step = 1 if span <= DAILY_PARTITION_MAX_DAYS else 7
+    windows = []
+    current = start_date
+    while current <= end_date:
+        last = min(current + timedelta(days=step - 1), end_date)
+        windows.append((current, last))
+        current = last + timedelta(days=1)
+    return windows
+
+
+def partition_path(report_id, index):
+    return os.path.join(PARTS_DIR, f"report_{report_id}", f"part_{index:04d}.jsonl")
+
+
+def write_partition(path, rows):
+    """Bo'lak qatorlarini JSON Lines faylga yozish (tugagach atomik rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False))
+            fh.write('\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_partitions(paths):
+    """Bo'lak fayllaridagi qatorlarni oqim qilib o'qish.
+
+    ``paths`` - ``partition_window`` tartibida (eski oynadan yangisiga); qatorlar
+    ``iter_rows`` bilan bir xil bo'lishi uchun eng yangi oynadan boshlab o'qiladi.
+    """
+    for path in reversed(paths):
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                yield json.loads(line)
+
+
+def remove_partitions(report_id):
+    shutil.rmtree(os.path.join(PARTS_DIR, f"report_{report_id}"), ignore_errors=True)
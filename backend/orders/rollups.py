@@ -0,0 +1,169 @@
+# orders/rollups.py
+
+"""OrderDailyStats rollup jadvalini inkremental yangilash.
+
+Buyurtma yaratilganda uning hissasi (sana, status, mahsulot turi) qatorlariga
+qo'shiladi; status o'zgarganda esa eski status qatorlaridan ayrilib, yangisiga
+o'tkaziladi. Jadvalni noldan qayta qurish uchun ``rebuild_order_stats``
+buyrug'i ishlatiladi.
+
+Har bir o'zgarish commit'dan keyin ``sellers`` guruhiga ``stats_delta``
+xabari sifatida ham yuboriladi: ochiq sotuvchi panellari hisoblagichlarni
+``/orders/stats/`` ni qayta so'ramasdan yangilaydi.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import bump_stats_version
+from .models import Order, OrderItem, OrderDailyStats
+
+ORDER_LEVEL = OrderDailyStats.ORDER_LEVEL
+COUNTERS = ('order_count', 'total_weight', 'item_count', 'quantity_kg')
+
+
+def _bump(key, deltas):
+    """(date, status, product_type) qatoriga deltalarni qo'shish (upsert)."""
+    date, status, product_type = key
+    lookup = {'date': date, 'status': status, 'product_type': product_type}
+    changes = {name: F(name) + value for name, value in deltas.items() if value}
+    if not changes:
+        return
+    if OrderDailyStats.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            OrderDailyStats.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Parallel so'rov qatorni bizdan oldin yaratdi
+        OrderDailyStats.objects.filter(**lookup).update(**changes)
+
+
+def _apply(contributions, sign=1, status=None):
+    for (date, old_status, product_type), deltas in contributions.items():
+        _bump((date, status or old_status, product_type), {k: v * sign for k, v in deltas.items()})
+
+
+def record_order_created(order, items_data):
+    """Yangi buyurtma hissasini qo'shish (``items_data`` - product/quantity_kg lug'atlari)."""
+    date = timezone.localdate(order.created_at)
+    contributions = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    order_row = contributions[(date, order.status, ORDER_LEVEL)]
+    order_row['order_count'] += 1
+    order_row['total_weight'] += order.total_weight
+    for item_data in items_data:
+        item_row = contributions[(date, order.status, item_data['product'].product_type)]
+        item_row['item_count'] += 1
+        item_row['quantity_kg'] += item_data['quantity_kg']
+    _apply(contributions)
+    publish_delta(contributions)
+
+
+def snapshot(order_ids=None):
+    """Buyurtmalarning joriy (status o'zgarishidan oldingi) hissasini hisoblash.
+
+    ``order_ids=None`` - barcha buyurtmalar (qayta qurish uchun).
+    """
+    contributions = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    if order_ids is not None:
+        orders = orders.filter(id__in=order_ids)
+        items = items.filter(order_id__in=order_ids)
+    orders = (orders
+              .annotate(day=TruncDate('created_at'))
+              .values('day', 'status')
+              .annotate(c=Count('id'), w=Sum('total_weight')))
+    for row in orders:
+        key = (row['day'], row['status'], ORDER_LEVEL)
+        contributions[key]['order_count'] += row['c']
+        contributions[key]['total_weight'] += row['w'] or Decimal('0')
+    items = (items
+             .annotate(day=TruncDate('order__created_at'))
+             .values('day', 'order__status', 'product__product_type')
+             .annotate(c=Count('id'), q=Sum('quantity_kg')))
+    for row in items:
+        key = (row['day'], row['order__status'], row['product__product_type'])
+        contributions[key]['item_count'] += row['c']
+        contributions[key]['quantity_kg'] += row['q'] or Decimal('0')
+    return contributions
+
+
+def move(contributions, new_status):
+    """``snapshot`` natijasini eski status qatorlaridan ``new_status`` ga o'tkazish."""
+    _apply(contributions, sign=-1)
+    _apply(contributions, sign=1, status=new_status)
+    publish_delta(contributions, new_status)
+
+
+def stats_delta(contributions, new_status=None):
+    """Rollup o'zgarishining ``/orders/stats/`` payload'idagi ko'rinishi (faqat nolmas qiymatlar).
+
+    ``new_status=None`` - yangi buyurtmalar hissasi qo'shildi; aks holda hissa
+    ``new_status`` ga o'tkazildi (jami, mahsulot turlari va kunlik soni o'zgarmaydi).
+    """
+    status_breakdown = defaultdict(int)
+    product_types = defaultdict(lambda: {'orders': 0, 'quantity_kg': Decimal('0')})
+    days = defaultdict(lambda: {'count': 0, 'completed_weight': Decimal('0')})
+    total_orders, completed_weight = 0, Decimal('0')
+
+    moves = [(1, None)] if new_status is None else [(-1, None), (1, new_status)]
+    for sign, status_override in moves:
+        for (date, status, product_type), values in contributions.items():
+            status = status_override or status
+            if product_type != ORDER_LEVEL:
+                if new_status is None:
+                    product_types[product_type]['orders'] += values['item_count']
+                    product_types[product_type]['quantity_kg'] += values['quantity_kg']
+                continue
+            status_breakdown[status] += sign * values['order_count']
+            if new_status is None:
+                total_orders += values['order_count']
+                days[date.isoformat()]['count'] += values['order_count']
+            if status == 'completed':
+                completed_weight += sign * values['total_weight']
+                days[date.isoformat()]['completed_weight'] += sign * values['total_weight']
+
+    delta = {
+        'total_orders': total_orders,
+        'total_completed': status_breakdown.get('completed', 0),
+        'total_weight_completed': float(completed_weight),
+        'status_breakdown': {k: v for k, v in status_breakdown.items() if v},
+        'product_type_breakdown': {
+            k: {'orders': v['orders'], 'quantity_kg': float(v['quantity_kg'])}
+            for k, v in product_types.items() if v['orders'] or v['quantity_kg']
+        },
+        'days': {
+            k: {'count': v['count'], 'completed_weight': float(v['completed_weight'])}
+            for k, v in days.items() if v['count'] or v['completed_weight']
+        },
+    }
+    return {k: v for k, v in delta.items() if v}
+
+
+def publish_delta(contributions, new_status=None):
+    """``stats_delta`` ni commit'dan keyin sotuvchilarga yuborish."""
+    from .realtime import publisher
+
+    delta = stats_delta(contributions, new_status)
+    if delta:
+        publisher.publish('sellers', {'type': 'stats_delta', 'delta': delta})
+
+
+@transaction.atomic
+def rebuild():
+    """Rollup jadvalini Order/OrderItem jadvallaridan noldan qayta qurish."""
+    OrderDailyStats.objects.all().delete()
+    # Keshlangan stats javobi eski jadvaldan: commit'dan keyin eskiradi
+    bump_stats_version()
+    rows = [
+        OrderDailyStats(date=date, status=status, product_type=product_type, **deltas)
+        for (date, status, product_type), deltas in snapshot().items()
+    ]
+    OrderDailyStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,95 @@
+# orders/search.py
+
+"""Buyurtmalarni raqam, xaridor ismi, telefon va manzil bo'yicha qidirish.
+
+Qidiruv ``OrderSearchEntry.document`` (kichik harfli matn) ustida ishlaydi:
+
+* Postgres: ``document LIKE '%term%'`` pg_trgm GIN indeksi orqali bajariladi,
+  natijalar ``word_similarity`` bo'yicha saralanadi.
+* SQLite: FTS5 trigram yon jadvali (``MATCH``), natijalar ``bm25`` bo'yicha.
+
+Yozuv buyurtma yaratilganda (``index_order``) va xaridorning ismi, telefoni
+yoki manzili o'zgarganda (``orders.signals`` -> ``index_buyer_orders``)
+yangilanadi.
+
+Trigram indekslari 3 belgidan qisqa so'rovlarga yordam bera olmaydi, bunday
+so'rovlar oddiy ``LIKE`` bilan bajariladi.
+"""
+
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Order, OrderSearchEntry
+
+FTS_TABLE = 'orders_ordersearchentry_fts'
+MIN_TRIGRAM_LENGTH = 3
+# Hujjatga kiradigan xaridor maydonlari (o'zgarsa buyurtmalar qayta indekslanadi)
+BUYER_FIELDS = ('first_name', 'last_name', 'phone_number', 'address')
+
+
+def build_document(order_number, first_name, last_name, phone_number, address):
+    return ' '.join(part for part in (order_number, first_name, last_name, phone_number, address) if part).lower()
+
+
+def index_order(order):
+    """Bitta buyurtma uchun qidiruv yozuvini yaratish/yangilash."""
+    buyer = order.buyer
+    document = build_document(
+        order.order_number,
+        *(getattr(buyer, field, '') for field in BUYER_FIELDS)
+    )
+    OrderSearchEntry.objects.update_or_create(order_id=order.pk, defaults={'document': document})
+
+
+def index_buyer_orders(buyer, batch_size=2000):
+    """Xaridorning barcha buyurtmalari yozuvini uning joriy ma'lumotlari bilan yangilash."""
+    parts = [getattr(buyer, field, '') for field in BUYER_FIELDS]
+    entries = [
+        OrderSearchEntry(order_id=order_id, document=build_document(order_number, *parts))
+        for order_id, order_number in Order.objects.filter(buyer_id=buyer.pk).values_list('id', 'order_number')
+    ]
+    # Yozuvi yo'q (rebuild'dan oldingi) buyurtmalar o'tkazib yuboriladi
+    OrderSearchEntry.objects.bulk_update(entries, ['document'], batch_size=batch_size)
+    return len(entries)
+
+
+@transaction.atomic
+def rebuild_index(batch_size=2000):
+    """Qidiruv yozuvlarini Order/xaridor jadvallaridan noldan qayta qurish."""
+    OrderSearchEntry.objects.all().delete()
+    rows = Order.objects.values_list(
+        'id', 'order_number', 'buyer__first_name', 'buyer__last_name', 'buyer__phone_number', 'buyer__address'
+    )
+    batch, total = [], 0
+    for order_id, *parts in rows.iterator(chunk_size=batch_size):
+        batch.append(OrderSearchEntry(order_id=order_id, document=build_document(*parts)))
+        if len(batch) >= batch_size:
+            OrderSearchEntry.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    OrderSearchEntry.objects.bulk_create(batch)
+    return total + len(batch)
+
+
+def search_orders(queryset, term):
+    """``queryset`` ni qidiruv so'zi bo'yicha filtrlash va moslik darajasi bo'yicha saralash."""
+    term = term.strip().lower()
+    if not term:
+        return queryset
+    if len(term) >= MIN_TRIGRAM_LENGTH:
+        if connection.vendor == 'postgresql':
+            return (queryset.filter(search_entry__document__contains=term)
+                    .annotate(search_rank=Func(
+                        Value(term), F('search_entry__document'), function='word_similarity', output_field=FloatField()))
+                    .order_by('-search_rank', '-created_at'))
+        if connection.vendor == 'sqlite':
+            match = '"' + term.replace('"', '""') + '"'
+            return (queryset
+                    .filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)))
+                    .annotate(search_rank=RawSQL(
+                        f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                        f'WHERE {FTS_TABLE} MATCH %s AND rowid = "orders_order"."id"',
+                        (match,), output_field=FloatField()))
+                    .order_by(F('search_rank').asc(), '-created_at'))
+    return queryset.filter(search_entry__document__contains=term).order_by('-created_at')
@@ -2,15 +2,15 @@
 
 import logging
 from rest_framework import serializers
-from .models import Order, OrderItem, OrderHistory, OrderReport
+from .models import Order, OrderItem, OrderHistory, OrderReport, OutboxEvent
 from products.serializers import ProductSerializer
-from users.serializers import UserSerializer
+from users.serializers import UserSerializer, UserSummarySerializer
 from .services import TelegramService  # still used for potential formatting tests/logging
-from .tasks import send_order_telegram_notification
-from django.conf import settings
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from . import outbox, rollups, search
+from .cache import bump_stats_version
+from django.db import transaction
 from products.models import Product
+from products import stock
 
 # Xatoliklarni yozib borish uchun logger'ni olamiz
 logger = logging.getLogger(__name__)
@@ -26,7 +26,29 @@ class OrderItemCreateSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ['product', 'quantity_kg']
 
-class OrderSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """``?fields=a,b`` va ``?expand=items`` bo'yicha maydonlarni qisqartirish.
+
+    Tanlov serializer context'idagi ``fields`` / ``expand`` to'plamlaridan
+    olinadi (view ularni so'rovdan o'qiydi). ``Meta.expandable`` dagi maydonlar
+    faqat ``expand`` da so'ralganda qo'shiladi; ``id`` doim qoladi.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = self.context.get('expand') or set()
+        for name in getattr(self.Meta, 'expandable', ()):
+            if name not in expand:
+                fields.pop(name, None)
+        requested = self.context.get('fields')
+        if requested:
+            for name in list(fields):
+                if name != 'id' and name not in requested:
+                    fields.pop(name)
+        return fields
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     buyer = UserSerializer(read_only=True)
 
@@ -34,6 +56,25 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = '__all__'
 
+
+class OrderListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Ro'yxat uchun ixcham ko'rinish: xulosa maydonlari va pozitsiyalar soni.
+
+    ``item_count`` queryset'da annotatsiya qilinadi; pozitsiyalarning o'zi
+    faqat ``?expand=items`` bilan qaytariladi.
+    """
+    buyer = UserSummarySerializer(read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'status', 'total_weight', 'notes',
+            'created_at', 'updated_at', 'version', 'buyer', 'item_count', 'items',
+        ]
+        expandable = ['items']
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     items = OrderItemCreateSerializer(many=True)
 
@@ -43,50 +84,39 @@ class OrderCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        # Buyurtmani joriy foydalanuvchi nomidan yaratamiz
-        order = Order.objects.create(buyer=self.context['request'].user, **validated_data)
-        total_weight = 0
+        # Bir mahsulot bir necha qatorda kelishi mumkin: miqdorlarni jamlaymiz
+        requested = {}
         for item_data in items_data:
-            product = item_data['product'] if isinstance(item_data['product'], Product) else Product.objects.get(pk=item_data['product'].id if hasattr(item_data['product'], 'id') else item_data['product'])
-            qty = item_data['quantity_kg']
-            # Stock check
-            if product.stock_kg < qty:
+            product_id = item_data['product'].pk
+            requested[product_id] = requested.get(product_id, 0) + item_data['quantity_kg']
+
+        with transaction.atomic():
+            products = {item_data['product'].pk: item_data['product'] for item_data in items_data}
+            # Zaxirani shartli UPDATE bilan kamaytiramiz (qulfsiz, oversell bo'lmaydi)
+            try:
+                stock.decrement_many(requested, products)
+            except stock.InsufficientStock as e:
+                product = products[e.product_id]
+                product.refresh_from_db(fields=['stock_kg', 'stock_shard_count'])
                 raise serializers.ValidationError({
-                    'stock_kg': f"'{product.name}' uchun yetarli zaxira yo'q. Mavjud: {product.stock_kg} kg"
+                    'stock_kg': f"'{product.name}' uchun yetarli zaxira yo'q. Mavjud: {stock.available(product)} kg"
                 })
-            # Deduct temporary stock
-            product.stock_kg = product.stock_kg - qty
-            product.save(update_fields=['stock_kg'])
-            OrderItem.objects.create(order=order, product=product, quantity_kg=qty)
-            total_weight += qty
-        
-        order.total_weight = total_weight
-        order.save()
-
-        # --- TELEGRAM XABARINI YUBORISH QISMI ---
-        try:
-            if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
-                send_order_telegram_notification.run(order_id=order.id)
-            else:
-                send_order_telegram_notification.delay(order.id)
-        except Exception as e:
-            logger.error(f"Celery telegram task enqueue failed (order {order.id}): {e}")
-        # --- TELEGRAM QISMI TUGADI ---
-
-        # --- SELLER WEBSOCKET BROADCAST ---
-        try:
-            channel_layer = get_channel_layer()
-            serializer = OrderSerializer(order, context=self.context)
-            async_to_sync(channel_layer.group_send)(
-                'sellers',
-                {
-                    'type': 'new_order_created',
-                    'order': serializer.data
-                }
+
+            # Buyurtmani joriy foydalanuvchi nomidan yakuniy og'irligi bilan bir marta yozamiz
+            order = Order.objects.create(
+                buyer=self.context['request'].user,
+                total_weight=sum(requested.values()),
+                **validated_data
             )
-        except Exception as e:
-            logger.error(f"Seller broadcast failed (order {order.id}): {e}")
-        # --- BROADCAST END ---
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=item_data['product'].pk, quantity_kg=item_data['quantity_kg'])
+                for item_data in items_data
+            ])
+            rollups.record_order_created(order, items_data)
+            search.index_order(order)
+            bump_stats_version()
+            # Telegram va sotuvchilarga WebSocket xabari outbox relay orqali, commit'dan keyin
+            outbox.record(OutboxEvent.ORDER_CREATED, order_id=order.id)
 
         return order
 
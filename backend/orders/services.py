@@ -1,17 +1,60 @@
 # orders/services.py
 
+import os
+import threading
 import requests
 import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from .models import Order
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Jarayon (worker) uchun yagona keep-alive ``requests.Session``.
+
+    Ulanishlar pool'da saqlanadi, shuning uchun har bir xabar uchun TCP+TLS
+    handshake qayta bajarilmaydi. Fork'dan keyin (Celery prefork) bola jarayon
+    ota jarayonning soketlarini ishlatmasligi uchun sessiya PID bo'yicha
+    qayta yaratiladi.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.TELEGRAM_POOL_SIZE,
+                    max_retries=0,  # qayta urinishlar Celery/digest darajasida
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
 class TelegramService:
     def __init__(self):
         token = settings.TELEGRAM_BOT_TOKEN
-        self.api_url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.api_url = f"{settings.TELEGRAM_API_URL}/bot{token}/sendMessage"
         self.chat_id = settings.TELEGRAM_CHAT_ID
+        self.timeout = (settings.TELEGRAM_CONNECT_TIMEOUT, settings.TELEGRAM_READ_TIMEOUT)
         # Determine test mode (set in settings during tests)
         self.testing = getattr(settings, 'TESTING', False)
 
@@ -22,17 +65,26 @@ class TelegramService:
             logger.info("(TESTING) Skipping real Telegram API call.")
             return {'ok': True, 'testing': True}
         try:
-            response = requests.post(self.api_url, data=data, timeout=10)
+            response = get_session().post(self.api_url, data=data, timeout=self.timeout)
             response.raise_for_status()
             logger.info(f"Telegram message sent successfully. Response: {response.json()}")
             return response.json()
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"Failed to send Telegram message. Error: {e}")
+            if e.response is None:
+                return None
+            # Xato javobi chaqiruvchiga: 429 dagi parameters.retry_after va 4xx/5xx farqi kerak
+            try:
+                return e.response.json()
+            except ValueError:
+                return {'ok': False, 'error_code': e.response.status_code}
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to send Telegram message. Error: {e}")
             return None
 
     def _escape_markdown(self, text: str) -> str:
         """MarkdownV2 uchun maxsus belgilarni ekrannlash"""
-        escape_chars = r'_*[]()~`>#+-=|{}.!'
+        escape_chars = '\\' + r'_*[]()~`>#+-=|{}.!'
         return ''.join(f'\\{char}' if char in escape_chars else char for char in str(text))
 
     def format_order_message(self, order: Order) -> str:
@@ -68,6 +120,24 @@ class TelegramService:
         
         return "\n".join(message_lines)
 
+    def send_message(self, text: str):
+        """Tayyor MarkdownV2 matnni chatga yuborish"""
+        if not all([self.api_url, self.chat_id]):
+            logger.warning("Telegram settings are not fully configured. Skipping notification.")
+            return None
+        return self._send_request({
+            "chat_id": self.chat_id,
+            "text": text,
+            "parse_mode": "MarkdownV2",
+        })
+
+    async def asend_message(self, text: str):
+        """``send_message`` ning ASGI (async) kod uchun varianti.
+
+        So'rov pool'dagi sessiya orqali alohida thread'da bajariladi, event loop bloklanmaydi.
+        """
+        return await sync_to_async(self.send_message, thread_sensitive=False)(text)
+
     def send_order_notification(self, order: Order):
         """Yangi buyurtma haqida sotuvchiga xabar yuborish"""
         if not all([self.api_url, self.chat_id]):
@@ -0,0 +1,18 @@
+# orders/signals.py
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import search
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def buyer_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Xaridor ismi/telefoni/manzili o'zgarsa, buyurtmalari qidiruv yozuvini yangilash."""
+    if created:
+        return
+    # Masalan login'dagi last_login yangilanishi qidiruv hujjatiga ta'sir qilmaydi
+    if update_fields is not None and not set(update_fields) & set(search.BUYER_FIELDS):
+        return
+    search.index_buyer_orders(instance)
@@ -0,0 +1,88 @@
+# orders/stream.py
+
+"""WebSocket hodisalari uchun ketma-ketlik raqamlari va qisqa jurnal.
+
+Har bir guruh (``user_{id}``, ``sellers``) alohida oqim: yuborishdan oldin
+xabarga oqim ichidagi ``seq`` beriladi va xabar cache'da
+``ORDER_EVENT_LOG_SIZE`` ta / ``ORDER_EVENT_LOG_TTL`` soniya saqlanadi.
+Qayta ulangan mijoz oxirgi ko'rgan ``seq`` ni yuboradi va faqat o'tkazib
+yuborilganlarini oladi; oraliq jurnalda bo'lmasa - to'liq qayta yuklash.
+
+Hisoblagich va jurnal umumiy cache'da (``CACHE_URL``, standart ``REDIS_URL``):
+``sellers`` oqimiga daphne publisher'i ham, Celery'dagi outbox relay ham
+yozadi. ``CACHE_URL=locmem`` bo'lsa har bir jarayonning hisoblagichi
+alohida bo'lib ``seq`` lar to'qnashardi, shuning uchun u holda ``seq``
+berilmaydi va resume o'chadi (mijoz har ulanishda ro'yxatni qayta yuklaydi).
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Mijozga ko'rinadigan oqim nomi: shaxsiy guruh doim "user"
+SELLERS = 'sellers'
+USER = 'user'
+
+
+def label(group):
+    return SELLERS if group == SELLERS else USER
+
+
+_warned = False
+
+
+def enabled():
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _seq_key(group):
+    return f'orders:stream:{group}:seq'
+
+
+def _event_key(group, seq):
+    return f'orders:stream:{group}:{seq}'
+
+
+def stamp(group, message):
+    """Xabarga navbatdagi ``seq`` ni berib jurnalga yozish; yangi nusxani qaytaradi."""
+    global _warned
+    if not enabled():
+        if not _warned:
+            _warned = True
+            logger.warning("Cache umumiy emas (CACHE_URL=locmem): WebSocket seq va resume o'chirilgan")
+        return message
+    cache.add(_seq_key(group), 0, timeout=None)
+    seq = cache.incr(_seq_key(group))
+    stamped = {**message, 'stream': label(group), 'seq': seq}
+    cache.set(_event_key(group, seq), stamped, timeout=settings.ORDER_EVENT_LOG_TTL)
+    # Jurnal uzunligi chegaralangan: eng eskisini o'chiramiz
+    cache.delete(_event_key(group, seq - settings.ORDER_EVENT_LOG_SIZE))
+    return stamped
+
+
+def current(group):
+    return cache.get(_seq_key(group)) or 0
+
+
+def since(group, last_seq):
+    """``last_seq`` dan keyingi xabarlar ro'yxati yoki ``None`` (oraliq jurnalda yo'q).
+
+    ``(messages, current_seq)`` qaytaradi.
+    """
+    if not enabled():
+        return None, 0
+    head = current(group)
+    if last_seq == head:
+        return [], head
+    # Hisoblagich qayta boshlangan (cache tozalangan) yoki oraliq juda katta
+    if last_seq > head or head - last_seq > settings.ORDER_EVENT_LOG_SIZE:
+        return None, head
+    keys = [_event_key(group, seq) for seq in range(last_seq + 1, head + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        # TTL bo'yicha o'chib ketgan
+        return None, head
+    return [found[key] for key in keys], head
@@ -1,11 +1,15 @@
 # orders/tasks.py
 
-import pandas as pd
-from celery import shared_task
+from celery import shared_task, chord
 from django.utils import timezone
 from .models import Order, OrderReport
 import os
 from .services import TelegramService
+from . import digest, outbox
+from .reports import (
+    REPORTS_DIR, REPORT_COLUMNS, DAILY_COLUMNS, completed_items, iter_rows, write_xlsx,
+    partition_window, partition_path, write_partition, read_partitions, remove_partitions,
+)
 from django.conf import settings
 import logging
 
@@ -17,39 +21,19 @@ def generate_daily_report():
     Shu kungi bajarilgan (completed) buyurtmalar bo'yicha kunlik Excel-hisobot yaratadi.
     """
     today = timezone.now().date()
-    # Statusi 'completed' va yakunlangan vaqti bugungi sana bo'lgan buyurtmalarni olamiz
-    completed_orders = Order.objects.filter(
-        status='completed',
-        updated_at__date=today
-    ).select_related('buyer').prefetch_related('items__product')
+    # Statusi 'completed' va yakunlangan vaqti bugungi sana bo'lgan buyurtma pozitsiyalari
+    items = completed_items(start_date=today, end_date=today)
 
-    if not completed_orders.exists():
+    if not items.exists():
         return f"{today} sanasida yakunlangan buyurtmalar mavjud emas."
 
-    report_data = []
-    for order in completed_orders:
-        for item in order.items.all():
-            report_data.append({
-                'Buyurtma Raqami': order.order_number,
-                'Xaridor': f"{order.buyer.first_name} {order.buyer.last_name}",
-                'Telefon': order.buyer.phone_number,
-                'Manzil': order.buyer.address,
-                'Mahsulot': item.product.name,
-                'Miqdori (kg)': float(item.quantity_kg), # Excel uchun float'ga o'tkazamiz
-                'Buyurtma Vaqti': order.created_at.strftime('%Y-%m-%d %H:%M'),
-                'Yakunlangan Vaqti': order.updated_at.strftime('%Y-%m-%d %H:%M'),
-            })
-    
-    # Pandas DataFrame yaratamiz
-    df = pd.DataFrame(report_data)
-    
     # Fayl nomini va yo'lini tayyorlaymiz
     filename = f"kunlik_hisobot_{today}.xlsx"
-    filepath = os.path.join('reports', filename)
-    
-    # Excel fayliga saqlaymiz
-    df.to_excel(filepath, index=False, engine='openpyxl')
-    
+    filepath = os.path.join(REPORTS_DIR, filename)
+
+    # Excel fayliga oqim bilan yozamiz (xotira sarfi doimiy)
+    write_xlsx(filepath, DAILY_COLUMNS, iter_rows(items, with_address=True))
+
     return f"Hisobot muvaffaqiyatli yaratildi: {filepath}"
 
 
@@ -66,8 +50,9 @@ def send_order_telegram_notification(self, order_id: int):
         order = Order.objects.select_related('buyer').prefetch_related('items__product').get(id=order_id)
         service = TelegramService()
         resp = service.send_order_notification(order)
-        if not resp:
+        if not resp or not resp.get('ok'):
             raise ValueError("Telegram javobi bo'sh yoki xatolik.")
+        Order.objects.filter(id=order_id).update(telegram_sent_at=timezone.now())
         return "SENT"
     except Order.DoesNotExist:
         logger.error(f"Order {order_id} topilmadi – Telegram xabari yuborilmadi")
@@ -82,52 +67,61 @@ def send_order_telegram_notification(self, order_id: int):
         return "RETRYING"
 
 
+@shared_task(bind=True, max_retries=5)
+def flush_telegram_digest(self):
+    """Navbatdagi buyurtmalarni bitta digest xabar sifatida yuborish (tezlik cheklovi bilan)."""
+    if settings.TELEGRAM_DIGEST_WINDOW <= 0:
+        # Digest o'chirilgan: buyurtmalarni send_order_telegram_notification yuboradi
+        return "DISABLED"
+    status, retry_in = digest.flush_digest()
+    if status == 'MORE':
+        flush_telegram_digest.apply_async(countdown=retry_in)
+    elif status == 'RETRY':
+        try:
+            self.retry(countdown=retry_in)
+        except self.MaxRetriesExceededError:
+            # Buyurtmalar navbatda qoladi, beat'dagi davriy flush ularni oladi
+            logger.error("Telegram digest: max retries tugadi")
+            return "FAILED"
+    return status
+
+
+@shared_task
+def relay_outbox():
+    """Outbox navbatini partiyalab yuborish (beat orqali davriy)."""
+    return outbox.drain()
+
+
 @shared_task(bind=True)
 def generate_order_report(self, report_id: int):
     """OrderReport yozuvi bo'yicha Excel fayl yaratish (daily yoki date range)."""
     try:
         report = OrderReport.objects.get(id=report_id)
-        qs = Order.objects.filter(status='completed').select_related('buyer').prefetch_related('items__product')
+        if report.report_type == 'range' and report.start_date and report.end_date:
+            windows = partition_window(report.start_date, report.end_date)
+            if len(windows) > 1:
+                # Har bir kun/hafta alohida task'da, yakunida bitta workbook'ga yig'iladi
+                header = [
+                    render_report_partition.s(report.id, index, start.isoformat(), end.isoformat())
+                    for index, (start, end) in enumerate(windows)
+                ]
+                callback = assemble_order_report.s(report.id).on_error(mark_report_failed.s(report.id))
+                chord(header)(callback)
+                return 'PARTITIONED'
+
         if report.report_type == 'daily' and report.start_date:
-            qs = qs.filter(updated_at__date=report.start_date)
+            items = completed_items(start_date=report.start_date, end_date=report.start_date)
         elif report.report_type == 'range' and report.start_date and report.end_date:
-            qs = qs.filter(updated_at__date__gte=report.start_date, updated_at__date__lte=report.end_date)
-
-        if not qs.exists():
-            # Produce an empty, but valid report file and still mark as ready (test expectation)
-            df = pd.DataFrame(columns=[
-                'Order #', 'Buyer', 'Phone', 'Product', 'Qty (kg)', 'Created', 'Completed'
-            ])
-            os.makedirs('reports', exist_ok=True)
-            filename = f"report_{report.id}.xlsx"
-            filepath = os.path.join('reports', filename)
-            df.to_excel(filepath, index=False, engine='openpyxl')
-            report.file_path = filepath
-            report.status = 'ready'
-            report.error_message = ''
-            report.save()
-            return 'READY'
-
-        data_rows = []
-        for order in qs:
-            for item in order.items.all():
-                data_rows.append({
-                    'Order #': order.order_number,
-                    'Buyer': f"{order.buyer.first_name} {order.buyer.last_name}",
-                    'Phone': order.buyer.phone_number,
-                    'Product': item.product.name,
-                    'Qty (kg)': float(item.quantity_kg),
-                    'Created': order.created_at.strftime('%Y-%m-%d %H:%M'),
-                    'Completed': order.updated_at.strftime('%Y-%m-%d %H:%M'),
-                })
-
-        df = pd.DataFrame(data_rows)
-        os.makedirs('reports', exist_ok=True)
-        filename = f"report_{report.id}.xlsx"
-        filepath = os.path.join('reports', filename)
-        df.to_excel(filepath, index=False, engine='openpyxl')
+            items = completed_items(start_date=report.start_date, end_date=report.end_date)
+        else:
+            items = completed_items()
+
+        # Bo'sh natijada ham sarlavhali, yaroqli fayl yaratiladi
+        filepath = os.path.join(REPORTS_DIR, f"report_{report.id}.xlsx")
+        write_xlsx(filepath, REPORT_COLUMNS, iter_rows(items))
         report.file_path = filepath
         report.status = 'ready'
+        report.error_message = ''
         report.save()
         return 'READY'
     except OrderReport.DoesNotExist:
@@ -141,4 +135,40 @@ def generate_order_report(self, report_id: int):
             report.save()
         except Exception:
             pass
-        return 'FAILED'
\ No newline at end of file
+        return 'FAILED'
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def render_report_partition(self, report_id: int, index: int, start_date: str, end_date: str):
+    """Range hisobotning bitta bo'lagini (kun yoki hafta) oraliq faylga yozish."""
+    path = partition_path(report_id, index)
+    if os.path.exists(path):
+        # Chord qayta ishga tushirilganda tayyor bo'laklar qayta hisoblanmaydi
+        return path
+    try:
+        write_partition(path, iter_rows(completed_items(start_date, end_date)))
+    except Exception as e:
+        logger.error(f"Report {report_id} partition {index} failed: {e}")
+        raise self.retry(exc=e)
+    return path
+
+
+@shared_task
+def assemble_order_report(part_paths, report_id: int):
+    """Chord callback: bo'laklarni bitta Excel faylga birlashtirish."""
+    report = OrderReport.objects.get(id=report_id)
+    filepath = os.path.join(REPORTS_DIR, f"report_{report.id}.xlsx")
+    write_xlsx(filepath, REPORT_COLUMNS, read_partitions(part_paths))
+    report.file_path = filepath
+    report.status = 'ready'
+    report.error_message = ''
+    report.save()
+    remove_partitions(report_id)
+    return 'READY'
+
+
+@shared_task
+def mark_report_failed(request, exc, traceback, report_id: int):
+    """Chord errback: bo'lak yoki yig'ish muvaffaqiyatsiz bo'lsa hisobotni 'failed' qilish."""
+    logger.error(f"Report {report_id} generation failed: {exc}")
+    OrderReport.objects.filter(id=report_id).update(status='failed', error_message=str(exc))
@@ -17,7 +17,7 @@ class OrderRoleTests(TestCase):
 		self.seller = User.objects.create_user(username='seller1', password='sellerpass', role='seller')
 		self.buyer1 = User.objects.create_user(username='buyer1', password='buyerpass', role='buyer')
 		self.buyer2 = User.objects.create_user(username='buyer2', password='buyerpass', role='buyer')
-		self.product = Product.objects.create(name='Leg A', product_type='leg', description='d')
+		self.product = Product.objects.create(name='Leg A', product_type='leg', description='d', stock_kg=100)
 		self.client = APIClient()
 
 	def auth(self, user):
@@ -73,7 +73,7 @@ class OrderStatusTransitionTests(TestCase):
 	def setUp(self):
 		self.seller = User.objects.create_user(username='seller', password='pass', role='seller')
 		self.buyer = User.objects.create_user(username='buyer', password='pass', role='buyer')
-		self.product = Product.objects.create(name='Wing', product_type='wing')
+		self.product = Product.objects.create(name='Wing', product_type='wing', stock_kg=100)
 		self.client = APIClient()
 		self.client.force_authenticate(self.seller)
 		# create order as buyer first
@@ -123,7 +123,7 @@ class TelegramTaskTests(TestCase):
 		self.order = Order.objects.create(buyer=self.user)
 		OrderItem.objects.create(order=self.order, product=self.product, quantity_kg='1.0')
 
-	@patch('orders.services.requests.post')
+	@patch('orders.services.requests.Session.post')
 	def test_telegram_task_sends(self, mock_post):
 		mock_post.return_value = MagicMock(status_code=200, json=lambda: {'ok': True})
 		result = send_order_telegram_notification.run(order_id=self.order.id)
@@ -148,12 +148,69 @@ class ReportTaskTests(TestCase):
 		self.assertEqual(r.status, 'ready')
 		self.assertEqual(res, 'READY')
 
+	def test_report_file_rows(self):
+		from openpyxl import load_workbook
+		r = OrderReport.objects.create(created_by=self.seller, report_type='range', start_date=timezone.now().date(), end_date=timezone.now().date(), file_path='', status='pending')
+		generate_order_report.run(report_id=r.id)
+		r.refresh_from_db()
+		rows = list(load_workbook(r.file_path, read_only=True).active.values)
+		self.assertEqual(rows[0], ('Order #', 'Buyer', 'Phone', 'Product', 'Qty (kg)', 'Created', 'Completed'))
+		self.assertEqual(len(rows), 2)
+		self.assertEqual(rows[1][3], 'Breast')
+		self.assertEqual(rows[1][4], 3.0)
+
+	def test_range_report_partitioned(self):
+		from openpyxl import load_workbook
+		from datetime import timedelta
+		from .reports import PARTS_DIR
+		import os
+		today = timezone.now().date()
+		r = OrderReport.objects.create(created_by=self.seller, report_type='range', start_date=today - timedelta(days=2), end_date=today, file_path='', status='pending')
+		res = generate_order_report.run(report_id=r.id)
+		self.assertEqual(res, 'PARTITIONED')
+		r.refresh_from_db()
+		self.assertEqual(r.status, 'ready')
+		rows = list(load_workbook(r.file_path, read_only=True).active.values)
+		self.assertEqual(len(rows), 2)
+		self.assertEqual(rows[1][4], 3.0)
+		self.assertFalse(os.path.exists(os.path.join(PARTS_DIR, f'report_{r.id}')))
+
+	def test_partitioned_rows_match_single_task_order(self):
+		from datetime import timedelta
+		from openpyxl import load_workbook
+		from .reports import completed_items, iter_rows
+		buyer = User.objects.get(username='buyer')
+		product = Product.objects.get(name='Breast')
+		now = timezone.now()
+		# Eng eski yaratilgan buyurtma eng oxirida yakunlangan
+		for days_ago in (2, 1, 0):
+			order = Order.objects.create(buyer=buyer, status='completed')
+			OrderItem.objects.create(order=order, product=product, quantity_kg=f'{days_ago + 1}.0')
+			Order.objects.filter(id=order.id).update(updated_at=now - timedelta(days=days_ago, minutes=1), created_at=now - timedelta(days=5 - days_ago))
+		today = timezone.localdate()
+		start = today - timedelta(days=2)
+		single = [tuple(row) for row in iter_rows(completed_items(start, today))]
+		r = OrderReport.objects.create(created_by=self.seller, report_type='range', start_date=start, end_date=today, file_path='', status='pending')
+		self.assertEqual(generate_order_report.run(report_id=r.id), 'PARTITIONED')
+		r.refresh_from_db()
+		partitioned = list(load_workbook(r.file_path, read_only=True).active.values)[1:]
+		self.assertEqual(len(single), 4)
+		self.assertEqual(partitioned, single)
+
+	def test_partition_window(self):
+		from datetime import date
+		from .reports import partition_window
+		self.assertEqual(len(partition_window(date(2025, 1, 1), date(2025, 1, 31))), 31)
+		weeks = partition_window(date(2025, 1, 1), date(2025, 3, 1))
+		self.assertEqual(weeks[0], (date(2025, 1, 1), date(2025, 1, 7)))
+		self.assertEqual(weeks[-1][1], date(2025, 3, 1))
+
 
 class StatsAndPaginationTests(TestCase):
 	def setUp(self):
 		self.seller = User.objects.create_user(username='seller', password='pass', role='seller')
 		self.buyer = User.objects.create_user(username='buyer', password='pass', role='buyer')
-		self.product = Product.objects.create(name='Wing', product_type='wing')
+		self.product = Product.objects.create(name='Wing', product_type='wing', stock_kg=100)
 		self.client = APIClient()
 		# create multiple orders
 		buyer_client = APIClient()
@@ -181,6 +238,29 @@ class StatsAndPaginationTests(TestCase):
 		self.assertEqual(len(resp.data['results']), 20)
 		self.assertGreater(resp.data['count'], 20)
 
+	def test_cursor_pagination_walks_all_orders(self):
+		self.client.force_authenticate(self.seller)
+		resp = self.client.get('/api/orders/?pagination=cursor&page_size=20')
+		self.assertEqual(resp.status_code, 200)
+		self.assertNotIn('count', resp.data)
+		self.assertIsNone(resp.data['previous'])
+		first_ids = [o['id'] for o in resp.data['results']]
+		self.assertEqual(len(first_ids), 20)
+		resp2 = self.client.get(resp.data['next'])
+		second_ids = [o['id'] for o in resp2.data['results']]
+		self.assertEqual(len(second_ids), 15)
+		self.assertIsNone(resp2.data['next'])
+		expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+		self.assertEqual(first_ids + second_ids, expected)
+		back = self.client.get(resp2.data['previous'])
+		self.assertEqual([o['id'] for o in back.data['results']], first_ids)
+		self.assertIsNone(back.data['previous'])
+
+	def test_invalid_cursor(self):
+		self.client.force_authenticate(self.seller)
+		resp = self.client.get('/api/orders/?cursor=not-a-cursor')
+		self.assertEqual(resp.status_code, 404)
+
 	def test_stats_endpoint(self):
 		self.client.force_authenticate(self.seller)
 		resp = self.client.get('/api/orders/stats/')
@@ -239,6 +319,27 @@ class StockManagementTests(TestCase):
 		self.assertEqual(r_cancel.status_code, 400)
 		self.product.refresh_from_db(); self.assertEqual(str(self.product.stock_kg), '90.00')
 
+	def test_transition_checked_on_locked_row(self):
+		order_id = self._create_order(10)
+		stale = Order.objects.get(id=order_id)
+		# Parallel so'rov allaqachon bekor qilgan; bu so'rov eski (pending) nusxani ko'rgan
+		self.auth(self.seller)
+		self.assertEqual(self.client.patch(f'/api/orders/{order_id}/update_status/', {'status': 'cancelled'}, format='json').status_code, 200)
+		with patch('orders.views.OrderViewSet.get_object', return_value=stale):
+			r = self.client.patch(f'/api/orders/{order_id}/update_status/', {'status': 'cancelled'}, format='json')
+		self.assertEqual(r.status_code, 400)
+		self.product.refresh_from_db(); self.assertEqual(str(self.product.stock_kg), '100.00')
+		self.assertEqual(self.client.get('/api/orders/stats/').data['status_breakdown'], {'cancelled': 1})
+
+	def test_generic_update_and_delete_not_allowed(self):
+		order_id = self._create_order(10)
+		buyer_client = APIClient()
+		buyer_client.force_authenticate(self.buyer)
+		self.assertEqual(buyer_client.delete(f'/api/orders/{order_id}/').status_code, 405)
+		self.assertEqual(buyer_client.patch(f'/api/orders/{order_id}/', {'status': 'completed'}, format='json').status_code, 405)
+		self.assertEqual(buyer_client.put(f'/api/orders/{order_id}/', {'status': 'completed'}, format='json').status_code, 405)
+		self.assertTrue(Order.objects.filter(id=order_id, status='pending').exists())
+
 	def test_insufficient_stock_validation(self):
 		buyer_client = APIClient(); buyer_client.force_authenticate(self.buyer)
 		resp = buyer_client.post('/api/orders/', {
@@ -246,3 +347,128 @@ class StockManagementTests(TestCase):
 		}, format='json')
 		self.assertEqual(resp.status_code, 400)
 		self.assertIn('stock_kg', str(resp.data))
+
+	def test_multi_line_order_single_write(self):
+		other = Product.objects.create(name='Stock Prod 2', product_type='wing', stock_kg=50)
+		buyer_client = APIClient(); buyer_client.force_authenticate(self.buyer)
+		resp = buyer_client.post('/api/orders/', {
+			'items': [
+				{'product': self.product.id, 'quantity_kg': '10.00'},
+				{'product': other.id, 'quantity_kg': '5.00'},
+				{'product': self.product.id, 'quantity_kg': '2.50'},
+			]
+		}, format='json')
+		self.assertEqual(resp.status_code, 201)
+		order = Order.objects.get(id=resp.data['id'])
+		self.assertEqual(str(order.total_weight), '17.50')
+		self.assertEqual(order.items.count(), 3)
+		self.product.refresh_from_db(); other.refresh_from_db()
+		self.assertEqual(str(self.product.stock_kg), '87.50')
+		self.assertEqual(str(other.stock_kg), '45.00')
+
+	def test_insufficient_later_line_rolls_back(self):
+		other = Product.objects.create(name='Stock Prod 3', product_type='wing', stock_kg=1)
+		buyer_client = APIClient(); buyer_client.force_authenticate(self.buyer)
+		resp = buyer_client.post('/api/orders/', {
+			'items': [
+				{'product': self.product.id, 'quantity_kg': '10.00'},
+				{'product': other.id, 'quantity_kg': '5.00'},
+			]
+		}, format='json')
+		self.assertEqual(resp.status_code, 400)
+		self.assertEqual(Order.objects.count(), 0)
+		self.assertEqual(OrderItem.objects.count(), 0)
+		self.product.refresh_from_db(); other.refresh_from_db()
+		self.assertEqual(str(self.product.stock_kg), '100.00')
+		self.assertEqual(str(other.stock_kg), '1.00')
+
+	def test_sharded_product_order_and_cancel(self):
+		from products import stock
+		stock.configure_shards(self.product, 4)
+		order_id = self._create_order(30)
+		self.product.refresh_from_db()
+		self.assertEqual(str(stock.available(self.product)), '70.00')
+		self.auth(self.seller)
+		rc = self.client.patch(f'/api/orders/{order_id}/update_status/', {'status': 'cancelled'}, format='json')
+		self.assertEqual(rc.status_code, 200)
+		self.assertEqual(str(stock.available(self.product)), '100.00')
+
+
+class BulkStatusUpdateTests(TestCase):
+	def setUp(self):
+		self.seller = User.objects.create_user(username='bulkseller', password='pass', role='seller')
+		self.buyer1 = User.objects.create_user(username='bulkbuyer1', password='pass', role='buyer')
+		self.buyer2 = User.objects.create_user(username='bulkbuyer2', password='pass', role='buyer')
+		self.product = Product.objects.create(name='Bulk Leg', product_type='leg', stock_kg=100)
+		self.client = APIClient()
+		self.orders = []
+		for buyer in [self.buyer1, self.buyer1, self.buyer2]:
+			buyer_client = APIClient(); buyer_client.force_authenticate(buyer)
+			resp = buyer_client.post('/api/orders/', {'items': [{'product': self.product.id, 'quantity_kg': '10.00'}]}, format='json')
+			self.assertEqual(resp.status_code, 201)
+			self.orders.append(resp.data['id'])
+		self.client.force_authenticate(self.seller)
+
+	def _bulk(self, ids, status):
+		return self.client.post('/api/orders/bulk_update_status/', {'ids': ids, 'status': status}, format='json')
+
+	def test_bulk_transition_reports_rejected(self):
+		Order.objects.filter(id=self.orders[2]).update(status='shipping')
+		resp = self._bulk(self.orders + [999999], 'reviewing')
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.data['updated'], self.orders[:2])
+		self.assertEqual(sorted(r['id'] for r in resp.data['rejected']), [self.orders[2], 999999])
+		self.assertEqual(Order.objects.filter(status='reviewing').count(), 2)
+		self.assertEqual(Order.objects.get(id=self.orders[2]).status, 'shipping')
+
+	def test_bulk_cancel_restores_stock(self):
+		self.product.refresh_from_db(); self.assertEqual(str(self.product.stock_kg), '70.00')
+		resp = self._bulk(self.orders, 'cancelled')
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(len(resp.data['updated']), 3)
+		self.product.refresh_from_db(); self.assertEqual(str(self.product.stock_kg), '100.00')
+
+	def test_bulk_groups_notifications_per_buyer(self):
+		with patch('orders.views.publisher._enqueue') as mock_enqueue, self.captureOnCommitCallbacks(execute=True):
+			resp = self._bulk(self.orders, 'reviewing')
+		self.assertEqual(resp.status_code, 200)
+		messages = mock_enqueue.call_args[0][0]
+		self.assertEqual(len(messages), 3)
+		groups = {group: len(msg['deltas']) for group, msg in messages}
+		self.assertEqual(groups, {f'user_{self.buyer1.id}': 2, f'user_{self.buyer2.id}': 1, 'sellers': 3})
+
+	def test_bulk_validation_and_permissions(self):
+		self.assertEqual(self._bulk([], 'reviewing').status_code, 400)
+		self.assertEqual(self._bulk(self.orders, 'unknown').status_code, 400)
+		buyer_client = APIClient(); buyer_client.force_authenticate(self.buyer1)
+		resp = buyer_client.post('/api/orders/bulk_update_status/', {'ids': self.orders, 'status': 'reviewing'}, format='json')
+		self.assertEqual(resp.status_code, 403)
+
+
+class OrderAdminTests(TestCase):
+	"""Admin buyurtmani faqat ko'rsatadi: status, tarkib va o'chirish rollup'ni chetlab o'tmasin."""
+	def setUp(self):
+		User = get_user_model()
+		self.admin = User.objects.create_superuser(username='orderadmin', password='pass', email='a@example.com')
+		buyer = User.objects.create_user(username='adminbuyer', password='pass', role='buyer')
+		self.product = Product.objects.create(name='Admin Leg', product_type='leg', stock_kg=100)
+		self.order = Order.objects.create(buyer=buyer, total_weight=5)
+		OrderItem.objects.create(order=self.order, product=self.product, quantity_kg=5)
+		self.client.force_login(self.admin)
+
+	def test_status_and_items_are_read_only(self):
+		url = f'/admin/orders/order/{self.order.id}/change/'
+		self.assertEqual(self.client.get(url).status_code, 200)
+		resp = self.client.post(url, {'status': 'cancelled', 'notes': 'admin izohi', 'items-TOTAL_FORMS': '0',
+			'items-INITIAL_FORMS': '0'})
+		self.assertEqual(resp.status_code, 302)
+		self.order.refresh_from_db()
+		self.assertEqual(self.order.status, 'pending')
+		self.assertEqual(self.order.notes, 'admin izohi')
+		self.assertEqual(self.order.items.count(), 1)
+
+	def test_add_and_delete_disabled(self):
+		self.assertEqual(self.client.get('/admin/orders/order/add/').status_code, 403)
+		self.assertEqual(self.client.post(f'/admin/orders/order/{self.order.id}/delete/', {'post': 'yes'}).status_code, 403)
+		self.client.post('/admin/orders/order/', {'action': 'delete_selected', '_selected_action': [self.order.id]})
+		self.assertTrue(Order.objects.filter(id=self.order.id).exists())
@@ -0,0 +1,251 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from products.models import Product
+from . import digest, outbox
+from .services import TelegramService, close_session
+from .models import Order, OrderItem
+from .tasks import flush_telegram_digest
+
+User = get_user_model()
+
+
+class StubTelegramServer:
+    """Telegram Bot API o'rnida ishlaydigan lokal HTTP server (so'rovlarni yozib boradi)."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.client_ports = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive: bitta ulanishda bir nechta so'rov
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                stub.client_ports.append(self.client_address[1])
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                stub.requests.append((self.path, {k: v[0] for k, v in parse_qs(body).items()}))
+                status, payload = stub.responses.pop(0) if stub.responses else (200, {'ok': True, 'result': {}})
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TelegramDigestTests(TestCase):
+    def setUp(self):
+        cache.delete_many([digest.SCHEDULED_KEY, digest.BUCKET_KEY])
+        self.stub = StubTelegramServer().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        self.addCleanup(close_session)
+        override = override_settings(
+            TESTING=False, TELEGRAM_API_URL=self.stub.url, TELEGRAM_BOT_TOKEN='tok', TELEGRAM_CHAT_ID='42',
+            TELEGRAM_DIGEST_WINDOW=5, TELEGRAM_RATE_PER_SECOND=1, TELEGRAM_RATE_BURST=3,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.buyer = User.objects.create_user(username='buyer_digest', password='pass', role='buyer',
+                                              first_name='Ali', phone_number='+998901234567', address='Toshkent')
+        self.product = Product.objects.create(name='Digest Leg', product_type='leg', stock_kg=100)
+
+    def _order(self, notes=''):
+        order = Order.objects.create(buyer=self.buyer, total_weight='1.00', notes=notes)
+        OrderItem.objects.create(order=order, product=self.product, quantity_kg='1.00')
+        return order
+
+    def test_orders_in_window_sent_as_one_digest(self):
+        with patch('orders.tasks.flush_telegram_digest.apply_async') as scheduled:
+            orders = [self._order() for _ in range(3)]
+            for order in orders:
+                digest.schedule_order_notification(order.id)
+        scheduled.assert_called_once_with(countdown=5)
+        self.assertEqual(self.stub.requests, [])
+
+        self.assertEqual(digest.flush_digest(), ('SENT', None))
+        self.assertEqual(len(self.stub.requests), 1)
+        path, form = self.stub.requests[0]
+        self.assertEqual(path, '/bottok/sendMessage')
+        self.assertEqual(form['chat_id'], '42')
+        self.assertIn('3 ta yangi buyurtma', form['text'])
+        for order in orders:
+            self.assertIn(order.order_number, form['text'])
+        self.assertFalse(Order.objects.filter(telegram_sent_at__isnull=True).exists())
+        self.assertEqual(digest.flush_digest(), ('EMPTY', None))
+
+    def test_created_order_is_not_sent_inline(self):
+        client = APIClient(); client.force_authenticate(self.buyer)
+        with patch('orders.tasks.flush_telegram_digest.apply_async') as scheduled:
+            resp = client.post('/api/orders/', {'items': [{'product': self.product.id, 'quantity_kg': '1.00'}]}, format='json')
+            self.assertEqual(resp.status_code, 201)
+            scheduled.assert_not_called()
+            # Outbox relay digest flush'ini rejalashtiradi
+            outbox.relay()
+        scheduled.assert_called_once()
+        self.assertEqual(self.stub.requests, [])
+        self.assertTrue(Order.objects.filter(id=resp.data['id'], telegram_sent_at__isnull=True).exists())
+
+    def test_rate_limited_response_requeues(self):
+        order = self._order()
+        self.stub.responses.append((429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': 7}}))
+        self.assertEqual(digest.flush_digest(), ('RETRY', 7))
+        order.refresh_from_db()
+        self.assertIsNone(order.telegram_sent_at)
+        self.assertEqual(digest.flush_digest(), ('SENT', None))
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_rejected_order_does_not_block_queue(self):
+        poison, normal = self._order('poison'), self._order()
+        # Digest rad etiladi, keyin poison yakka holda ham; normal buyurtma alohida ketadi
+        self.stub.responses += [
+            (400, {'ok': False, 'error_code': 400, 'description': "Bad Request: can't parse entities"}),
+            (400, {'ok': False, 'error_code': 400, 'description': "Bad Request: can't parse entities"}),
+        ]
+        self.assertEqual(digest.flush_digest(), ('SENT', None))
+        texts = [form['text'] for _, form in self.stub.requests]
+        self.assertEqual(len(texts), 3)
+        self.assertIn('poison', texts[1])
+        self.assertIn(normal.order_number, texts[2])
+        self.assertNotIn('poison', texts[2])
+        self.assertFalse(Order.objects.filter(id__in=[poison.id, normal.id], telegram_sent_at__isnull=True).exists())
+        self.assertEqual(digest.flush_digest(), ('EMPTY', None))
+
+    def test_server_error_requeues(self):
+        order = self._order()
+        self.stub.responses.append((502, {'ok': False, 'error_code': 502}))
+        self.assertEqual(digest.flush_digest(), ('RETRY', digest.DEFAULT_RETRY_AFTER))
+        order.refresh_from_db()
+        self.assertIsNone(order.telegram_sent_at)
+
+    def test_crash_after_claim_is_retried_after_lease(self):
+        order = self._order()
+        with patch.object(TelegramService, 'send_message', side_effect=RuntimeError('worker killed')):
+            with self.assertRaises(RuntimeError):
+                digest.flush_digest()
+        order.refresh_from_db()
+        self.assertIsNone(order.telegram_sent_at)
+        self.assertIsNotNone(order.telegram_claimed_at)
+        # Lease hali tugamagan: boshqa flush buyurtmani olmaydi
+        self.assertEqual(digest.flush_digest(), ('EMPTY', None))
+        Order.objects.filter(id=order.id).update(
+            telegram_claimed_at=order.telegram_claimed_at - timedelta(seconds=digest.CLAIM_LEASE + 1))
+        self.assertEqual(digest.flush_digest(), ('SENT', None))
+        order.refresh_from_db()
+        self.assertIsNotNone(order.telegram_sent_at)
+        self.assertIsNone(order.telegram_claimed_at)
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_beat_flush_only_with_digest_window(self):
+        from celery import Celery
+        from chicken_store.celery import schedule_telegram_digest_flush
+
+        for window, scheduled in ((5, True), (0, False)):
+            app = Celery('digest-beat-test', set_as_current=False)
+            with override_settings(TELEGRAM_DIGEST_WINDOW=window):
+                schedule_telegram_digest_flush(app)
+            self.assertEqual('flush-telegram-digest-every-minute' in app.conf.beat_schedule, scheduled)
+
+    @override_settings(TELEGRAM_DIGEST_WINDOW=0)
+    def test_flush_task_disabled_without_window(self):
+        order = self._order()
+        self.assertEqual(flush_telegram_digest.apply().get(), 'DISABLED')
+        order.refresh_from_db()
+        self.assertIsNone(order.telegram_claimed_at)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_oversized_order_is_truncated(self):
+        # Ekranlangandan keyin ~9000 belgi
+        order = self._order('a.' * 3000 + 'oxiri')
+        self.assertEqual(digest.flush_digest(), ('SENT', None))
+        text = self.stub.requests[0][1]['text']
+        self.assertLessEqual(len(text), digest.MESSAGE_LIMIT)
+        self.assertIn(order.order_number, text)
+        self.assertTrue(text.endswith(digest.TRUNCATED_SUFFIX))
+        body = text[:-len(digest.TRUNCATED_SUFFIX)]
+        self.assertEqual((len(body) - len(body.rstrip('\\'))) % 2, 0)
+
+    def test_backslash_is_escaped(self):
+        order = self._order('C:\\yol')
+        self.assertIn('C:\\\\yol', TelegramService().format_order_message(order))
+
+    def test_token_bucket_defers_remaining_chunks(self):
+        # Har biri ~3000 belgili izoh: ikki buyurtma bitta xabarga sig'maydi
+        first, second = self._order('a' * 3000), self._order('b' * 3000)
+        bucket = digest.TokenBucket(key='telegram:test-bucket', rate=0.01, capacity=1)
+        cache.delete('telegram:test-bucket')
+        status, retry_in = digest.flush_digest(bucket=bucket)
+        self.assertEqual(status, 'RETRY')
+        self.assertGreater(retry_in, digest.MAX_INLINE_WAIT)
+        self.assertEqual(len(self.stub.requests), 1)
+        first.refresh_from_db(); second.refresh_from_db()
+        self.assertIsNotNone(first.telegram_sent_at)
+        self.assertIsNone(second.telegram_sent_at)
+
+    def test_token_bucket(self):
+        bucket = digest.TokenBucket(key='telegram:unit-bucket', rate=10, capacity=2)
+        cache.delete('telegram:unit-bucket')
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        wait = bucket.acquire()
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+
+    def test_build_messages_respects_limit(self):
+        bodies = [(i, 'x' * 1500) for i in range(5)]
+        messages = digest.build_messages(bodies)
+        self.assertEqual([ids for ids, _ in messages], [[0, 1], [2, 3], [4]])
+        self.assertTrue(all(len(text) <= digest.MESSAGE_LIMIT for _, text in messages))
+        self.assertEqual(messages[-1][1], 'x' * 1500)
+
+
+class TelegramClientPoolTests(TestCase):
+    def setUp(self):
+        self.stub = StubTelegramServer().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        override = override_settings(
+            TESTING=False, TELEGRAM_API_URL=self.stub.url, TELEGRAM_BOT_TOKEN='tok', TELEGRAM_CHAT_ID='42',
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        close_session()
+        self.addCleanup(close_session)
+
+    def test_connection_reused_across_services(self):
+        for i in range(3):
+            # Har safar yangi servis obyekti, lekin sessiya (va ulanish) umumiy
+            self.assertTrue(TelegramService().send_message(f'salom {i}')['ok'])
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(len(set(self.stub.client_ports)), 1)
+
+    def test_async_send(self):
+        resp = async_to_sync(TelegramService().asend_message)('async salom')
+        self.assertTrue(resp['ok'])
+        self.assertEqual(self.stub.requests[0][1]['text'], 'async salom')
@@ -1,8 +1,10 @@
+import os
+from unittest.mock import patch
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from products.models import Product
-from orders.models import OrderReport
+from orders.models import Order, OrderItem, OrderReport
 from django.utils import timezone
 
 User = get_user_model()
@@ -28,3 +30,59 @@ class EmptyStatsTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.data['total_orders'], 0)
         self.assertIsInstance(resp.data['last7days'], list)
+
+
+class ReportReuseTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_reuse', password='pass', role='seller')
+        self.other_seller = User.objects.create_user(username='seller_reuse2', password='pass', role='seller')
+        buyer = User.objects.create_user(username='buyer_reuse', password='pass', role='buyer')
+        self.product = Product.objects.create(name='Reuse Leg', product_type='leg')
+        self.buyer = buyer
+        self._completed_order()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        self.today = timezone.now().date().isoformat()
+
+    def _completed_order(self):
+        order = Order.objects.create(buyer=self.buyer, status='completed', total_weight='2.00')
+        OrderItem.objects.create(order=order, product=self.product, quantity_kg='2.00')
+        return order
+
+    def _request(self, client=None):
+        return (client or self.client).post('/api/orders/create_report/', {
+            'report_type': 'range', 'start_date': self.today, 'end_date': self.today,
+        }, format='json')
+
+    def test_repeat_request_reuses_report(self):
+        first = self._request()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.data['status'], 'pending')
+        with patch('orders.views.generate_order_report.delay') as delay:
+            second = self._request()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['id'], first.data['id'])
+        delay.assert_not_called()
+        self.assertEqual(OrderReport.objects.count(), 1)
+
+    def test_other_seller_gets_linked_ready_report(self):
+        first = self._request()
+        source = OrderReport.objects.get(id=first.data['id'])
+        self.assertEqual(source.status, 'ready')
+        other = APIClient(); other.force_authenticate(self.other_seller)
+        with patch('orders.views.generate_order_report.delay') as delay:
+            resp = self._request(other)
+        delay.assert_not_called()
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['status'], 'ready')
+        self.assertNotEqual(resp.data['file_path'], source.file_path)
+        self.assertTrue(os.path.samefile(resp.data['file_path'], source.file_path))
+
+    def test_new_data_changes_fingerprint(self):
+        first = self._request()
+        self._completed_order()
+        with patch('orders.views.generate_order_report.delay') as delay:
+            second = self._request()
+        self.assertEqual(second.status_code, 201)
+        self.assertNotEqual(second.data['id'], first.data['id'])
+        delay.assert_called_once()
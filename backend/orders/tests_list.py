@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from products.models import Product
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+
+class OrderListShapeTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_list', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_list', password='pass', role='buyer',
+                                              first_name='Ali', phone_number='+998901112233')
+        self.leg = Product.objects.create(name='List Leg', product_type='leg')
+        self.wing = Product.objects.create(name='List Wing', product_type='wing')
+        for _ in range(5):
+            order = Order.objects.create(buyer=self.buyer, total_weight='3.00')
+            OrderItem.objects.create(order=order, product=self.leg, quantity_kg='1.00')
+            OrderItem.objects.create(order=order, product=self.wing, quantity_kg='2.00')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def test_compact_list_row(self):
+        resp = self.client.get('/api/orders/')
+        self.assertEqual(resp.status_code, 200)
+        row = resp.data['results'][0]
+        self.assertEqual(row['item_count'], 2)
+        self.assertNotIn('items', row)
+        self.assertNotIn('whatsapp_message_id', row)
+        self.assertEqual(row['buyer'], {
+            'id': self.buyer.id, 'username': 'buyer_list', 'first_name': 'Ali',
+            'last_name': '', 'phone_number': '+998901112233',
+        })
+
+    def test_expand_items(self):
+        resp = self.client.get('/api/orders/', {'expand': 'items'})
+        row = resp.data['results'][0]
+        self.assertEqual(len(row['items']), 2)
+        self.assertEqual({item['product'] for item in row['items']}, {self.leg.id, self.wing.id})
+
+    def test_sparse_fields(self):
+        resp = self.client.get('/api/orders/', {'fields': 'order_number,status,no_such_field'})
+        self.assertEqual(set(resp.data['results'][0]), {'id', 'order_number', 'status'})
+        order = Order.objects.first()
+        detail = self.client.get(f'/api/orders/{order.id}/', {'fields': 'status'})
+        self.assertEqual(detail.data, {'id': order.id, 'status': order.status})
+
+    def test_list_query_count_is_constant(self):
+        # ETag agregati + COUNT + sahifa (xaridor JOIN va item_count subquery bilan)
+        with self.assertNumQueries(3):
+            self.client.get('/api/orders/')
+        # + pozitsiyalar uchun bitta prefetch
+        with self.assertNumQueries(4):
+            self.client.get('/api/orders/', {'expand': 'items'})
+
+    def test_detail_keeps_full_representation(self):
+        order = Order.objects.first()
+        resp = self.client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(len(resp.data['items']), 2)
+        self.assertIn('address', resp.data['buyer'])
+
+
+class OrderConditionalGetTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_cond', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_cond', password='pass', role='buyer')
+        self.other = User.objects.create_user(username='buyer_cond2', password='pass', role='buyer')
+        self.order = Order.objects.create(buyer=self.buyer, total_weight='1.00')
+        self.client = APIClient()
+
+    def _get(self, user, etag=None, path='/api/orders/'):
+        self.client.force_authenticate(user)
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(path, **headers)
+
+    def test_list_not_modified(self):
+        etag = self._get(self.seller)['ETag']
+        with self.assertNumQueries(1):
+            resp = self._get(self.seller, etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_status_change_invalidates(self):
+        etag = self._get(self.seller)['ETag']
+        self.client.patch(f'/api/orders/{self.order.id}/update_status/', {'status': 'reviewing'}, format='json')
+        self.assertEqual(self._get(self.seller, etag).status_code, 200)
+
+    def test_buyer_scope(self):
+        # Bo'sh ro'yxatlar ham bir-biridan farq qiladi: validator foydalanuvchiga xos
+        etag = self._get(self.other)['ETag']
+        self.assertEqual(self._get(self.other, etag).status_code, 304)
+        self.assertEqual(self._get(self.buyer, etag).status_code, 200)
+
+    def test_detail_not_modified(self):
+        path = f'/api/orders/{self.order.id}/'
+        etag = self._get(self.buyer, path=path)['ETag']
+        self.assertEqual(self._get(self.buyer, etag, path).status_code, 304)
+        self.assertEqual(self._get(self.other, etag, path).status_code, 404)
@@ -0,0 +1,103 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from chicken_store.metrics import RequestMetrics, request_metrics
+from products.models import Product
+
+User = get_user_model()
+
+
+def sample(text, name, **labels):
+    """Prometheus matnidan bitta qiymat (label tartibi muhim emas)."""
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        match = re.match(r'(\w+)\{(.*)\} (\S+)$', line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2)))
+        if found == labels:
+            return float(match.group(3))
+    return None
+
+
+@override_settings(METRICS_PUBLIC=True)
+class QueryMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        request_metrics.reset()
+        self.seller = User.objects.create_user(username='seller_metrics', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_metrics', password='pass', role='buyer')
+        Product.objects.create(name='Metrics Leg', product_type='leg', stock_kg=100)
+        self.client = APIClient()
+
+    def _metrics(self):
+        resp = self.client.get('/api/metrics')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return resp.content.decode()
+
+    def test_records_queries_per_view_and_action(self):
+        self.client.force_authenticate(self.seller)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get('/api/orders/stats/').status_code, 200)
+        # captured_queries dangasa: keyingi so'rov boshida jurnal tozalanadi
+        queries = len(captured)
+        self.client.force_authenticate(None)
+        text = self._metrics()
+
+        labels = {'view': 'order-stats', 'method': 'GET'}
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', **labels), 1)
+        self.assertEqual(sample(text, 'http_request_sql_queries_sum', **labels), queries)
+        self.assertGreater(sample(text, 'http_request_sql_seconds_total', **labels), 0)
+        self.assertEqual(sample(text, 'http_requests_total', status='2xx', **labels), 1)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', le='+Inf', **labels), 1)
+
+    def test_labels_product_list_and_unmatched(self):
+        self.client.force_authenticate(self.buyer)
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        self.client.get('/api/nope/')
+        text = self._metrics()
+
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', view='product-list', method='GET'), 2)
+        self.assertEqual(sample(text, 'http_requests_total', view='unmatched', method='GET', status='4xx'), 1)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 401)
+        resp = self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(METRICS_PUBLIC=False, METRICS_TOKEN='', DEBUG=False)
+    def test_hidden_by_default(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 404)
+
+
+class RequestMetricsRenderTests(TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = RequestMetrics()
+        metrics.observe('order-list', 'GET', 200, 0.003, 1, 0.001)
+        metrics.observe('order-list', 'GET', 200, 0.2, 3, 0.05)
+        metrics.observe('order-list', 'GET', 500, 20.0, 600, 1.0)
+        text = metrics.render()
+
+        labels = {'view': 'order-list', 'method': 'GET'}
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', le='0.005', **labels), 1)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', le='0.25', **labels), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', le='10.0', **labels), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', le='+Inf', **labels), 3)
+        self.assertEqual(sample(text, 'http_request_sql_queries_bucket', le='5.0', **labels), 2)
+        self.assertEqual(sample(text, 'http_request_sql_queries_sum', **labels), 604)
+        self.assertEqual(sample(text, 'http_requests_total', status='5xx', **labels), 1)
+
+    def test_label_values_are_escaped(self):
+        metrics = RequestMetrics()
+        metrics.observe('we"ird\\view', 'GET', 200, 0.01, 0, 0.0)
+        self.assertIn('view="we\\"ird\\\\view"', metrics.render())
@@ -0,0 +1,102 @@
+from io import StringIO
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from products.models import Product
+from . import outbox
+from .models import Order, OutboxEvent
+
+User = get_user_model()
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(username='buyer_outbox', password='pass', role='buyer')
+        self.product = Product.objects.create(name='Outbox Leg', product_type='leg', stock_kg=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)('sellers', self.channel)
+        self.addCleanup(async_to_sync(self.layer.flush))
+
+    def _create(self, qty='1.00'):
+        return self.client.post('/api/orders/', {'items': [{'product': self.product.id, 'quantity_kg': qty}]}, format='json')
+
+    def _received(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.layer.channels[self.channel].get_nowait()[1])
+            except Exception:
+                return messages
+
+    def test_event_written_with_order_and_nothing_sent_inline(self):
+        with patch('orders.digest.schedule_order_notification') as schedule:
+            resp = self._create()
+        self.assertEqual(resp.status_code, 201)
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.kind, event.payload), (OutboxEvent.ORDER_CREATED, {'order_id': resp.data['id']}))
+        self.assertIsNone(event.processed_at)
+        schedule.assert_not_called()
+        self.assertEqual(self._received(), [])
+
+    def test_rolled_back_order_leaves_no_event(self):
+        resp = self._create('50.00')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_relay_dispatches_batch(self):
+        ids = [self._create().data['id'] for _ in range(3)]
+        with patch('orders.digest.schedule_order_notification') as schedule, \
+                patch('orders.outbox.broadcast', wraps=outbox.broadcast) as sent:
+            self.assertEqual(outbox.relay(), 3)
+        self.assertEqual([c.args[0] for c in schedule.call_args_list], ids)
+        sent.assert_called_once()
+        received = self._received()
+        self.assertEqual([m['type'] for m in received], ['new_order_created'] * 3)
+        self.assertEqual([m['order']['id'] for m in received], ids)
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(outbox.relay(), 0)
+
+    def test_failure_backs_off(self):
+        self._create()
+        with patch('orders.outbox.broadcast', side_effect=ConnectionError('redis down')):
+            self.assertEqual(outbox.relay(), 0)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('redis down', event.last_error)
+        self.assertIsNone(event.processed_at)
+        self.assertGreater(event.available_at, event.created_at)
+        # Kutish vaqti o'tmaguncha qayta olinmaydi
+        self.assertEqual(outbox.relay(), 0)
+        OutboxEvent.objects.update(available_at=event.created_at)
+        self.assertEqual(outbox.relay(), 1)
+
+    def test_database_error_in_handler_is_recorded(self):
+        self._create()
+
+        def broken(group):
+            # Mavjud id bilan yozish: IntegrityError tashqi tranzaksiyani ham buzardi
+            OutboxEvent.objects.create(id=group[0].id, kind=OutboxEvent.ORDER_CREATED, payload={})
+
+        with patch.dict(outbox.HANDLERS, {OutboxEvent.ORDER_CREATED: broken}):
+            self.assertEqual(outbox.relay(), 0)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('IntegrityError', event.last_error)
+        self.assertGreater(event.available_at, event.created_at)
+
+    def test_relay_command_once(self):
+        self._create()
+        out = StringIO()
+        call_command('run_outbox_relay', '--once', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
@@ -0,0 +1,313 @@
+import json
+import queue
+import threading
+from unittest.mock import patch
+
+import msgpack
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import stream
+from .consumers import OrderConsumer, consumer_stats
+from .models import Order
+from .realtime import Publisher, publisher
+
+User = get_user_model()
+
+
+class RealtimePublisherTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_rt', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_rt', password='pass', role='buyer')
+        self.order = Order.objects.create(buyer=self.buyer, status='pending')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(f'user_{self.buyer.id}', self.channel)
+        self.addCleanup(async_to_sync(self.layer.flush))
+
+    def _received(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.layer.channels[self.channel].get_nowait()[1])
+            except Exception:
+                return messages
+
+    def test_status_update_is_published_after_commit_from_background_thread(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            resp = self.client.patch(f'/api/orders/{self.order.id}/update_status/', {'status': 'reviewing'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        # Commit'gacha hech narsa yuborilmaydi
+        self.assertEqual(self._received(), [])
+
+        before = publisher.stats()['published']
+        for callback in callbacks:
+            callback()
+        self.assertTrue(publisher.flush())
+        messages = self._received()
+        self.assertEqual([m['type'] for m in messages], ['order_delta'])
+        self.assertEqual(messages[0]['delta']['changes']['status'], 'reviewing')
+        # Xaridor va sotuvchilarga delta + sotuvchilarga stats_delta
+        self.assertEqual(publisher.stats()['published'], before + 3)
+
+    def test_rolled_back_transaction_publishes_nothing(self):
+        with patch.object(publisher, '_enqueue') as enqueue, self.captureOnCommitCallbacks(execute=False):
+            publisher.publish(f'user_{self.buyer.id}', {'type': 'order_delta', 'delta': {}})
+        enqueue.assert_not_called()
+
+    def test_batches_and_reports_failures(self):
+        local = Publisher(batch_size=10)
+        sent = []
+
+        async def group_send(group, message):
+            if group == 'broken':
+                raise ConnectionError('redis down')
+            sent.append(group)
+
+        with patch.object(self.layer, 'group_send', side_effect=group_send):
+            with self.captureOnCommitCallbacks(execute=True):
+                local.publish_many([('a', {}), ('broken', {}), ('b', {})])
+            self.assertTrue(local.flush())
+        stats = local.stats()
+        self.assertEqual(sorted(sent), ['a', 'b'])
+        self.assertEqual((stats['published'], stats['failed'], stats['queue_depth']), (2, 1, 0))
+        self.assertLessEqual(stats['batches'], 2)
+        self.assertGreaterEqual(stats['latency_ms']['max'], 0)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        local = Publisher(max_queue=1)
+        with patch.object(local, '_run'):
+            local._enqueue([('a', {}), ('b', {}), ('c', {})])
+        stats = local.stats()
+        self.assertEqual((stats['queue_depth'], stats['dropped']), (1, 2))
+
+    def test_drop_counter_is_exact_across_request_threads(self):
+        local = Publisher(max_queue=1)
+        full = queue.Queue(maxsize=1)
+        full.put_nowait(('seed', {}, 0))
+        with patch.object(local, '_ensure_started', return_value=full):
+            def flood():
+                for _ in range(500):
+                    local._enqueue([('a', {})])
+
+            threads = [threading.Thread(target=flood) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(local.stats()['dropped'], 4000)
+
+    def test_stats_endpoint_is_seller_only(self):
+        self.assertEqual(self.client.get('/api/orders/realtime/stats/').status_code, 200)
+        self.assertIn('queue_depth', self.client.get('/api/orders/realtime/stats/').data)
+        buyer_client = APIClient()
+        buyer_client.force_authenticate(self.buyer)
+        self.assertEqual(buyer_client.get('/api/orders/realtime/stats/').status_code, 403)
+
+
+class OrderDeltaTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_delta', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_delta', password='pass', role='buyer')
+        self.order = Order.objects.create(buyer=self.buyer, status='pending')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def _published(self, call):
+        with patch.object(publisher, '_enqueue') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            resp = call()
+        self.assertEqual(resp.status_code, 200)
+        return [(group, message) for args in enqueue.call_args_list for group, message in args[0][0]
+                if message['type'] != 'stats_delta']
+
+    def test_status_update_sends_changed_fields_and_version(self):
+        messages = self._published(lambda: self.client.patch(
+            f'/api/orders/{self.order.id}/update_status/', {'status': 'reviewing'}, format='json'))
+        self.assertEqual([group for group, _ in messages], [f'user_{self.buyer.id}', 'sellers'])
+        delta = messages[0][1]['delta']
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.version, 2)
+        self.assertEqual(delta['id'], self.order.id)
+        self.assertEqual(delta['version'], 2)
+        self.assertEqual(set(delta['changes']), {'status', 'updated_at'})
+        self.assertEqual(delta['changes']['status'], 'reviewing')
+
+    def test_bulk_update_bumps_versions(self):
+        other = Order.objects.create(buyer=self.buyer, status='pending')
+        messages = self._published(lambda: self.client.post(
+            '/api/orders/bulk_update_status/', {'ids': [self.order.id, other.id], 'status': 'reviewing'}, format='json'))
+        sellers = dict(messages)['sellers']
+        self.assertEqual(sellers['type'], 'order_delta_bulk')
+        self.assertEqual({(d['id'], d['version']) for d in sellers['deltas']}, {(self.order.id, 2), (other.id, 2)})
+
+
+class OrderConsumerEncodingTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_ws', password='pass', role='seller')
+
+    def _roundtrip(self, path, event):
+        async def run():
+            communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), path)
+            communicator.scope['user'] = self.seller
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await get_channel_layer().group_send('sellers', event)
+            frame = await communicator.receive_output(timeout=1)
+            await communicator.disconnect()
+            return frame
+        return async_to_sync(run)()
+
+    def test_json_is_default_and_msgpack_is_opt_in(self):
+        event = {'type': 'order_delta', 'delta': {'id': 1, 'version': 3, 'changes': {'status': 'process'}}}
+        expected = {'type': 'order_delta', 'id': 1, 'version': 3, 'changes': {'status': 'process'}}
+
+        frame = self._roundtrip('/ws/orders/', event)
+        self.assertEqual(json.loads(frame['text']), expected)
+
+        frame = self._roundtrip('/ws/orders/?encoding=msgpack', event)
+        self.assertNotIn('text', frame)
+        self.assertEqual(msgpack.unpackb(frame['bytes']), expected)
+
+    def test_unknown_encoding_is_rejected(self):
+        async def run():
+            communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), '/ws/orders/?encoding=xml')
+            communicator.scope['user'] = self.seller
+            connected, _ = await communicator.connect()
+            return connected
+        self.assertFalse(async_to_sync(run)())
+
+
+@override_settings(ORDER_EVENT_LOG_SIZE=3)
+class OrderStreamReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.seller = User.objects.create_user(username='seller_replay', password='pass', role='seller')
+
+    def _delta(self, order_id):
+        return {'type': 'order_delta', 'delta': {'id': order_id, 'version': 2, 'changes': {'status': 'process'}}}
+
+    def _connect_and_collect(self, path):
+        async def run():
+            communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), path)
+            communicator.scope['user'] = self.seller
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            frames = []
+            while not await communicator.receive_nothing(timeout=0.1):
+                frames.append(json.loads((await communicator.receive_output())['text']))
+            await communicator.disconnect()
+            return frames
+        return async_to_sync(run)()
+
+    def test_sequences_are_per_stream(self):
+        first = stream.stamp('sellers', self._delta(1))
+        second = stream.stamp('sellers', self._delta(2))
+        private = stream.stamp(f'user_{self.seller.id}', self._delta(1))
+        self.assertEqual((first['seq'], second['seq'], private['seq']), (1, 2, 1))
+        self.assertEqual((first['stream'], private['stream']), ('sellers', 'user'))
+        messages, head = stream.since('sellers', 1)
+        self.assertEqual(([m['delta']['id'] for m in messages], head), ([2], 2))
+
+    def test_reconnect_replays_only_missed_events(self):
+        for order_id in (1, 2, 3):
+            stream.stamp('sellers', self._delta(order_id))
+        frames = self._connect_and_collect('/ws/orders/?last_seq=sellers:1')
+        # Ketma-ket delta'lar bitta frame'da keladi
+        self.assertEqual(len(frames), 1)
+        self.assertEqual((frames[0]['type'], frames[0]['stream'], frames[0]['seq']), ('order_deltas', 'sellers', 3))
+        self.assertEqual([d['id'] for d in frames[0]['deltas']], [2, 3])
+
+    def test_gap_beyond_log_requires_full_resync(self):
+        for order_id in range(1, 6):
+            stream.stamp('sellers', self._delta(order_id))
+        frames = self._connect_and_collect('/ws/orders/?last_seq=sellers:1,user:0')
+        self.assertEqual(frames, [{'type': 'resync_required', 'stream': 'sellers', 'seq': 5}])
+        # Hisoblagich qayta boshlangan bo'lsa ham (cache tozalangan)
+        cache.clear()
+        frames = self._connect_and_collect('/ws/orders/?last_seq=sellers:5')
+        self.assertEqual(frames, [{'type': 'resync_required', 'stream': 'sellers', 'seq': 0}])
+
+
+    def test_replayed_stats_delta_not_counted_twice(self):
+        stamped = [stream.stamp('sellers', {'type': 'stats_delta', 'delta': {'total_orders': 1}}) for _ in range(3)]
+
+        async def run():
+            communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), '/ws/orders/?last_seq=sellers:1')
+            communicator.scope['user'] = self.seller
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            # Oxirgi hodisa jonli guruhdan ham keladi (jurnalga yozilgan, lekin hali yetkazilmagan)
+            await get_channel_layer().group_send('sellers', stamped[-1])
+            frames = []
+            while not await communicator.receive_nothing(timeout=0.2):
+                frames.append(json.loads((await communicator.receive_output())['text']))
+            await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(run)()
+        self.assertEqual(frames, [{'type': 'stats_delta', 'delta': {'total_orders': 2}, 'stream': 'sellers', 'seq': 3}])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_resume_disabled_without_shared_cache(self):
+        # Jarayonlar hisoblagichi alohida bo'lardi: seq berilmaydi, resume har doim to'liq qayta yuklash
+        message = self._delta(1)
+        self.assertEqual(stream.stamp('sellers', message), message)
+        self.assertIsNone(cache.get('orders:stream:sellers:seq'))
+        frames = self._connect_and_collect('/ws/orders/?last_seq=sellers:3')
+        self.assertEqual(frames, [{'type': 'resync_required', 'stream': 'sellers', 'seq': 0}])
+
+class OrderConsumerBackpressureTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_bp', password='pass', role='seller')
+
+    def _burst(self, events):
+        async def run():
+            communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), '/ws/orders/')
+            communicator.scope['user'] = self.seller
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            layer = get_channel_layer()
+            for event in events:
+                await layer.group_send('sellers', event)
+            frames = []
+            while not await communicator.receive_nothing(timeout=0.3):
+                frames.append(json.loads((await communicator.receive_output())['text']))
+            await communicator.disconnect()
+            return frames
+        return async_to_sync(run)()
+
+    def _delta(self, order_id, version, status, seq):
+        return {'type': 'order_delta', 'stream': 'sellers', 'seq': seq,
+                'delta': {'id': order_id, 'version': version, 'changes': {'status': status}}}
+
+    @override_settings(WS_COALESCE_WINDOW=0.2)
+    def test_updates_for_one_order_collapse_to_newest_state(self):
+        before = consumer_stats['coalesced']
+        frames = self._burst([
+            self._delta(1, 2, 'reviewing', 1),
+            self._delta(2, 2, 'reviewing', 2),
+            self._delta(1, 3, 'process', 3),
+            self._delta(1, 4, 'shipping', 4),
+        ])
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0]['type'], 'order_deltas')
+        self.assertEqual(frames[0]['seq'], 4)
+        self.assertEqual([(d['id'], d['version'], d['changes']['status']) for d in frames[0]['deltas']],
+                         [(1, 4, 'shipping'), (2, 2, 'reviewing')])
+        self.assertEqual(consumer_stats['coalesced'] - before, 2)
+
+    @override_settings(WS_COALESCE_WINDOW=0.2, WS_SEND_QUEUE_MAX=2)
+    def test_full_queue_drops_oldest_and_asks_for_resync(self):
+        before = consumer_stats['dropped']
+        frames = self._burst([self._delta(order_id, 2, 'reviewing', order_id) for order_id in (1, 2, 3, 4)])
+        self.assertEqual(frames[0], {'type': 'resync_required', 'stream': 'sellers', 'seq': 4})
+        self.assertEqual([d['id'] for d in frames[1]['deltas']], [3, 4])
+        self.assertEqual(consumer_stats['dropped'] - before, 2)
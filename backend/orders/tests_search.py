@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from products.models import Product
+from .models import Order, OrderSearchEntry
+
+User = get_user_model()
+
+
+class OrderSearchTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_search', password='pass', role='seller')
+        self.ali = User.objects.create_user(
+            username='ali', password='pass', role='buyer', first_name='Alisher', last_name='Karimov',
+            phone_number='+998901234567', address='Toshkent, Chilonzor 5',
+        )
+        self.vali = User.objects.create_user(
+            username='vali', password='pass', role='buyer', first_name='Vali', last_name='Aliyev',
+            phone_number='+998935550011', address='Samarqand, Registon',
+        )
+        self.product = Product.objects.create(name='Search Leg', product_type='leg', stock_kg=100)
+        self.ali_order = self._order(self.ali)
+        self.vali_order = self._order(self.vali)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def _order(self, buyer):
+        client = APIClient(); client.force_authenticate(buyer)
+        resp = client.post('/api/orders/', {'items': [{'product': self.product.id, 'quantity_kg': '1.00'}]}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        return Order.objects.get(id=resp.data['id'])
+
+    def _search(self, term, client=None):
+        resp = (client or self.client).get('/api/orders/', {'search': term})
+        self.assertEqual(resp.status_code, 200)
+        return [o['id'] for o in resp.data['results']]
+
+    def test_search_fields(self):
+        self.assertEqual(self._search('alisher'), [self.ali_order.id])
+        self.assertEqual(self._search('1234567'), [self.ali_order.id])
+        self.assertEqual(self._search('Registon'), [self.vali_order.id])
+        self.assertEqual(self._search(self.vali_order.order_number[2:9].lower()), [self.vali_order.id])
+        self.assertEqual(self._search('no-such-buyer'), [])
+
+    def test_ranked_results(self):
+        chilonzor = User.objects.create_user(
+            username='chil', password='pass', role='buyer', first_name='Chilonzorbek',
+            address='Chilonzor, Chilonzor ko\'chasi',
+        )
+        best = self._order(chilonzor)
+        results = self._search('chilonzor')
+        self.assertEqual(results, [best.id, self.ali_order.id])
+
+    def test_short_term_fallback(self):
+        self.assertIn(self.vali_order.id, self._search('va'))
+
+    def test_buyer_scope_preserved(self):
+        buyer_client = APIClient(); buyer_client.force_authenticate(self.vali)
+        self.assertEqual(self._search('alisher', buyer_client), [])
+
+    def test_user_edit_reindexes_orders(self):
+        self.ali.phone_number = '+998977770000'
+        self.ali.address = 'Buxoro, Markaz'
+        self.ali.save()
+        self.assertEqual(self._search('7770000'), [self.ali_order.id])
+        self.assertEqual(self._search('buxoro'), [self.ali_order.id])
+        self.assertEqual(self._search('1234567'), [])
+
+    def test_last_login_does_not_reindex(self):
+        with self.assertNumQueries(1):
+            self.ali.save(update_fields=['last_login'])
+
+    def test_rebuild_command(self):
+        OrderSearchEntry.objects.all().delete()
+        self.assertEqual(self._search('alisher'), [])
+        call_command('rebuild_order_search', stdout=StringIO())
+        self.assertEqual(self._search('alisher'), [self.ali_order.id])
@@ -0,0 +1,189 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from products.models import Product
+from .models import Order, OrderItem, OrderDailyStats
+from .cache import LOCAL_ENTRY_TIMEOUT, cached_stats
+from .consumers import add_counters
+
+User = get_user_model()
+
+
+class OrderDailyStatsRollupTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_roll', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_roll', password='pass', role='buyer')
+        self.leg = Product.objects.create(name='Roll Leg', product_type='leg', stock_kg=100)
+        self.wing = Product.objects.create(name='Roll Wing', product_type='wing', stock_kg=100)
+        self.client = APIClient()
+        self.buyer_client = APIClient()
+        self.buyer_client.force_authenticate(self.buyer)
+
+    def _order(self, *items):
+        resp = self.buyer_client.post('/api/orders/', {
+            'items': [{'product': p.id, 'quantity_kg': q} for p, q in items]
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        return resp.data['id']
+
+    def _stats(self):
+        self.client.force_authenticate(self.seller)
+        resp = self.client.get('/api/orders/stats/')
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_incremental_rollup_matches_rebuild(self):
+        first = self._order((self.leg, '2.00'), (self.wing, '1.50'))
+        self._order((self.leg, '3.00'))
+        self._order((self.wing, '1.00'))
+        self.client.force_authenticate(self.seller)
+        for st in ['reviewing', 'process', 'shipping', 'completed']:
+            self.client.patch(f'/api/orders/{first}/update_status/', {'status': st}, format='json')
+
+        stats = self._stats()
+        self.assertEqual(stats['total_orders'], 3)
+        self.assertEqual(stats['total_completed'], 1)
+        self.assertEqual(stats['total_weight_completed'], 3.5)
+        self.assertEqual(stats['status_breakdown'], {'pending': 2, 'completed': 1})
+        self.assertEqual(stats['product_type_breakdown']['leg'], {'orders': 2, 'quantity_kg': 5.0})
+        self.assertEqual(stats['last7days'][-1]['count'], 3)
+        self.assertEqual(stats['last7days'][-1]['completed_weight'], 3.5)
+
+        call_command('rebuild_order_stats', stdout=StringIO())
+        self.assertEqual(self._stats(), stats)
+
+    def test_pushed_deltas_add_up_to_stats(self):
+        with patch('orders.realtime.publisher._enqueue') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            first = self._order((self.leg, '2.00'), (self.wing, '1.50'))
+            second = self._order((self.leg, '3.00'))
+            self.client.force_authenticate(self.seller)
+            for st in ['reviewing', 'process', 'shipping', 'completed']:
+                self.client.patch(f'/api/orders/{first}/update_status/', {'status': st}, format='json')
+            self.client.post('/api/orders/bulk_update_status/', {'ids': [second], 'status': 'cancelled'}, format='json')
+
+        deltas = [message['delta'] for call in enqueue.call_args_list for group, message in call[0][0]
+                  if message['type'] == 'stats_delta']
+        self.assertTrue(all(group == 'sellers' for call in enqueue.call_args_list for group, message in call[0][0]
+                            if message['type'] == 'stats_delta'))
+        self.assertEqual(len(deltas), 7)
+        total = {}
+        for delta in deltas:
+            total = add_counters(total, delta)
+        stats = self._stats()
+        today = stats['last7days'][-1]
+        self.assertEqual(total['total_orders'], stats['total_orders'])
+        self.assertEqual(total['total_completed'], stats['total_completed'])
+        self.assertEqual(total['total_weight_completed'], stats['total_weight_completed'])
+        self.assertEqual({k: v for k, v in total['status_breakdown'].items() if v}, stats['status_breakdown'])
+        self.assertEqual(total['product_type_breakdown'], stats['product_type_breakdown'])
+        self.assertEqual(total['days'][today['date']], {'count': today['count'], 'completed_weight': today['completed_weight']})
+
+    def test_rebuild_covers_orm_created_orders(self):
+        old = timezone.now() - timedelta(days=9)
+        o = Order.objects.create(buyer=self.buyer, status='completed', total_weight='4.00')
+        OrderItem.objects.create(order=o, product=self.leg, quantity_kg='4.00')
+        Order.objects.filter(id=o.id).update(created_at=old)
+        self.assertEqual(self._stats()['total_orders'], 0)
+
+        call_command('rebuild_order_stats', stdout=StringIO())
+        stats = self._stats()
+        self.assertEqual(stats['total_orders'], 1)
+        self.assertEqual(stats['metrics']['prev7_total'], 1)
+        self.assertEqual(stats['metrics']['last7_total'], 0)
+
+    def test_stats_reads_only_rollup(self):
+        self._order((self.leg, '1.00'))
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(3):
+            self.client.get('/api/orders/stats/')
+
+    def test_bulk_cancel_moves_rollup_rows(self):
+        ids = [self._order((self.leg, '1.00')), self._order((self.wing, '2.00'))]
+        self.client.force_authenticate(self.seller)
+        self.client.post('/api/orders/bulk_update_status/', {'ids': ids, 'status': 'cancelled'}, format='json')
+        stats = self._stats()
+        self.assertEqual(stats['status_breakdown'], {'cancelled': 2})
+        self.assertFalse(OrderDailyStats.objects.filter(status='pending', order_count__gt=0).exists())
+
+
+@override_settings(STATS_CACHE_ENABLED=True)
+class StatsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller_cache', password='pass', role='seller')
+        self.buyer = User.objects.create_user(username='buyer_cache', password='pass', role='buyer')
+        self.product = Product.objects.create(name='Cache Leg', product_type='leg', stock_kg=100)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def _create_order(self):
+        buyer_client = APIClient(); buyer_client.force_authenticate(self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = buyer_client.post('/api/orders/', {
+                'items': [{'product': self.product.id, 'quantity_kg': '1.00'}]
+            }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        return resp.data['id']
+
+    def test_hit_after_miss_and_invalidated_by_events(self):
+        first = self.client.get('/api/orders/stats/')
+        self.assertEqual(first['X-Stats-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/orders/stats/')
+        self.assertEqual(second['X-Stats-Cache'], 'HIT')
+        self.assertEqual(second.data['total_orders'], 0)
+
+        order_id = self._create_order()
+        after_create = self.client.get('/api/orders/stats/')
+        self.assertEqual(after_create['X-Stats-Cache'], 'MISS')
+        self.assertEqual(after_create.data['total_orders'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/orders/{order_id}/update_status/', {'status': 'reviewing'}, format='json')
+        after_update = self.client.get('/api/orders/stats/')
+        self.assertEqual(after_update['X-Stats-Cache'], 'MISS')
+        self.assertEqual(after_update.data['status_breakdown'], {'reviewing': 1})
+
+        info = self.client.get('/api/orders/stats/cache/').data
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 3)
+
+    def test_rebuild_invalidates(self):
+        order = Order.objects.create(buyer=self.buyer, status='pending', total_weight='1.00')
+        OrderItem.objects.create(order=order, product=self.product, quantity_kg='1.00')
+        self.assertEqual(self.client.get('/api/orders/stats/').data['total_orders'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_order_stats', stdout=StringIO())
+        resp = self.client.get('/api/orders/stats/')
+        self.assertEqual(resp['X-Stats-Cache'], 'MISS')
+        self.assertEqual(resp.data['total_orders'], 1)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_short_ttl_without_shared_cache(self):
+        with patch('orders.cache.cache.set_many') as set_many:
+            self.client.get('/api/orders/stats/')
+        self.assertEqual(set_many.call_args.kwargs['timeout'], LOCAL_ENTRY_TIMEOUT)
+
+    def test_concurrent_miss_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'total_orders': len(calls)}
+
+        cached_stats(compute)
+        cache.incr('orders:stats:version')
+        # Boshqa jarayon hisoblayotgandek qulfni egallab turamiz
+        version = cache.get('orders:stats:version')
+        cache.add(f'orders:stats:{version}:{timezone.localdate().isoformat()}:lock', 1)
+        payload, state = cached_stats(compute)
+        self.assertEqual(state, 'STALE')
+        self.assertEqual(payload, {'total_orders': 1})
+        self.assertEqual(len(calls), 1)
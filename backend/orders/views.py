@@ -1,27 +1,71 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
 from .models import Order, OrderItem
 from django.utils.dateparse import parse_date
-from .serializers import OrderSerializer, OrderCreateSerializer, OrderReportSerializer
-from .models import OrderReport
+from .serializers import OrderSerializer, OrderListSerializer, OrderCreateSerializer, OrderReportSerializer
+from .models import OrderReport, OrderDailyStats
 from .tasks import generate_order_report
 from django.http import FileResponse
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, Sum
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 import os
+from collections import defaultdict
+from django.db import transaction
 from users.permissions import IsSellerUser, IsBuyerUser
+from chicken_store.conditional import ConditionalGetMixin
+from chicken_store.pagination import SelectablePaginationMixin
+from products import stock
+from . import rollups
+from .search import search_orders
+from .consumers import consumer_stats
+from .realtime import order_delta, publisher
+from .reports import report_fingerprint, link_report_file
+from .cache import cached_stats, stats_cache_info, bump_stats_version
 
-class OrderViewSet(viewsets.ModelViewSet):
+# Ruxsat etilgan status o'tishlari: joriy holat -> keyingi holatlar
+VALID_TRANSITIONS = {
+    'pending': ['reviewing', 'cancelled'],
+    'reviewing': ['process', 'cancelled'],
+    'process': ['shipping'],
+    'shipping': ['completed']
+}
+
+# Shu vaqt ichida yaratilgan "pending" hisobot qayta ishlatiladi (undan eskisi osilib qolgan deb hisoblanadi)
+REPORT_PENDING_REUSE_WINDOW = timedelta(minutes=10)
+
+# Bitta bulk so'rovda qabul qilinadigan buyurtmalar soni chegarasi
+BULK_STATUS_MAX_IDS = 500
+
+
+# Ro'yxat sahifasida o'qiladigan ustunlar (OrderListSerializer maydonlari)
+LIST_ONLY_FIELDS = (
+    'id', 'order_number', 'status', 'total_weight', 'notes', 'created_at', 'updated_at', 'version', 'buyer',
+    'buyer__username', 'buyer__first_name', 'buyer__last_name', 'buyer__phone_number',
+)
+
+
+def parse_field_list(value):
+    """``a,b, c`` ko'rinishidagi query parametridan maydonlar to'plami."""
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class OrderViewSet(ConditionalGetMixin, SelectablePaginationMixin, mixins.CreateModelMixin,
+                   mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    # Umumiy PUT/PATCH/DELETE yo'q: status faqat update_status orqali o'zgaradi (o'tishlar, rollup,
+    # zaxira va stats keshi shu yerda), buyurtma esa o'chirilmaydi - bekor qilinadi
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_validator_scope(self):
+        # Sotuvchilar bitta ro'yxatni ko'radi, xaridor esa faqat o'zinikini
+        return 'seller' if getattr(self.request.user, 'role', None) == 'seller' else super().get_validator_scope()
+
     def get_queryset(self):
         user = self.request.user
-        base_qs = Order.objects.select_related('buyer').prefetch_related('items__product')
+        base_qs = self._shape_queryset(Order.objects.all())
         # Sellers see all, buyers only their own
         qs = base_qs if getattr(user, 'role', None) == 'seller' else base_qs.filter(buyer=user)
 
@@ -42,16 +86,49 @@ class OrderViewSet(viewsets.ModelViewSet):
             if ed:
                 qs = qs.filter(created_at__date__lte=ed)
 
-        # Search by order number
+        qs = qs.order_by('-created_at')
+
+        # Qidiruv: buyurtma raqami, xaridor ismi, telefon va manzil (indeks orqali, moslik bo'yicha saralanadi)
         search = self.request.query_params.get('search')
         if search:
-            qs = qs.filter(order_number__icontains=search)
+            qs = search_orders(qs, search)
+
+        return qs
 
-        return qs.order_by('-created_at')
+    def _shape_queryset(self, qs):
+        """Action bo'yicha kerakli JOIN/prefetch'larni tanlash."""
+        if self.action == 'list':
+            item_count = (OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+                          .values('order').annotate(c=Count('id')).values('c'))
+            qs = (qs.select_related('buyer').only(*LIST_ONLY_FIELDS)
+                  .annotate(item_count=Coalesce(Subquery(item_count, output_field=IntegerField()), 0)))
+            if 'items' in self.expand:
+                qs = qs.prefetch_related(Prefetch('items', queryset=OrderItem.objects.only(
+                    'id', 'order_id', 'product_id', 'quantity_kg')))
+            return qs
+        if self.action == 'retrieve':
+            return qs.select_related('buyer').prefetch_related('items')
+        if self.action == 'update_status':
+            # Javob va WebSocket xabari uchun xaridor kerak, pozitsiyalar serializer'da bir so'rovda o'qiladi
+            return qs.select_related('buyer')
+        return qs
+
+    @property
+    def expand(self):
+        return parse_field_list(self.request.query_params.get('expand'))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['fields'] = parse_field_list(self.request.query_params.get('fields'))
+            context['expand'] = self.expand
+        return context
 
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
+        if self.action == 'list':
+            return OrderListSerializer
         return OrderSerializer
 
     def create(self, request, *args, **kwargs):
@@ -68,54 +145,102 @@ class OrderViewSet(viewsets.ModelViewSet):
         if not new_status:
             return Response({'error': 'Yangi status ko\'rsatilmagan'}, status=status.HTTP_400_BAD_REQUEST)
 
-        valid_transitions = {
-            'pending': ['reviewing', 'cancelled'],
-            'reviewing': ['process', 'cancelled'],
-            'process': ['shipping'],
-            'shipping': ['completed']
-        }
+        with transaction.atomic():
+            # O'tish qulflangan qatorda tekshiriladi: parallel PATCH'lar ikkalasi ham o'tib,
+            # rollup'ni ikki marta ko'chirmasin va zaxirani ikki marta qaytarmasin
+            previous_status = Order.objects.select_for_update().values_list('status', flat=True).get(pk=order.pk)
+            if new_status not in VALID_TRANSITIONS.get(previous_status, []):
+                return Response(
+                    {'error': f"'{previous_status}' holatidan '{new_status}' holatiga o'tish mumkin emas"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-        current_status = order.status
-        allowed_statuses = valid_transitions.get(current_status, [])
+            contributions = rollups.snapshot([order.id])
+            order.status = new_status
+            order.version = F('version') + 1
+            order.save(update_fields=['status', 'version', 'updated_at'])
+            order.refresh_from_db(fields=['version'])
+            rollups.move(contributions, new_status)
+            bump_stats_version()
 
-        if new_status not in allowed_statuses:
-            return Response(
-                {'error': f"'{current_status}' holatidan '{new_status}' holatiga o'tish mumkin emas"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            # If order moves to cancelled from any non-final state and was not completed, restore stock
+            if new_status == 'cancelled' and previous_status != 'completed':
+                returned = order.items.values('product_id').annotate(q=Sum('quantity_kg'))
+                stock.restore_many({row['product_id']: row['q'] for row in returned})
+        serializer = self.get_serializer(order)
 
-        previous_status = order.status
-        order.status = new_status
-        order.save(update_fields=['status'])
+        # Xaridorga va sotuvchilarga faqat o'zgarish (delta); commit'dan keyin fon thread'i yuboradi
+        message = {
+            "type": "order_delta",  # Bu consumer'dagi metod nomiga mos bo'lishi kerak
+            "delta": order_delta(order.id, order.version, status=order.status, updated_at=order.updated_at),
+        }
+        publisher.publish_many([(f'user_{order.buyer_id}', message), ('sellers', message)] if order.buyer_id
+                               else [('sellers', message)])
 
-        # If order moves to cancelled from any non-final state and was not completed, restore stock
-        if new_status == 'cancelled' and previous_status != 'completed':
-            for item in order.items.select_related('product'):
-                item.product.stock_kg = item.product.stock_kg + item.quantity_kg
-                item.product.save(update_fields=['stock_kg'])
-        serializer = self.get_serializer(order)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsSellerUser])
+    def bulk_update_status(self, request):
+        """Bir nechta buyurtma statusini bitta so'rovda o'zgartirish."""
+        new_status = request.data.get('status')
+        ids = request.data.get('ids')
 
-        # --- WEBSOCKET ORQALI XABAR YUBORISH QISMI ---
+        if not new_status:
+            return Response({'error': 'Yangi status ko\'rsatilmagan'}, status=status.HTTP_400_BAD_REQUEST)
+        if new_status not in dict(Order.STATUS_CHOICES):
+            return Response({'error': f"Noma'lum status: '{new_status}'"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(ids, list) or not ids:
+            return Response({'error': 'ids ro\'yxati ko\'rsatilmagan'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > BULK_STATUS_MAX_IDS:
+            return Response({'error': f"Bir so'rovda ko'pi bilan {BULK_STATUS_MAX_IDS} ta buyurtma"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            channel_layer = get_channel_layer()
-            # Xabar yuboriladigan guruhni aniqlaymiz (xaridorning shaxsiy guruhi)
-            group_name = f'user_{order.buyer.id}'
-
-            # Consumer'ga yuboriladigan ma'lumotni tayyorlaymiz
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "order_status_update",  # Bu consumer'dagi metod nomiga mos bo'lishi kerak
-                    "order": serializer.data
-                }
+            ids = sorted({int(i) for i in ids})
+        except (TypeError, ValueError):
+            return Response({'error': 'ids butun sonlardan iborat bo\'lishi kerak'}, status=status.HTTP_400_BAD_REQUEST)
+
+        allowed_from = {current for current, targets in VALID_TRANSITIONS.items() if new_status in targets}
+        rejected = []
+        with transaction.atomic():
+            current = dict(Order.objects.select_for_update().filter(id__in=ids).values_list('id', 'status'))
+            for order_id in ids:
+                if order_id not in current:
+                    rejected.append({'id': order_id, 'error': 'Topilmadi'})
+                elif current[order_id] not in allowed_from:
+                    rejected.append({
+                        'id': order_id,
+                        'error': f"'{current[order_id]}' holatidan '{new_status}' holatiga o'tish mumkin emas"
+                    })
+            accepted = [order_id for order_id in ids if current.get(order_id) in allowed_from]
+
+            if accepted:
+                contributions = rollups.snapshot(accepted)
+                Order.objects.filter(id__in=accepted).update(
+                    status=new_status, version=F('version') + 1, updated_at=timezone.now())
+                rollups.move(contributions, new_status)
+                bump_stats_version()
+                # Bekor qilinganlar uchun zaxira bitta agregat bilan qaytariladi
+                if new_status == 'cancelled':
+                    returned = (OrderItem.objects.filter(order_id__in=accepted)
+                                .values('product_id').annotate(q=Sum('quantity_kg')))
+                    stock.restore_many({row['product_id']: row['q'] for row in returned})
+
+        # --- WEBSOCKET: har bir xaridorga bitta xabar, sotuvchilarga hammasi bitta xabarda ---
+        if accepted:
+            per_buyer = defaultdict(list)
+            deltas = []
+            rows = Order.objects.filter(id__in=accepted).values_list('id', 'buyer_id', 'status', 'version', 'updated_at')
+            for order_id, buyer_id, order_status, version, updated_at in rows:
+                delta = order_delta(order_id, version, status=order_status, updated_at=updated_at)
+                deltas.append(delta)
+                if buyer_id:
+                    per_buyer[buyer_id].append(delta)
+            publisher.publish_many(
+                [(f'user_{buyer_id}', {'type': 'order_delta_bulk', 'deltas': buyer_deltas})
+                 for buyer_id, buyer_deltas in per_buyer.items()]
+                + [('sellers', {'type': 'order_delta_bulk', 'deltas': deltas})]
             )
-        except Exception as e:
-            # WebSocket'da xatolik yuz bersa ham, javob qaytaraveramiz
-            # Bu xatolikni log faylga yozib qo'yish yaxshi amaliyot
-            print(f"WebSocket xabarni yuborishda xatolik: {e}")
-        # --- WEBSOCKET QISMI TUGADI ---
 
-        return Response(serializer.data)
+        return Response({'status': new_status, 'updated': accepted, 'rejected': rejected})
 
     @action(detail=False, methods=['post'], permission_classes=[IsSellerUser])
     def create_report(self, request):
@@ -129,15 +254,40 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'error': 'daily uchun start_date kerak'}, status=400)
         if report_type == 'range' and (not start_date or not end_date):
             return Response({'error': 'range uchun start_date va end_date kerak'}, status=400)
+        try:
+            start = parse_date(start_date) if start_date else None
+            end = parse_date(end_date) if end_date else None
+        except ValueError:
+            start = end = None
+        if (start_date and not start) or (end_date and not end):
+            return Response({'error': 'Sana formati YYYY-MM-DD bo\'lishi kerak'}, status=400)
+
+        # Xuddi shu so'rov va ma'lumot uchun tayyor (yoki tayyorlanayotgan) hisobot bo'lsa, qayta ishlatamiz
+        fingerprint = report_fingerprint(report_type, start, end)
+        same = OrderReport.objects.filter(fingerprint=fingerprint).order_by('-created_at')
+        own = same.filter(created_by=request.user).filter(
+            Q(status='ready') | Q(status='pending', created_at__gte=timezone.now() - REPORT_PENDING_REUSE_WINDOW)
+        ).first()
+        if own and (own.status == 'pending' or os.path.exists(own.file_path)):
+            return Response(OrderReportSerializer(own).data, status=200)
+
         report = OrderReport.objects.create(
             created_by=request.user,
             report_type=report_type,
-            start_date=start_date,
-            end_date=end_date,
+            start_date=start,
+            end_date=end,
             file_path='',
-            status='pending'
+            status='pending',
+            fingerprint=fingerprint,
         )
-        generate_order_report.delay(report.id)
+        ready = next((r for r in same.filter(status='ready') if os.path.exists(r.file_path)), None)
+        if ready:
+            # Boshqa sotuvchi yaratgan tayyor fayl: task'siz darhol tayyor
+            report.file_path = link_report_file(ready.file_path, report.id)
+            report.status = 'ready'
+            report.save(update_fields=['file_path', 'status'])
+        else:
+            generate_order_report.delay(report.id)
         return Response(OrderReportSerializer(report).data, status=201)
 
     @action(detail=False, methods=['get'], permission_classes=[IsSellerUser])
@@ -159,36 +309,64 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsSellerUser])
     def stats(self, request):
-        """Seller dashboard statistics."""
-        qs = Order.objects.all()
-        total_orders = qs.count()
-        total_completed = qs.filter(status='completed').count()
-        completed_weight = qs.filter(status='completed').aggregate(w=Sum('total_weight'))['w'] or 0
-
-        status_breakdown = {
-            row['status']: row['c'] for row in qs.values('status').annotate(c=Count('id'))
-        }
+        """Seller dashboard statistics (keshlangan)."""
+        payload, cache_state = cached_stats(self._compute_stats)
+        response = Response(payload)
+        response['X-Stats-Cache'] = cache_state
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[IsSellerUser], url_path='stats/cache')
+    def stats_cache(self, request):
+        """Stats keshi hit/miss hisoblagichlari."""
+        return Response(stats_cache_info())
+
+    @action(detail=False, methods=['get'], permission_classes=[IsSellerUser], url_path='realtime/stats')
+    def realtime_stats(self, request):
+        """WebSocket publisher navbati (chuqurlik, kechikish) va consumer'larda birlashtirilgan/tashlangan frame'lar."""
+        return Response({**publisher.stats(), 'consumers': dict(consumer_stats)})
+
+    def _compute_stats(self):
+        """Stats payload'i (OrderDailyStats rollup'idan o'qiladi)."""
+        order_rows = OrderDailyStats.objects.filter(product_type=OrderDailyStats.ORDER_LEVEL)
+
+        status_breakdown = {}
+        completed_weight = 0
+        for row in order_rows.values('status').annotate(c=Sum('order_count'), w=Sum('total_weight')):
+            if row['c']:
+                status_breakdown[row['status']] = row['c']
+            if row['status'] == 'completed':
+                completed_weight = row['w'] or 0
+        total_orders = sum(status_breakdown.values())
+        total_completed = status_breakdown.get('completed', 0)
 
         # Product type breakdown (count & total quantity kg across items)
         product_type_breakdown = {}
-        item_qs = OrderItem.objects.select_related('product')
-        for row in item_qs.values('product__product_type').annotate(c=Count('id'), q=Sum('quantity_kg')):
-            product_type_breakdown[row['product__product_type']] = {
-                'orders': row['c'],
-                'quantity_kg': float(row['q'] or 0)
-            }
+        item_rows = OrderDailyStats.objects.exclude(product_type=OrderDailyStats.ORDER_LEVEL)
+        for row in item_rows.values('product_type').annotate(c=Sum('item_count'), q=Sum('quantity_kg')):
+            if row['c']:
+                product_type_breakdown[row['product_type']] = {
+                    'orders': row['c'],
+                    'quantity_kg': float(row['q'] or 0)
+                }
 
-        # Last 7 days trend (including today) + deltas
+        # Oxirgi 14 kun: bitta so'rov bilan
         today = timezone.localdate()
+        day_counts = defaultdict(int)
+        day_completed_weight = defaultdict(float)
+        recent = order_rows.filter(date__gte=today - timedelta(days=13), date__lte=today)
+        for row in recent.values('date', 'status', 'order_count', 'total_weight'):
+            day_counts[row['date']] += row['order_count']
+            if row['status'] == 'completed':
+                day_completed_weight[row['date']] += float(row['total_weight'])
+
+        # Last 7 days trend (including today) + deltas
         last7 = []
         for i in range(6, -1, -1):  # 6 days ago to today
             day = today - timedelta(days=i)
-            day_orders = qs.filter(created_at__date=day)
-            day_completed_weight = day_orders.filter(status='completed').aggregate(w=Sum('total_weight'))['w'] or 0
             last7.append({
                 'date': day.isoformat(),
-                'count': day_orders.count(),
-                'completed_weight': float(day_completed_weight),
+                'count': day_counts[day],
+                'completed_weight': day_completed_weight[day],
             })
 
         # Delta calculations
@@ -202,13 +380,13 @@ class OrderViewSet(viewsets.ModelViewSet):
         last7_total = sum(d['count'] for d in last7)
         prev7_start = today - timedelta(days=13)
         prev7_end = today - timedelta(days=7)
-        prev7_total = qs.filter(created_at__date__gte=prev7_start, created_at__date__lte=prev7_end).count()
+        prev7_total = sum(count for day, count in day_counts.items() if prev7_start <= day <= prev7_end)
         if prev7_total == 0:
             week_count_delta_pct = 100.0 if last7_total > 0 else 0.0
         else:
             week_count_delta_pct = ((last7_total - prev7_total) / prev7_total) * 100.0
 
-        return Response({
+        return {
             'total_orders': total_orders,
             'total_completed': total_completed,
             'total_weight_completed': float(completed_weight),
@@ -223,4 +401,4 @@ class OrderViewSet(viewsets.ModelViewSet):
                 'prev7_total': prev7_total,
                 'week_count_delta_pct': week_count_delta_pct,
             }
-        })
+        }
@@ -0,0 +1,102 @@
+# products/catalog.py
+
+"""Mahsulot katalogi (``ProductViewSet.list``) uchun jarayon ichidagi kesh.
+
+Tayyor (serializatsiya qilingan) javoblar har bir worker'ning xotirasida
+saqlanadi: ``public`` - mavjud mahsulotlar, ``seller`` - to'liq ro'yxat.
+Yozuvlar umumiy Django cache'dagi (Redis) versiya kaliti bilan belgilanadi:
+mahsulot saqlansa yoki zaxirasi o'zgarsa (``products.signals``) versiya
+commit'dan keyin oshiriladi va barcha worker'lar keyingi so'rovdayoq yangi
+ro'yxatni quradi. Keshdan javob berishda baza umuman ishlatilmaydi.
+
+Versiya kaliti boshqa jarayonlar (Celery worker, ``seed_load``, boshqa web
+worker) oshirgan o'zgarishni ko'rishi uchun cache umumiy bo'lishi kerak:
+``CACHE_URL=locmem`` bilan kesh o'chiriladi. Har bir yozuv baribir
+``PRODUCT_CATALOG_MAX_AGE`` soniyadan keyin qayta quriladi.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_KEY = 'products:catalog:version'
+# Bo'laklangan zaxira ``Product.updated_at`` ga tegmaydi: oxirgi zaxira o'zgarishi vaqti shu yerda
+STOCK_CHANGED_KEY = 'products:catalog:stock_changed_at'
+# So'rov parametrlari (sahifa, page_size, host) kombinatsiyalari uchun chegara
+MAX_ENTRIES = 256
+
+CatalogEntry = namedtuple('CatalogEntry', 'data etag last_modified')
+
+_entries = {}
+_lock = threading.Lock()
+
+
+def enabled():
+    # locmem'da boshqa jarayonning invalidatsiyasi ko'rinmaydi: eski katalogdan ko'ra keshsiz yaxshi
+    return getattr(settings, 'PRODUCT_CATALOG_CACHE_ENABLED', False) and getattr(settings, 'SHARED_CACHE', False)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        if not cache.add(VERSION_KEY, 2, timeout=None):
+            cache.incr(VERSION_KEY)
+    clear_local()
+
+
+def invalidate():
+    """Katalogni eskirgan deb belgilash (tranzaksiya commit bo'lgach)."""
+    transaction.on_commit(_bump)
+
+
+def stock_changed():
+    """Zaxira o'zgarishini commit'dan keyin qayd etish: versiya va Last-Modified uchun vaqt."""
+    def _record():
+        cache.set(STOCK_CHANGED_KEY, timezone.now(), timeout=None)
+        _bump()
+    transaction.on_commit(_record)
+
+
+def stock_changed_at():
+    return cache.get(STOCK_CHANGED_KEY)
+
+
+def clear_local():
+    with _lock:
+        _entries.clear()
+
+
+def get_or_build(scope, params, build):
+    """``(scope, params)`` uchun keshlangan javob yoki ``build()`` natijasi.
+
+    ``build`` ``(data, etag, last_modified)`` qaytaradi. ``(entry, hit)`` qaytariladi.
+    """
+    version = current_version()
+    key = (scope, params)
+    now = time.monotonic()
+    with _lock:
+        cached = _entries.get(key)
+    if cached is not None and cached[0] == version and now - cached[1] < settings.PRODUCT_CATALOG_MAX_AGE:
+        return cached[2], True
+
+    # Versiya qurishdan oldin o'qilgan: qurish paytidagi o'zgarish keyingi so'rovda ko'rinadi
+    entry = CatalogEntry(*build())
+    with _lock:
+        if len(_entries) >= MAX_ENTRIES:
+            _entries.clear()
+        _entries[key] = (version, now, entry)
+    return entry, False
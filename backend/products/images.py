@@ -0,0 +1,81 @@
+# products/images.py
+
+"""Mahsulot rasmining kichraytirilgan nusxalarini (derivative) tayyorlash.
+
+Asl fayl o'zgarishsiz qoladi. Har bir o'lcham uchun WebP va JPEG (WebP'ni
+qo'llamaydigan mijozlar uchun) nusxa yoziladi; natija ``Product.image_variants``
+ga quyidagicha saqlanadi::
+
+    {"source": "products/x.jpg",
+     "sizes": {"card": {"width": 480, "height": 360,
+                        "webp": "products/derived/7/x_card.webp",
+                        "jpeg": "products/derived/7/x_card.jpg"}, ...}}
+"""
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# O'lcham nomi -> eng uzun tomon (px). Asl rasm kichik bo'lsa kattalashtirilmaydi
+SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1280,
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+DERIVED_DIR = 'products/derived'
+
+
+def _flatten(image):
+    """Shaffof fonni oq rangga aylantirib RGB rasm qaytarish (JPEG alfa kanalni bilmaydi)."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, fmt, **options):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(product_id, source_name):
+    """``source_name`` rasmidan barcha o'lchamlarni yozish va variantlar xaritasini qaytarish."""
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    with default_storage.open(source_name, 'rb') as fh:
+        original = Image.open(fh)
+        # Telefon rasmlari EXIF orqali aylantirilgan bo'ladi
+        original = _flatten(ImageOps.exif_transpose(original))
+
+    sizes = {}
+    for size, edge in SIZES.items():
+        image = original.copy()
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        base = f"{DERIVED_DIR}/{product_id}/{stem}_{size}"
+        variant = {'width': image.width, 'height': image.height}
+        for key, ext, fmt, options in (
+            ('webp', 'webp', 'WEBP', {'quality': WEBP_QUALITY, 'method': 4}),
+            ('jpeg', 'jpg', 'JPEG', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+        ):
+            name = f"{base}.{ext}"
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variant[key] = default_storage.save(name, _encode(image, fmt, **options))
+        sizes[size] = variant
+    return {'source': source_name, 'sizes': sizes}
+
+
+def delete_variants(variants):
+    """Eski variant fayllarini o'chirish (yangi rasm yuklanganda)."""
+    for variant in (variants or {}).get('sizes', {}).values():
+        for key in ('webp', 'jpeg'):
+            name = variant.get(key)
+            if name and default_storage.exists(name):
+                default_storage.delete(name)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.models import Product
+from products import stock
+
+
+class Command(BaseCommand):
+    help = "Ko'p so'raladigan mahsulot zaxirasini N ta bo'lakka bo'ladi (0 yoki 1 - bo'lishni o'chiradi)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_id', type=int)
+        parser.add_argument('--shards', type=int, default=8, help="Bo'laklar soni (standart: 8)")
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(pk=options['product_id']).first()
+        if not product:
+            raise CommandError(f"Mahsulot topilmadi: {options['product_id']}")
+        if options['shards'] < 0:
+            raise CommandError("Bo'laklar soni manfiy bo'lishi mumkin emas")
+        stock.configure_shards(product, options['shards'])
+        product.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f"{product.name}: {product.stock_shard_count} ta bo'lak, jami {stock.available(product)} kg"
+        ))
@@ -14,7 +14,11 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan vaqti")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan vaqti")
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Celery tayyorlaydigan kichraytirilgan nusxalar (products.images); bo'sh bo'lsa hali tayyor emas
+    image_variants = models.JSONField(default=dict, blank=True, verbose_name="Rasm o'lchamlari")
     stock_kg = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name="Ombordagi miqdor (kg)")
+    # 0 bo'lsa zaxira stock_kg ustunida, aks holda ProductStockShard qatorlarida saqlanadi
+    stock_shard_count = models.PositiveSmallIntegerField(default=0, verbose_name="Zaxira bo'laklari soni")
 
     def __str__(self):
         return self.name
@@ -25,4 +29,19 @@ class Product(models.Model):
             models.Index(fields=['is_available']),
             models.Index(fields=['created_at']),
             models.Index(fields=['stock_kg']),
-        ]
\ No newline at end of file
+        ]
+
+
+class ProductStockShard(models.Model):
+    """Ko'p so'raladigan mahsulot zaxirasining bir bo'lagi (jami = bo'laklar yig'indisi)."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards', verbose_name="Mahsulot")
+    shard = models.PositiveSmallIntegerField(verbose_name="Bo'lak raqami")
+    stock_kg = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name="Ombordagi miqdor (kg)")
+
+    def __str__(self):
+        return f"{self.product_id}#{self.shard}: {self.stock_kg}kg"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='unique_product_stock_shard'),
+        ]
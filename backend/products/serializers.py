@@ -1,14 +1,58 @@
 # products/serializers.py
 
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from .models import Product
+from . import stock
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    # {'thumb'|'card'|'full': {'width', 'height', 'webp', 'jpeg'}}; nusxalar tayyor bo'lmaguncha {}
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'product_type', 'description', 'is_available', 'stock_kg',
-            'created_at', 'updated_at', 'image'
+            'created_at', 'updated_at', 'image', 'images'
         ]
-        read_only_fields = ['created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at']
+
+    def get_images(self, instance):
+        variants = instance.image_variants or {}
+        # Eski rasmning nusxalari yangi rasm uchun ko'rsatilmaydi
+        if not instance.image or variants.get('source') != instance.image.name:
+            return {}
+        request = self.context.get('request')
+
+        def url(name):
+            file_url = default_storage.url(name)
+            return request.build_absolute_uri(file_url) if request else file_url
+
+        return {
+            size: {'width': v['width'], 'height': v['height'], 'webp': url(v['webp']), 'jpeg': url(v['jpeg'])}
+            for size, v in variants.get('sizes', {}).items()
+        }
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.stock_shard_count:
+            # Bo'laklangan zaxira: jami miqdor bo'laklar yig'indisidan o'qiladi
+            # (ro'yxatda ``stock.with_totals`` annotatsiyasidan, aks holda alohida SUM)
+            if hasattr(instance, 'shard_stock_kg'):
+                total = Decimal(instance.shard_stock_kg or 0).quantize(Decimal('0.01'))
+            else:
+                total = stock.available(instance)
+            data['stock_kg'] = self.fields['stock_kg'].to_representation(total)
+        return data
+
+    def update(self, instance, validated_data):
+        new_stock = validated_data.pop('stock_kg', None) if instance.stock_shard_count else None
+        instance = super().update(instance, validated_data)
+        if new_stock is not None:
+            stock.set_stock(instance, new_stock)
+            # get_object() annotatsiyasi endi eskirgan
+            instance.__dict__.pop('shard_stock_kg', None)
+        return instance
@@ -0,0 +1,22 @@
+# products/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import catalog
+from .models import Product
+
+# Zaxira QuerySet.update() bilan o'zgaradi (post_save chaqirilmaydi), shuning uchun
+# products.stock har bir o'zgarishdan keyin shu signalni yuboradi. Argument: product_ids
+stock_changed = Signal()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    catalog.invalidate()
+
+
+@receiver(stock_changed)
+def product_stock_changed(sender, **kwargs):
+    catalog.stock_changed()
@@ -0,0 +1,194 @@
+# products/stock.py
+
+"""Mahsulot zaxirasini qulfsiz (lock-free) boshqarish.
+
+Zaxira hech qachon "o'qi -> hisobla -> saqla" usulida o'zgartirilmaydi. Har bir
+kamaytirish ``UPDATE ... SET stock_kg = stock_kg - q WHERE stock_kg >= q``
+ko'rinishidagi shartli so'rov bilan bajariladi, shuning uchun bir vaqtda
+kelgan buyurtmalar zaxirani manfiyga tushira olmaydi.
+
+Juda ko'p so'raladigan mahsulotlar uchun zaxirani N ta bo'lakka
+(``ProductStockShard``) bo'lish mumkin: kamaytirish tasodifiy bo'lakdan
+boshlanadi, jami zaxira esa bo'laklar yig'indisi sifatida o'qiladi.
+Bo'laklangan mahsulotning ``Product`` qatoriga buyurtma paytida umuman
+yozilmaydi (aks holda bitta issiq qator yana qulflanadi); katalog va ETag
+``stock_changed`` signali orqali yangilanadi.
+"""
+
+import random
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Sum, DecimalField, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Product, ProductStockShard
+from .signals import stock_changed
+
+STOCK_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+class InsufficientStock(Exception):
+    """Mahsulot uchun yetarli zaxira yo'q."""
+
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f"Product {product_id}: insufficient stock for {requested} kg")
+
+
+def available(product: Product) -> Decimal:
+    """Mahsulotning joriy jami zaxirasi (bo'laklangan bo'lsa yig'indi)."""
+    if not product.stock_shard_count:
+        return product.stock_kg
+    total = ProductStockShard.objects.filter(product_id=product.pk).aggregate(s=Sum('stock_kg'))['s']
+    return Decimal(total or 0).quantize(Decimal('0.01'))
+
+
+def with_totals(queryset):
+    """Bo'laklangan mahsulotlar jami zaxirasini ``shard_stock_kg`` sifatida annotatsiya qilish."""
+    shards = (ProductStockShard.objects.filter(product_id=OuterRef('pk')).order_by()
+              .values('product_id').annotate(total=Sum('stock_kg')).values('total'))
+    return queryset.annotate(shard_stock_kg=Subquery(shards, output_field=STOCK_FIELD))
+
+
+def decrement(product: Product, qty) -> None:
+    """Bitta mahsulot zaxirasini shartli kamaytirish; yetmasa InsufficientStock."""
+    decrement_many({product.pk: qty}, {product.pk: product})
+
+
+def decrement_many(requested: dict, products: dict = None) -> None:
+    """``{product_id: qty}`` bo'yicha zaxirani kamaytirish.
+
+    Bo'laklanmagan mahsulotlar bitta shartli UPDATE bilan yangilanadi. Qaysidir
+    mahsulotga zaxira yetmasa InsufficientStock ko'tariladi va bu funksiya
+    qilgan o'zgarishlar bekor qilinadi.
+    """
+    if products is None:
+        products = Product.objects.only('id', 'stock_shard_count').in_bulk(list(requested))
+    sharded = {pid: qty for pid, qty in requested.items() if products[pid].stock_shard_count}
+    plain = {pid: qty for pid, qty in requested.items() if pid not in sharded}
+
+    with transaction.atomic():
+        if plain:
+            _decrement_plain(plain)
+        for pid, qty in sharded.items():
+            _decrement_sharded(products[pid], qty)
+    stock_changed.send(sender=Product, product_ids=list(requested))
+
+
+class _PartialUpdate(Exception):
+    pass
+
+
+def _decrement_plain(plain: dict) -> None:
+    guard = Q()
+    for pid, qty in plain.items():
+        guard |= Q(pk=pid, stock_kg__gte=qty)
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(guard).update(
+                stock_kg=Case(
+                    *[When(pk=pid, then=F('stock_kg') - qty) for pid, qty in plain.items()],
+                    output_field=STOCK_FIELD,
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(plain):
+                # Savepoint'ni qaytarish uchun
+                raise _PartialUpdate()
+    except _PartialUpdate:
+        current = dict(Product.objects.filter(pk__in=list(plain)).values_list('pk', 'stock_kg'))
+        short = next((pid for pid, qty in plain.items() if current.get(pid, 0) < qty), next(iter(plain)))
+        raise InsufficientStock(short, plain[short])
+
+
+def _decrement_sharded(product: Product, qty) -> None:
+    count = product.stock_shard_count
+    start = random.randrange(count)
+    order = [(start + i) % count for i in range(count)]
+    shards = ProductStockShard.objects.filter(product_id=product.pk)
+    # Avval bitta bo'lakdan to'liq olishga urinamiz (eng ko'p uchraydigan holat)
+    for shard in order:
+        if shards.filter(shard=shard, stock_kg__gte=qty).update(stock_kg=F('stock_kg') - qty):
+            return
+    # Hech bir bo'lak o'zi yetmaydi: bir nechta bo'lakdan yig'amiz, har biri shartli
+    remaining = Decimal(qty)
+    levels = dict(shards.values_list('shard', 'stock_kg'))
+    if sum(levels.values(), Decimal('0')) < remaining:
+        raise InsufficientStock(product.pk, qty)
+    for shard in order:
+        take = min(levels.get(shard, Decimal('0')), remaining)
+        if take <= 0:
+            continue
+        if not shards.filter(shard=shard, stock_kg__gte=take).update(stock_kg=F('stock_kg') - take):
+            raise InsufficientStock(product.pk, qty)
+        remaining -= take
+        if remaining <= 0:
+            return
+    raise InsufficientStock(product.pk, qty)
+
+
+def restore_many(returned: dict) -> None:
+    """``{product_id: qty}`` bo'yicha zaxirani qaytarish (bekor qilingan buyurtmalar)."""
+    if not returned:
+        return
+    shard_counts = dict(Product.objects.filter(pk__in=list(returned)).values_list('pk', 'stock_shard_count'))
+    plain = {pid: qty for pid, qty in returned.items() if not shard_counts.get(pid)}
+    with transaction.atomic():
+        if plain:
+            Product.objects.filter(pk__in=list(plain)).update(
+                stock_kg=Case(
+                    *[When(pk=pid, then=F('stock_kg') + qty) for pid, qty in plain.items()],
+                    output_field=STOCK_FIELD,
+                ),
+                updated_at=timezone.now(),
+            )
+        for pid, qty in returned.items():
+            count = shard_counts.get(pid)
+            if count:
+                ProductStockShard.objects.filter(product_id=pid, shard=random.randrange(count)).update(
+                    stock_kg=F('stock_kg') + qty
+                )
+    stock_changed.send(sender=Product, product_ids=list(returned))
+
+
+def set_stock(product: Product, total) -> None:
+    """Jami zaxirani o'rnatish (sotuvchi tahriri); bo'laklar orasida teng taqsimlanadi."""
+    total = Decimal(total)
+    if not product.stock_shard_count:
+        product.stock_kg = total
+        product.save(update_fields=['stock_kg', 'updated_at'])
+        return
+    _write_shards(product, product.stock_shard_count, total)
+
+
+@transaction.atomic
+def configure_shards(product: Product, count: int) -> None:
+    """Mahsulot zaxirasini ``count`` ta bo'lakka bo'lish (0 yoki 1 - bo'lishni o'chirish)."""
+    product = Product.objects.select_for_update().get(pk=product.pk)
+    total = available(product)
+    if count <= 1:
+        ProductStockShard.objects.filter(product_id=product.pk).delete()
+        product.stock_shard_count = 0
+        product.stock_kg = total
+        product.save(update_fields=['stock_shard_count', 'stock_kg', 'updated_at'])
+        return
+    product.stock_shard_count = count
+    product.stock_kg = Decimal('0.00')
+    product.save(update_fields=['stock_shard_count', 'stock_kg', 'updated_at'])
+    _write_shards(product, count, total)
+
+
+def _write_shards(product: Product, count: int, total: Decimal) -> None:
+    share = (total / count).quantize(Decimal('0.01'), rounding='ROUND_DOWN')
+    amounts = [share] * count
+    amounts[0] += total - share * count
+    with transaction.atomic():
+        ProductStockShard.objects.filter(product_id=product.pk).delete()
+        ProductStockShard.objects.bulk_create([
+            ProductStockShard(product_id=product.pk, shard=i, stock_kg=amount)
+            for i, amount in enumerate(amounts)
+        ])
+        Product.objects.filter(pk=product.pk).update(updated_at=timezone.now())
+    stock_changed.send(sender=Product, product_ids=[product.pk])
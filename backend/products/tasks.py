@@ -0,0 +1,38 @@
+# products/tasks.py
+
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from .models import Product
+from . import catalog, images
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def generate_product_image_variants(product_id: int, source_name: str):
+    """Yuklangan rasmdan thumb/card/full (WebP + JPEG) nusxalarini yaratish."""
+    product = Product.objects.filter(pk=product_id).only('id', 'image', 'image_variants').first()
+    if product is None or product.image.name != source_name:
+        # Mahsulot o'chirilgan yoki undan keyin yangi rasm yuklangan
+        return "SKIPPED"
+    try:
+        variants = images.generate_variants(product_id, source_name)
+    except OSError as e:
+        logger.error(f"Rasm nusxalarini yaratib bo'lmadi (product {product_id}, {source_name}): {e}")
+        return "FAILED"
+
+    # Faqat rasm hali o'sha bo'lsa yozamiz (parallel yuklash bilan poyga bo'lmasin)
+    updated = Product.objects.filter(pk=product_id, image=source_name).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    if not updated:
+        images.delete_variants(variants)
+        return "SKIPPED"
+    if product.image_variants.get('source') != source_name:
+        images.delete_variants(product.image_variants)
+    # QuerySet.update() post_save yubormaydi
+    catalog.invalidate()
+    return "READY"
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import Product
+from . import catalog, stock
+
+User = get_user_model()
+
+
+@override_settings(PRODUCT_CATALOG_CACHE_ENABLED=True)
+class ProductCatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog.clear_local()
+        self.seller = User.objects.create_user(username='seller_catalog', password='pass', role='seller')
+        self.leg = Product.objects.create(name='Catalog Leg', product_type='leg', stock_kg=10)
+        Product.objects.create(name='Catalog Hidden', product_type='wing', is_available=False)
+        self.client = APIClient()
+
+    def _names(self, resp):
+        return [p['name'] for p in resp.data['results']]
+
+    def test_anonymous_hit_skips_database(self):
+        first = self.client.get('/api/products/')
+        self.assertEqual(first['X-Catalog-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/products/')
+        self.assertEqual(again['X-Catalog-Cache'], 'HIT')
+        self.assertEqual(again.data, first.data)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_seller_scope_is_separate(self):
+        self.assertEqual(self._names(self.client.get('/api/products/')), ['Catalog Leg'])
+        self.client.force_authenticate(self.seller)
+        resp = self.client.get('/api/products/')
+        self.assertEqual(resp['X-Catalog-Cache'], 'MISS')
+        self.assertEqual(len(resp.data['results']), 2)
+
+    def test_save_invalidates(self):
+        self.client.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leg.name = 'Catalog Leg 2'
+            self.leg.save()
+        resp = self.client.get('/api/products/')
+        self.assertEqual(resp['X-Catalog-Cache'], 'MISS')
+        self.assertEqual(self._names(resp), ['Catalog Leg 2'])
+
+    def test_stock_change_invalidates(self):
+        self.client.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.decrement(self.leg, 4)
+        resp = self.client.get('/api/products/')
+        self.assertEqual(resp['X-Catalog-Cache'], 'MISS')
+        self.assertEqual(resp.data['results'][0]['stock_kg'], '6.00')
+
+    def test_version_bump_from_other_process(self):
+        self.client.get('/api/products/')
+        # Boshqa worker commit qilgan o'zgarish: faqat umumiy versiya kaliti oshadi
+        cache.incr(catalog.VERSION_KEY)
+        self.assertEqual(self.client.get('/api/products/')['X-Catalog-Cache'], 'MISS')
+
+    def test_query_params_keyed_separately(self):
+        self.client.get('/api/products/')
+        resp = self.client.get('/api/products/', {'page_size': 1})
+        self.assertEqual(resp['X-Catalog-Cache'], 'MISS')
+        self.assertEqual(len(resp.data['results']), 1)
+
+    def test_entry_expires_after_max_age(self):
+        self.client.get('/api/products/')
+        with patch('products.catalog.time.monotonic', return_value=catalog.time.monotonic() + 301):
+            self.assertEqual(self.client.get('/api/products/')['X-Catalog-Cache'], 'MISS')
+
+    @override_settings(SHARED_CACHE=False)
+    def test_disabled_without_shared_cache(self):
+        self.assertFalse(catalog.enabled())
+        self.client.get('/api/products/')
+        self.assertNotEqual(self.client.get('/api/products/').get('X-Catalog-Cache'), 'HIT')
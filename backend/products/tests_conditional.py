@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from .models import Product
+from . import stock
+
+User = get_user_model()
+
+
+class ProductConditionalGetTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller_etag', password='pass', role='seller')
+        self.product = Product.objects.create(name='ETag Leg', product_type='leg', stock_kg=10)
+        Product.objects.create(name='Hidden Wing', product_type='wing', is_available=False)
+        # Last-Modified faqat tugagan soniya uchun beriladi
+        Product.objects.update(updated_at=timezone.now() - timedelta(seconds=5))
+        self.client = APIClient()
+
+    def test_not_modified_without_serialization(self):
+        first = self.client.get('/api/products/')
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', first)
+        # Faqat validator agregati: sahifa va COUNT so'rovlari bajarilmaydi
+        with self.assertNumQueries(1):
+            again = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_if_modified_since(self):
+        first = self.client.get('/api/products/')
+        again = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_no_last_modified_within_current_second(self):
+        # Javob va keyingi o'zgarish bir soniyada: If-Modified-Since buni ajrata olmaydi
+        now = timezone.now()
+        Product.objects.filter(pk=self.product.pk).update(updated_at=now)
+        with patch('chicken_store.conditional.time') as clock:
+            clock.time.return_value = now.timestamp()
+            first = self.client.get('/api/products/')
+            self.assertNotIn('Last-Modified', first)
+            self.assertIn('ETag', first)
+            resp = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=http_date(now.timestamp()))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_stock_change_invalidates(self):
+        etag = self.client.get('/api/products/')['ETag']
+        stock.decrement(self.product, 1)
+        resp = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_sharded_stock_change_invalidates(self):
+        stock.configure_shards(self.product, 4)
+        self.product.refresh_from_db()
+        etag = self.client.get('/api/products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.decrement(self.product, 1)
+        resp = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['results'][0]['stock_kg'], '9.00')
+
+    def test_sharded_totals_without_per_row_query(self):
+        stock.configure_shards(self.product, 4)
+        with CaptureQueriesContext(connection) as one:
+            self.client.get('/api/products/')
+        # captured_queries dangasa: keyingi so'rov boshida jurnal tozalanadi
+        baseline = len(one)
+        for i in range(3):
+            extra = Product.objects.create(name=f'Sharded {i}', product_type='leg', stock_kg=6)
+            stock.configure_shards(extra, 3)
+        with CaptureQueriesContext(connection) as many:
+            resp = self.client.get('/api/products/')
+        self.assertEqual(len(many), baseline)
+        self.assertEqual({row['stock_kg'] for row in resp.data['results']}, {'10.00', '6.00'})
+
+    def test_delete_invalidates(self):
+        other = Product.objects.create(name='Old Breast', product_type='breast')
+        etag = self.client.get('/api/products/')['ETag']
+        other.delete()
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_scope_and_query_params(self):
+        public = self.client.get('/api/products/')['ETag']
+        self.client.force_authenticate(self.seller)
+        seller = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=public)
+        self.assertEqual(seller.status_code, 200)
+        self.assertEqual(len(seller.data['results']), 2)
+        page2 = self.client.get('/api/products/', {'page_size': 1}, HTTP_IF_NONE_MATCH=seller['ETag'])
+        self.assertEqual(page2.status_code, 200)
+
+    def test_retrieve(self):
+        first = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(first.status_code, 200)
+        again = self.client.get(f'/api/products/{self.product.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
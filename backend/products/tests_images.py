@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import catalog
+from .images import SIZES
+from .models import Product
+from .tasks import generate_product_image_variants
+
+User = get_user_model()
+
+
+def make_upload(name='photo.jpg', size=(2000, 1500), mode='RGB', fmt='JPEG'):
+    buffer = BytesIO()
+    Image.new(mode, size, color=(200, 30, 30) if mode == 'RGB' else (200, 30, 30, 0)).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+class ProductImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.seller = User.objects.create_user(username='seller_img', password='pass', role='seller')
+        self.product = Product.objects.create(name='Image Leg', product_type='leg')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def _upload(self, upload, run_tasks=True):
+        with self.captureOnCommitCallbacks(execute=run_tasks):
+            resp = self.client.post(f'/api/products/{self.product.id}/upload_image/', {'image': upload}, format='multipart')
+        self.assertEqual(resp.status_code, 200)
+        self.product.refresh_from_db()
+        return resp
+
+    def _path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def test_upload_returns_before_processing(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            resp = self.client.post(f'/api/products/{self.product.id}/upload_image/', {'image': make_upload()}, format='multipart')
+        self.assertEqual(resp.data['images'], {})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_variants, {})
+
+    def test_variants_generated(self):
+        self._upload(make_upload())
+        sizes = self.product.image_variants['sizes']
+        self.assertEqual(set(sizes), set(SIZES))
+        for size, edge in SIZES.items():
+            self.assertEqual(sizes[size]['width'], edge)
+            with Image.open(self._path(sizes[size]['webp'])) as webp:
+                self.assertEqual(webp.format, 'WEBP')
+                self.assertEqual(webp.size, (edge, edge * 3 // 4))
+            with Image.open(self._path(sizes[size]['jpeg'])) as jpeg:
+                self.assertEqual(jpeg.format, 'JPEG')
+        resp = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertTrue(resp.data['images']['card']['webp'].endswith('_card.webp'))
+        self.assertTrue(resp.data['images']['thumb']['jpeg'].startswith('http://testserver/media/'))
+
+    @override_settings(PRODUCT_CATALOG_CACHE_ENABLED=True)
+    def test_variants_reach_cached_catalog(self):
+        cache.clear()
+        catalog.clear_local()
+        self.addCleanup(catalog.clear_local)
+        self._upload(make_upload(), run_tasks=False)
+        resp = self.client.get('/api/products/')
+        self.assertEqual(resp['X-Catalog-Cache'], 'MISS')
+        self.assertEqual(resp.data['results'][0]['images'], {})
+
+        # Task Celery worker'da ishlaydi: bu jarayonning yozuvlariga tegmaydi, faqat umumiy versiya oshadi
+        with patch('products.catalog.clear_local'), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(generate_product_image_variants(self.product.id, self.product.image.name), 'READY')
+        resp = self.client.get('/api/products/')
+        self.assertEqual(resp['X-Catalog-Cache'], 'MISS')
+        self.assertTrue(resp.data['results'][0]['images']['card']['webp'].endswith('_card.webp'))
+
+    def test_small_transparent_image_not_upscaled(self):
+        self._upload(make_upload('logo.png', size=(100, 80), mode='RGBA', fmt='PNG'))
+        full = self.product.image_variants['sizes']['full']
+        self.assertEqual((full['width'], full['height']), (100, 80))
+        with Image.open(self._path(full['jpeg'])) as jpeg:
+            self.assertEqual(jpeg.getpixel((0, 0)), (255, 255, 255))
+
+    def test_reupload_replaces_old_variants(self):
+        self._upload(make_upload('first.jpg'))
+        old = [self._path(v['webp']) for v in self.product.image_variants['sizes'].values()]
+        self._upload(make_upload('second.jpg'))
+        self.assertEqual(self.product.image_variants['source'], self.product.image.name)
+        self.assertFalse(any(os.path.exists(path) for path in old))
+
+    def test_stale_task_is_skipped(self):
+        self._upload(make_upload('first.jpg'), run_tasks=False)
+        stale_name = self.product.image.name
+        self._upload(make_upload('second.jpg'))
+        self.assertEqual(generate_product_image_variants(self.product.id, stale_name), 'SKIPPED')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_variants['source'], self.product.image.name)
+
+    def test_broken_image_fails_quietly(self):
+        upload = SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg')
+        self.product.image.save('broken.jpg', upload)
+        self.assertEqual(generate_product_image_variants(self.product.id, self.product.image.name), 'FAILED')
@@ -0,0 +1,145 @@
+import threading
+import time
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.db import connection, OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.db.models.query import QuerySet
+from django.test.utils import CaptureQueriesContext
+from .models import Product, ProductStockShard
+from . import stock
+
+
+def _hammer(product_id, qty, attempts, threads):
+    """Bir mahsulotga ko'p oqimdan parallel buyurtma; muvaffaqiyatli kamaytirishlar sonini qaytaradi."""
+    successes = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker():
+        start.wait()
+        try:
+            for _ in range(attempts):
+                while True:
+                    try:
+                        product = Product.objects.get(pk=product_id)
+                        stock.decrement(product, qty)
+                        with lock:
+                            successes.append(1)
+                        break
+                    except stock.InsufficientStock:
+                        break
+                    except OperationalError:
+                        # SQLite yozish qulfi band: qayta urinamiz
+                        time.sleep(0.001)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return len(successes)
+
+
+@skipUnless(connection.vendor == 'postgresql', "SQLite barcha yozuvlarni bitta qulf bilan ketma-ket bajaradi")
+class StockConcurrencyTests(TransactionTestCase):
+    def test_no_oversell_plain(self):
+        product = Product.objects.create(name='Hot Leg', product_type='leg', stock_kg=50)
+        sold = _hammer(product.id, Decimal('1.00'), attempts=10, threads=8)
+        product.refresh_from_db()
+        self.assertEqual(sold, 50)
+        self.assertEqual(product.stock_kg, Decimal('0.00'))
+
+    def test_no_oversell_sharded(self):
+        product = Product.objects.create(name='Hot Leg S', product_type='leg', stock_kg=50)
+        stock.configure_shards(product, 4)
+        sold = _hammer(product.id, Decimal('1.50'), attempts=10, threads=8)
+        product.refresh_from_db()
+        remaining = stock.available(product)
+        self.assertEqual(Decimal('1.50') * sold + remaining, Decimal('50.00'))
+        self.assertGreaterEqual(remaining, Decimal('0.00'))
+        self.assertLess(remaining, Decimal('1.50'))
+        self.assertFalse(ProductStockShard.objects.filter(product=product, stock_kg__lt=0).exists())
+
+
+class StockShardTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Wing Hot', product_type='wing', stock_kg=10)
+
+    def test_configure_and_sum(self):
+        stock.configure_shards(self.product, 3)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_shard_count, 3)
+        self.assertEqual(ProductStockShard.objects.filter(product=self.product).count(), 3)
+        self.assertEqual(stock.available(self.product), Decimal('10.00'))
+
+    def test_decrement_spans_shards(self):
+        stock.configure_shards(self.product, 4)
+        self.product.refresh_from_db()
+        stock.decrement(self.product, Decimal('9.00'))
+        self.assertEqual(stock.available(self.product), Decimal('1.00'))
+        with self.assertRaises(stock.InsufficientStock):
+            stock.decrement(self.product, Decimal('2.00'))
+        self.assertEqual(stock.available(self.product), Decimal('1.00'))
+
+    def test_unshard_restores_column(self):
+        stock.configure_shards(self.product, 4)
+        stock.restore_many({self.product.id: Decimal('5.00')})
+        stock.configure_shards(self.product, 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_shard_count, 0)
+        self.assertEqual(self.product.stock_kg, Decimal('15.00'))
+
+    def test_sharded_path_does_not_write_product_row(self):
+        stock.configure_shards(self.product, 4)
+        self.product.refresh_from_db()
+        updated_at = self.product.updated_at
+        table = Product._meta.db_table
+        with CaptureQueriesContext(connection) as captured:
+            stock.decrement(self.product, Decimal('2.00'))
+            stock.restore_many({self.product.id: Decimal('1.00')})
+        # Issiq Product qatori qulflanmaydi: faqat bo'laklar yangilanadi
+        writes = [q['sql'] for q in captured if q['sql'].startswith('UPDATE') and f'"{table}"' in q['sql'].split(' SET')[0]]
+        self.assertEqual(writes, [])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.updated_at, updated_at)
+        self.assertEqual(stock.available(self.product), Decimal('9.00'))
+
+    def test_stale_reads_cannot_oversell(self):
+        # Ikki xaridor zaxirani bir vaqtda o'qiydi (10 kg), keyin ikkalasi ham yozadi
+        first = Product.objects.get(pk=self.product.pk)
+        second = Product.objects.get(pk=self.product.pk)
+        stock.decrement(first, Decimal('7.00'))
+        with self.assertRaises(stock.InsufficientStock):
+            stock.decrement(second, Decimal('7.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_kg, Decimal('3.00'))
+
+    def test_interleaved_decrement_on_same_shard_is_rejected(self):
+        self.product.stock_kg = Decimal('2.00')
+        self.product.save()
+        stock.configure_shards(self.product, 2)
+        self.product.refresh_from_db()
+        original = QuerySet.values_list
+        interleaved = []
+
+        def values_list(qs, *fields, **kwargs):
+            # A bo'laklar holatini o'qib bo'ldi ({0: 1, 1: 1}); yozishdan oldin B 0-bo'lakdan oladi
+            rows = list(original(qs, *fields, **kwargs))
+            if qs.model is ProductStockShard and not interleaved:
+                interleaved.append(1)
+                stock.decrement(self.product, Decimal('1.00'))
+            return rows
+
+        with mock.patch.object(stock.random, 'randrange', return_value=0), \
+                mock.patch.object(QuerySet, 'values_list', autospec=True, side_effect=values_list):
+            with self.assertRaises(stock.InsufficientStock):
+                stock.decrement(self.product, Decimal('1.50'))
+        self.assertEqual(interleaved, [1])
+        # Bo'laklar yig'indisi (2 kg) yetarli edi: A'ni 0-bo'lakdagi shartli UPDATE rad etdi.
+        # B bir xil ulanishda A'ning tranzaksiyasi ichida ishladi, shuning uchun u ham qaytarildi
+        self.assertEqual(stock.available(self.product), Decimal('2.00'))
+        self.assertFalse(ProductStockShard.objects.filter(product=self.product, stock_kg__lt=0).exists())
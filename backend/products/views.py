@@ -3,22 +3,65 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
+from django.utils.cache import get_conditional_response
 from .models import Product
 from .serializers import ProductSerializer
+from . import catalog, stock
+from .tasks import generate_product_image_variants
 from users.permissions import IsSellerUser
+from chicken_store.conditional import ConditionalGetMixin
 
-class ProductViewSet(viewsets.ModelViewSet):
+def schedule_image_variants(product):
+    """Rasm nusxalari task'ini commit'dan keyin navbatga qo'yish."""
+    product_id, source_name = product.pk, product.image.name
+    transaction.on_commit(lambda: generate_product_image_variants.delay(product_id, source_name))
+
+
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
 
+    def get_validator_scope(self):
+        # Sotuvchi mavjud bo'lmaganlarni ham ko'radi; qolganlar uchun katalog bir xil
+        return 'seller' if getattr(self.request.user, 'role', None) == 'seller' else 'public'
+
+    def get_external_last_modified(self):
+        # Bo'laklangan zaxira kamayishi Product.updated_at'ni o'zgartirmaydi
+        return catalog.stock_changed_at()
+
     def get_queryset(self):
         user = self.request.user if self.request else None
-        base = Product.objects.all()
+        base = stock.with_totals(Product.objects.all())
         if not user or not getattr(user, 'is_authenticated', False):
             return base.filter(is_available=True)
         if getattr(user, 'role', None) == 'seller':
             return base
         return base.filter(is_available=True)
 
+    def list(self, request, *args, **kwargs):
+        if not catalog.enabled():
+            return super().list(request, *args, **kwargs)
+        # Keshdan javob: na validator, na sahifa uchun bazaga murojaat qilinmaydi
+        query = tuple((key, tuple(values)) for key, values in sorted(request.GET.lists()))
+        params = (request.get_host(), query)
+        entry, hit = catalog.get_or_build(self.get_validator_scope(), params, self._build_catalog)
+        self._validators = (entry.etag, entry.last_modified)
+        response = (get_conditional_response(request, etag=entry.etag, last_modified=entry.last_modified)
+                    or Response(entry.data))
+        response['X-Catalog-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def _build_catalog(self):
+        etag, last_modified = self.get_validators()
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        # list(): ReturnList serializer'ga (va u orqali request'ga) havola saqlamasin
+        if page is not None:
+            data = self.get_paginated_response(list(self.get_serializer(page, many=True).data)).data
+        else:
+            data = list(self.get_serializer(queryset, many=True).data)
+        return data, etag, last_modified
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             permission_classes = [permissions.AllowAny]
@@ -34,4 +77,17 @@ class ProductViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Rasm yuborilmadi'}, status=status.HTTP_400_BAD_REQUEST)
         product.image = file_obj
         product.save()
-        return Response(ProductSerializer(product, context={'request': request}).data)
\ No newline at end of file
+        # Nusxalar fon rejimida tayyorlanadi; javob asl rasm bilan darhol qaytadi
+        schedule_image_variants(product)
+        return Response(ProductSerializer(product, context={'request': request}).data)
+
+    def perform_create(self, serializer):
+        product = serializer.save()
+        if product.image:
+            schedule_image_variants(product)
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.image.name
+        product = serializer.save()
+        if product.image and product.image.name != previous:
+            schedule_image_variants(product)
\ No newline at end of file
@@ -0,0 +1,216 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from orders import rollups, search
+from orders.models import Order, OrderItem
+from products import catalog
+from products.models import Product
+from users.models import CustomUser
+
+# Yuklama ma'lumotlari shu belgilar bilan ajratiladi (qayta ishga tushirilganda o'chiriladi)
+USER_PREFIX = 'load_'
+PRODUCT_PREFIX = '[load] '
+# Haqiqiy raqamlar UUID'ning hex qismi, 'L' bilan boshlanmaydi
+ORDER_PREFIX = 'L'
+PASSWORD = 'loadpass123'
+
+FIRST_NAMES = ['Ali', 'Vali', 'Aziz', 'Dilshod', 'Jasur', 'Sardor', 'Nodira', 'Malika', 'Gulnora', 'Shahlo', 'Bekzod', 'Umid']
+LAST_NAMES = ['Karimov', 'Aliyev', 'Rahimov', 'Tursunov', 'Yusupov', 'Qodirov', 'Ergashev', 'Saidov', 'Nazarov', 'Xolmatov']
+DISTRICTS = ['Chilonzor', 'Yunusobod', 'Mirzo Ulug\'bek', 'Yakkasaroy', 'Sergeli', 'Olmazor', 'Shayxontohur', 'Uchtepa']
+# Soat bo'yicha buyurtmalar ulushi (8:00-22:00, tush va kechqurun cho'qqi)
+HOUR_WEIGHTS = {8: 2, 9: 4, 10: 6, 11: 8, 12: 9, 13: 8, 14: 6, 15: 5, 16: 6, 17: 8, 18: 10, 19: 9, 20: 6, 21: 3}
+# Buyurtmadagi pozitsiyalar soni: 1..4
+ITEM_COUNT_WEIGHTS = [50, 30, 15, 5]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """auto_now/auto_now_add'ni vaqtincha o'chirish: bulk_create bergan vaqtlar saqlansin."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def pick_status(rng, age_days):
+    """Buyurtma yoshiga qarab real holat: eskilari yakunlangan yoki bekor qilingan."""
+    roll = rng.random()
+    if age_days >= 3:
+        return 'completed' if roll < 0.86 else 'cancelled'
+    if age_days >= 1:
+        for status, edge in (('process', 0.15), ('shipping', 0.45), ('completed', 0.9)):
+            if roll < edge:
+                return status
+        return 'cancelled'
+    for status, edge in (('pending', 0.45), ('reviewing', 0.75), ('process', 0.9), ('shipping', 0.95)):
+        if roll < edge:
+            return status
+    return 'cancelled'
+
+
+class Command(BaseCommand):
+    help = ("Yuklama sinovlari uchun katta hajmli sintetik ma'lumot: xaridorlar, mahsulotlar, buyurtmalar. "
+            "Bir xil --seed va --end-date bilan natija bir xil. Avvalgi seed_load ma'lumotlari o'chiriladi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=20000)
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--products', type=int, default=40)
+        parser.add_argument('--hot-products', type=int, default=4, help="Eng ko'p sotiladigan mahsulotlar soni")
+        parser.add_argument('--hot-share', type=float, default=0.6, help="Pozitsiyalarning hot mahsulotlarga ulushi")
+        parser.add_argument('--months', type=int, default=6, help="Buyurtmalar tarqatiladigan davr (oy)")
+        parser.add_argument('--end-date', help="Oxirgi kun (YYYY-MM-DD, standart: bugun)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--skip-derived', action='store_true',
+                            help="Stats rollup va qidiruv indeksini qayta qurmaslik")
+
+    def handle(self, *args, **options):
+        if options['buyers'] < 1 or options['orders'] < 0 or options['products'] < 1:
+            raise CommandError("--buyers va --products kamida 1, --orders manfiy emas bo'lishi kerak")
+        end_date = parse_date(options['end_date']) if options['end_date'] else timezone.localdate()
+        if end_date is None:
+            raise CommandError(f"Noto'g'ri sana: {options['end_date']}")
+        self.rng = random.Random(options['seed'])
+        self.chunk = options['chunk_size']
+        started = time.monotonic()
+
+        self._reset()
+        buyer_ids = self._buyers(options['buyers'])
+        products = self._products(options['products'])
+        with explicit_timestamps(Order, OrderItem):
+            orders, items = self._orders(options, end_date, buyer_ids, products)
+
+        if not options['skip_derived']:
+            self.stdout.write("Stats rollup va qidiruv indeksi qayta qurilmoqda...")
+            rollups.rebuild()
+            search.rebuild_index()
+        # Ishlab turgan serverlardagi katalog keshi eski mahsulotlarni ko'rsatmasin
+        catalog.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Tayyor: {len(buyer_ids)} xaridor, {len(products)} mahsulot, {orders} buyurtma, "
+            f"{items} pozitsiya ({time.monotonic() - started:.1f}s)"
+        ))
+
+    @transaction.atomic
+    def _reset(self):
+        # QuerySet.delete() har bir buyurtmani xotiraga yuklaydi (cascade uchun); millionlab qatorda bu
+        # daqiqalar oladi. Bog'liq jadvallarni bitta DELETE bilan, buyurtmalarni esa xom SQL bilan o'chiramiz
+        load_orders = Order.objects.filter(order_number__startswith=ORDER_PREFIX)
+        for rel in Order._meta.related_objects:
+            rel.related_model._base_manager.filter(**{f'{rel.field.name}__in': load_orders.values('pk')}).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Order._meta.db_table)} WHERE order_number LIKE %s",
+                [f'{ORDER_PREFIX}%'],
+            )
+            deleted = cursor.rowcount
+        CustomUser.objects.filter(username__startswith=USER_PREFIX).delete()
+        Product.objects.filter(name__startswith=PRODUCT_PREFIX).delete()
+        if deleted:
+            self.stdout.write(f"Avvalgi yuklama ma'lumotlari o'chirildi ({deleted} buyurtma)")
+
+    def _buyers(self, count):
+        rng = self.rng
+        # Hash bitta: minglab PBKDF2 hisoblash daqiqalab vaqt oladi
+        password = make_password(PASSWORD)
+        for start in range(0, count, self.chunk):
+            CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=f'{USER_PREFIX}{i:06d}',
+                    password=password,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone_number=f'+99890{rng.randrange(10**7):07d}',
+                    address=f"Toshkent, {rng.choice(DISTRICTS)}, {rng.randrange(1, 120)}-uy",
+                    role='buyer',
+                )
+                for i in range(start, min(start + self.chunk, count))
+            ])
+        self.stdout.write(f"Xaridorlar: {count} (parol: {PASSWORD})")
+        return list(CustomUser.objects.filter(username__startswith=USER_PREFIX)
+                    .order_by('username').values_list('id', flat=True))
+
+    def _products(self, count):
+        types = [choice for choice, _ in Product.PRODUCT_TYPE_CHOICES]
+        Product.objects.bulk_create([
+            Product(name=f'{PRODUCT_PREFIX}{types[i % len(types)]} #{i + 1}', product_type=types[i % len(types)],
+                    description="Yuklama sinovi uchun", is_available=True, stock_kg=Decimal('1000000.00'))
+            for i in range(count)
+        ])
+        return list(Product.objects.filter(name__startswith=PRODUCT_PREFIX).order_by('id'))
+
+    def _orders(self, options, end_date, buyer_ids, products):
+        rng = self.rng
+        total = options['orders']
+        days = max(1, options['months'] * 30)
+        hot = products[:max(1, min(options['hot_products'], len(products)))]
+        cold = products[len(hot):] or hot
+        hours, hour_weights = zip(*HOUR_WEIGHTS.items())
+        hour_cum = list(accumulate(hour_weights))
+        item_counts, item_cum = range(1, len(ITEM_COUNT_WEIGHTS) + 1), list(accumulate(ITEM_COUNT_WEIGHTS))
+        tz = timezone.get_current_timezone()
+        now = timezone.now()
+        # Kunlik hajm vaqt o'tishi bilan o'sadi (eng eski kun ~ oxirgisining yarmi) va dam olish kunlari ko'proq
+        day_list = [end_date - timedelta(days=offset) for offset in range(days)]
+        day_cum = list(accumulate((1 + (days - offset) / days) * (1.3 if day.weekday() >= 5 else 1.0)
+                                  for offset, day in enumerate(day_list)))
+
+        written_orders = written_items = 0
+        for start in range(0, total, self.chunk):
+            size = min(self.chunk, total - start)
+            orders, order_items = [], []
+            for index in range(start, start + size):
+                day = rng.choices(day_list, cum_weights=day_cum)[0]
+                created = timezone.make_aware(datetime.combine(
+                    day, dtime(rng.choices(hours, cum_weights=hour_cum)[0], rng.randrange(60), rng.randrange(60))), tz)
+                created = min(created, now)
+                age_days = (end_date - day).days
+                # Doimiy mijozlar: kichik indeksli xaridorlar ko'proq buyurtma beradi
+                buyer_id = buyer_ids[int(len(buyer_ids) * rng.random() ** 2)]
+                lines = []
+                for _ in range(rng.choices(item_counts, cum_weights=item_cum)[0]):
+                    product = rng.choice(hot) if rng.random() < options['hot_share'] else rng.choice(cold)
+                    lines.append((product, Decimal(rng.randrange(1, 21)) / 2))
+                status = pick_status(rng, age_days)
+                updated = min(created + timedelta(hours=rng.randrange(1, 48)), now) if status != 'pending' else created
+                orders.append(Order(
+                    buyer_id=buyer_id,
+                    order_number=f'{ORDER_PREFIX}{index:011X}',
+                    status=status,
+                    total_weight=sum(q for _, q in lines),
+                    created_at=created,
+                    updated_at=updated,
+                    # Telegram digest ularni yubormasin
+                    telegram_sent_at=created,
+                ))
+                order_items.append([(product, quantity, created) for product, quantity in lines])
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order_id=order.pk, product_id=product.id, quantity_kg=quantity, created_at=created)
+                    for order, lines in zip(orders, order_items)
+                    for product, quantity, created in lines
+                ], batch_size=self.chunk)
+            written_orders += len(orders)
+            written_items += sum(len(lines) for lines in order_items)
+            self.stdout.write(f"  buyurtmalar: {written_orders}/{total}")
+        return written_orders, written_items
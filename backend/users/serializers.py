@@ -8,6 +8,12 @@ class UserSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'address', 'role']
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    # Ro'yxatlar uchun ixcham variant (buyurtmalar ro'yxatidagi xaridor)
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'first_name', 'last_name', 'phone_number']
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
 
@@ -1,6 +1,11 @@
+from io import StringIO
+from datetime import date
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from rest_framework.test import APIClient
+from orders.models import Order, OrderItem, OrderDailyStats
+from products.models import Product
 
 User = get_user_model()
 
@@ -35,3 +40,34 @@ class SellerPermissionTests(TestCase):
 		# Expect forbidden or redirect style denial
 		self.assertIn(resp.status_code, [403, 404])
 
+
+class SeedLoadCommandTests(TestCase):
+	def _seed(self, seed=7):
+		call_command('seed_load', buyers=25, orders=400, products=6, months=2, end_date='2026-01-31',
+					 seed=seed, chunk_size=150, stdout=StringIO())
+		return list(Order.objects.filter(order_number__startswith='L').order_by('order_number').values_list(
+			'order_number', 'buyer__username', 'status', 'total_weight', 'created_at'))
+
+	def test_volumes_and_shape(self):
+		rows = self._seed()
+		self.assertEqual(len(rows), 400)
+		self.assertEqual(User.objects.filter(username__startswith='load_', role='buyer').count(), 25)
+		self.assertEqual(Product.objects.filter(name__startswith='[load] ').count(), 6)
+		self.assertTrue(all(date(2025, 12, 1) <= r[4].date() <= date(2026, 1, 31) for r in rows))
+		# Eski buyurtmalar asosan yakunlangan; hot mahsulotlarga pozitsiyalarning katta qismi tushadi
+		completed = sum(1 for r in rows if r[2] == 'completed')
+		self.assertGreater(completed, 300)
+		hot = Product.objects.filter(name__startswith='[load] ').order_by('id')[:4]
+		self.assertGreater(OrderItem.objects.filter(product__in=hot).count(), OrderItem.objects.count() / 2)
+		# Telegram digest yuklama buyurtmalarini yubormaydi, rollup qayta qurilgan
+		self.assertFalse(Order.objects.filter(telegram_sent_at__isnull=True).exists())
+		self.assertEqual(sum(OrderDailyStats.objects.filter(product_type=OrderDailyStats.ORDER_LEVEL).values_list('order_count', flat=True)), 400)
+
+	def test_deterministic_and_rerunnable(self):
+		first = self._seed()
+		again = self._seed()
+		self.assertEqual([r[:4] for r in first], [r[:4] for r in again])
+		self.assertEqual([r[4] for r in first], [r[4] for r in again])
+		self.assertEqual(Order.objects.count(), 400)
+		self.assertNotEqual([r[2:4] for r in self._seed(seed=8)], [r[2:4] for r in first])
+
@@ -46,13 +46,17 @@ const ProductCard = ({ product }: ProductCardProps) => {
     >
       <Box sx={{ position: 'relative', pt: '60%', overflow: 'hidden' }}>
         {product.image ? (
-          <img
-            src={product.image}
-            alt={product.name}
-            style={{ position: 'absolute', inset:0, width:'100%', height:'100%', objectFit:'cover', transition:'transform .6s ease' }}
-            onMouseOver={(e) => (e.currentTarget.style.transform = 'scale(1.08)')}
-            onMouseOut={(e) => (e.currentTarget.style.transform = 'scale(1)')}
-          />
+          <picture>
+            {product.images?.card && <source srcSet={product.images.card.webp} type="image/webp" />}
+            <img
+              src={product.images?.card?.jpeg ?? product.image}
+              alt={product.name}
+              loading="lazy"
+              style={{ position: 'absolute', inset:0, width:'100%', height:'100%', objectFit:'cover', transition:'transform .6s ease' }}
+              onMouseOver={(e) => (e.currentTarget.style.transform = 'scale(1.08)')}
+              onMouseOut={(e) => (e.currentTarget.style.transform = 'scale(1)')}
+            />
+          </picture>
         ) : (
           <Box sx={{ position:'absolute', inset:0, display:'flex', alignItems:'center', justifyContent:'center', fontSize:46 }}>
             🐔
@@ -1,6 +1,8 @@
 import { useEffect, useRef } from 'react';
 import { useAppDispatch, useAppSelector } from '../store/hooks';
-import { updateOrderInList, fetchOrders } from '../store/orderSlice';
+import { updateOrderInList, applyOrderDelta, fetchOrders } from '../store/orderSlice';
+import type { OrderDelta } from '../types/order';
+import type { SellerStatsDelta } from '../services/statsApi';
 
 // Build WS URL (assumes same host as API but ws scheme)
 function buildWebSocketUrl(): string {
@@ -11,27 +13,56 @@ function buildWebSocketUrl(): string {
   return `${wsProtocol}//${url.host}/ws/orders/`;
 }
 
-export default function useWebSocketOrders() {
+export default function useWebSocketOrders(
+  onStatsDelta?: (delta: SellerStatsDelta) => void,
+) {
   const dispatch = useAppDispatch();
   const { accessToken, user } = useAppSelector((s) => s.auth);
   const wsRef = useRef<WebSocket | null>(null);
+  // Oqim bo'yicha oxirgi ko'rilgan seq: qayta ulanganda faqat o'tkazib yuborilganlari keladi
+  const lastSeqRef = useRef<Record<string, number>>({});
+  // Callback o'zgarsa soket qayta ochilmasin
+  const onStatsDeltaRef = useRef(onStatsDelta);
+  onStatsDeltaRef.current = onStatsDelta;
 
   useEffect(() => {
     if (!accessToken || !user) return; // need auth
+    const resume = Object.entries(lastSeqRef.current)
+      .map(([stream, seq]) => `${stream}:${seq}`)
+      .join(',');
     const wsUrl = buildWebSocketUrl();
-    const socket = new WebSocket(wsUrl);
+    const socket = new WebSocket(
+      resume ? `${wsUrl}?last_seq=${encodeURIComponent(resume)}` : wsUrl,
+    );
     wsRef.current = socket;
 
     socket.onopen = () => {
-      // Optionally refetch to sync
-      dispatch(fetchOrders());
+      // Birinchi ulanishda to'liq ro'yxat; keyingilarida server takrorlaydi
+      if (!resume) dispatch(fetchOrders());
     };
 
     socket.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
+        if (typeof data.seq === 'number' && data.stream) {
+          lastSeqRef.current[data.stream] = Math.max(
+            lastSeqRef.current[data.stream] ?? 0,
+            data.seq,
+          );
+        }
+        if (data.type === 'resync_required') {
+          lastSeqRef.current[data.stream] = data.seq;
+          dispatch(fetchOrders());
+          return;
+        }
         if (data.type === 'order_update' || data.type === 'new_order') {
           dispatch(updateOrderInList(data.order));
+        } else if (data.type === 'order_delta') {
+          dispatch(applyOrderDelta(data as OrderDelta));
+        } else if (data.type === 'order_deltas') {
+          (data.deltas as OrderDelta[]).forEach((delta) => dispatch(applyOrderDelta(delta)));
+        } else if (data.type === 'stats_delta') {
+          onStatsDeltaRef.current?.(data.delta);
         }
       } catch (e) {
         console.error('WS parse error', e);
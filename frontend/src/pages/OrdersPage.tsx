@@ -36,7 +36,7 @@ const OrdersPage = () => {
             <Divider sx={{ my: 1 }} />
             <Typography sx={{ pl: 2, fontWeight: 'bold' }}>Mahsulotlar:</Typography>
             <List disablePadding sx={{ pl: 4 }}>
-              {order.items.map(item => (
+              {(order.items ?? []).map(item => (
                 <ListItemText key={item.id} primary={`${item.product.name} - ${item.quantity_kg} kg`} />
               ))}
             </List>
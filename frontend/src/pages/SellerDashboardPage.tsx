@@ -7,7 +7,7 @@ import { useAppDispatch, useAppSelector } from '../store/hooks';
 import { fetchOrders, setOrderFilters, setOrderPage } from '../store/orderSlice';
 import { createReport, listReports, downloadReport, type OrderReport } from '../services/reportApi';
 import { useState, useEffect as useLayoutEffect } from 'react';
-import { fetchSellerStats, type SellerStats } from '../services/statsApi';
+import { applyStatsDelta, fetchSellerStats, type SellerStats } from '../services/statsApi';
 import OrdersTable from '../components/dashboard/OrdersTable'; // Hozir yaratamiz
 import useWebSocketOrders from '../hooks/useWebSocketOrders';
 
@@ -45,8 +45,8 @@ const SellerDashboardPage = () => {
     dispatch(fetchOrders());
   }, [dispatch, filters]);
 
-  // Real-time updates
-  useWebSocketOrders();
+  // Real-time updates (statistika hisoblagichlari ham shu soket orqali yangilanadi, polling yo'q)
+  useWebSocketOrders((delta) => setStats((s) => (s ? applyStatsDelta(s, delta) : s)));
 
   // Load reports list
   useLayoutEffect(() => {
@@ -24,3 +24,59 @@ export async function fetchSellerStats(): Promise<SellerStats> {
   const res = await api.get('/orders/stats/');
   return res.data;
 }
+
+// WebSocket `stats_delta`: hisoblagichlar o'zgarishi (faqat nolmas qiymatlar)
+export interface SellerStatsDelta {
+  total_orders?: number;
+  total_completed?: number;
+  total_weight_completed?: number;
+  status_breakdown?: Record<string, number>;
+  product_type_breakdown?: Record<string, { orders: number; quantity_kg: number }>;
+  days?: Record<string, { count: number; completed_weight: number }>;
+}
+
+// Backend'dagi formula bilan bir xil: oldingi davr 0 bo'lsa 100% (yoki 0%)
+function deltaPct(current: number, previous: number): number {
+  if (previous === 0) return current > 0 ? 100 : 0;
+  return ((current - previous) / previous) * 100;
+}
+
+export function applyStatsDelta(stats: SellerStats, delta: SellerStatsDelta): SellerStats {
+  const status_breakdown = { ...stats.status_breakdown };
+  Object.entries(delta.status_breakdown ?? {}).forEach(([k, v]) => {
+    status_breakdown[k] = (status_breakdown[k] ?? 0) + v;
+    if (!status_breakdown[k]) delete status_breakdown[k];
+  });
+  const product_type_breakdown = { ...stats.product_type_breakdown };
+  Object.entries(delta.product_type_breakdown ?? {}).forEach(([k, v]) => {
+    const cur = product_type_breakdown[k] ?? { orders: 0, quantity_kg: 0 };
+    product_type_breakdown[k] = { orders: cur.orders + v.orders, quantity_kg: cur.quantity_kg + v.quantity_kg };
+  });
+  const last7days = stats.last7days.map((d) => {
+    const change = delta.days?.[d.date];
+    return change
+      ? { ...d, count: d.count + change.count, completed_weight: d.completed_weight + change.completed_weight }
+      : d;
+  });
+  // Kunlik/haftalik ko'rsatkichlar yangilangan last7days'dan qayta hisoblanadi
+  const todayCount = last7days[last7days.length - 1]?.count ?? 0;
+  const yesterdayCount = last7days[last7days.length - 2]?.count ?? 0;
+  const last7Total = last7days.reduce((sum, d) => sum + d.count, 0);
+  return {
+    ...stats,
+    total_orders: stats.total_orders + (delta.total_orders ?? 0),
+    total_completed: stats.total_completed + (delta.total_completed ?? 0),
+    total_weight_completed: stats.total_weight_completed + (delta.total_weight_completed ?? 0),
+    status_breakdown,
+    product_type_breakdown,
+    last7days,
+    metrics: stats.metrics && {
+      ...stats.metrics,
+      today_count: todayCount,
+      yesterday_count: yesterdayCount,
+      day_count_delta_pct: deltaPct(todayCount, yesterdayCount),
+      last7_total: last7Total,
+      week_count_delta_pct: deltaPct(last7Total, stats.metrics.prev7_total),
+    },
+  };
+}
@@ -2,7 +2,7 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import type { PayloadAction } from '@reduxjs/toolkit';
 import api from '../services/api';
-import type { Order } from '../types/order';
+import type { Order, OrderDelta } from '../types/order';
 import type { RootState } from './index';
 
 interface OrderState {
@@ -57,6 +57,8 @@ export const fetchOrders = createAsyncThunk(
     if (filters.search) params.search = filters.search;
     if (filters.start_date) params.start_date = filters.start_date;
     if (filters.end_date) params.end_date = filters.end_date;
+    // Ro'yxat ixcham keladi; xaridor sahifasi pozitsiyalarni ham ko'rsatadi
+    if (state.auth.user?.role === 'buyer') params.expand = 'items';
     const response = await api.get('/orders/', { params });
     return response.data; // expects {count,next,previous,results}
   },
@@ -87,6 +89,14 @@ const orderSlice = createSlice({
         state.orders[index] = updatedOrder;
       }
     },
+    applyOrderDelta: (state, action: PayloadAction<OrderDelta>) => {
+      const { id, version, changes } = action.payload;
+      const order = state.orders.find((o) => o.id === id);
+      // Eski (kechikib kelgan) delta yangi holat ustiga yozilmasin
+      if (order && (order.version ?? 0) < version) {
+        Object.assign(order, changes, { version });
+      }
+    },
     setOrderFilters: (
       state,
       action: PayloadAction<Partial<OrderState['filters']>>,
@@ -139,6 +149,6 @@ const orderSlice = createSlice({
   },
 });
 
-export const { updateOrderInList, setOrderFilters, setOrderPage } =
+export const { updateOrderInList, applyOrderDelta, setOrderFilters, setOrderPage } =
   orderSlice.actions;
 export default orderSlice.reducer;
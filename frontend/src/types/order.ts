@@ -15,6 +15,18 @@ export interface Order {
   total_weight: string;
   notes: string;
   created_at: string;
-  items: OrderItem[];
+  updated_at?: string;
+  // Har status o'zgarishida oshadi (WebSocket delta'lari uchun)
+  version?: number;
+  // Ro'yxatda faqat ?expand=items bilan keladi
+  items?: OrderItem[];
+  item_count?: number;
   buyer: User;
 }
+
+// WebSocket: status o'zgarishi faqat o'zgargan maydonlar bilan keladi
+export interface OrderDelta {
+  id: number;
+  version: number;
+  changes: Partial<Pick<Order, 'status' | 'updated_at'>>;
+}
@@ -1,5 +1,12 @@
 // src/types/product.ts
 
+export interface ProductImageVariant {
+  width: number;
+  height: number;
+  webp: string;
+  jpeg: string;
+}
+
 export interface Product {
   id: number;
   name: string;
@@ -9,11 +16,13 @@ export interface Product {
   created_at: string;
   updated_at: string;
   image?: string | null;
+  // Server tayyorlagan o'lchamlar (thumb/card/full); tayyor bo'lmaguncha bo'sh
+  images?: Partial<Record<'thumb' | 'card' | 'full', ProductImageVariant>>;
   stock_kg: number; // server authoritative stock in kg
 }
 
 export type ProductSummary = Pick<
   Product,
-  'id' | 'name' | 'image' | 'product_type' | 'is_available' | 'stock_kg'
+  'id' | 'name' | 'image' | 'images' | 'product_type' | 'is_available' | 'stock_kg'
 >;
 export type ProductCreate = Omit<Product, 'id' | 'created_at' | 'updated_at'>;